@@ -0,0 +1 @@
+"""Benchmarks for factorioccn. These are not run as part of the tests, run the modules directly instead."""
@@ -0,0 +1,78 @@
+"""Benchmarks of importing blueprint books, e.g. ``python -m benchmarks.blueprint --entities 5000``.
+
+The book is generated as a blueprint string of ``--blueprints`` blueprints, each a chain of arithmetic and decider
+combinators fed by a constant combinator, with a medium electric pole relaying every tenth link.
+Reported are the times to decode the string and to import all of its circuits, including decoding.
+"""
+import argparse
+import sys
+import time
+
+from factorioccn.blueprint import decode, encode, load_book
+
+
+def _signal(name: str) -> dict:
+    return {'type': 'virtual', 'name': name}
+
+
+def generate(entities: int, blueprints: int = 10) -> str:
+    """generate a blueprint string of a book with about ``entities`` entities"""
+    book = []
+    for b in range(blueprints):
+        items = [{'entity_number': 1, 'name': 'constant-combinator', 'control_behavior': {
+            'filters': [{'signal': _signal('signal-A'), 'count': b + 1, 'index': 1}]}}]
+        links = []  # (from entity, from side, to entity, to side, color)
+        for n in range(2, entities // blueprints + 1):
+            if n % 10 == 0:
+                items.append({'entity_number': n, 'name': 'medium-electric-pole'})
+                links.append((n - 1, 2, n, 1, 'red'))
+                continue
+            if n % 2:
+                behavior = {'arithmetic_conditions': {'first_signal': _signal('signal-each'), 'second_constant': 1,
+                                                      'operation': '+', 'output_signal': _signal('signal-each')}}
+                name = 'arithmetic-combinator'
+            else:
+                behavior = {'decider_conditions': {'first_signal': _signal('signal-A'), 'constant': 0,
+                                                   'comparator': '>', 'output_signal': _signal('signal-everything'),
+                                                   'copy_count_from_input': True}}
+                name = 'decider-combinator'
+            items.append({'entity_number': n, 'name': name, 'control_behavior': behavior})
+            previous = items[-2]
+            if previous['name'] == 'medium-electric-pole':
+                links.append((n - 1, 1, n, 1, 'red'))
+            else:
+                links.append((n - 1, 1 if previous['name'] == 'constant-combinator' else 2, n, 1,
+                              'red' if n % 3 else 'green'))
+        connections = {}
+        for first, first_side, second, second_side, color in links:
+            for entity, side, other, other_side in ((first, first_side, second, second_side),
+                                                    (second, second_side, first, first_side)):
+                connections.setdefault(entity, {}).setdefault(str(side), {}).setdefault(color, []).append(
+                    {'entity_id': other, 'circuit_id': other_side})
+        for item in items:
+            if item['entity_number'] in connections:
+                item['connections'] = connections[item['entity_number']]
+        book.append({'index': b, 'blueprint': {'label': f'chain {b}', 'entities': items}})
+    return encode({'blueprint_book': {'label': 'benchmark', 'blueprints': book}})
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.blueprint',
+                                     description='Measure importing a generated blueprint book.')
+    parser.add_argument('--entities', type=int, default=5000, help='entities in the book, default %(default)s')
+    parser.add_argument('--blueprints', type=int, default=10, help='blueprints in the book, default %(default)s')
+    options = parser.parse_args(args)
+    string = generate(options.entities, options.blueprints)
+    start = time.perf_counter()
+    decode(string)
+    decoded = time.perf_counter() - start
+    start = time.perf_counter()
+    combinators = sum(len(circuit.combinators) for _, circuit in load_book(string))
+    imported = time.perf_counter() - start
+    print(f'{len(string)} characters, {combinators} combinators: decode {decoded * 1000:.1f} ms, '
+          f'import {imported * 1000:.1f} ms')
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
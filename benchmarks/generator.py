@@ -0,0 +1,101 @@
+"""Generators for synthetic fccn circuits of a given size, e.g. ``python -m benchmarks.generator latch_array 100``.
+
+Every generated circuit contains a test over ``ticks`` ticks, with expectations that pass for a correct simulation.
+"""
+import sys
+
+
+def arithmetic_chain(length: int, ticks: int = 100) -> str:
+    """a chain of ``length`` arithmetic combinators fed by a constant, alternately adding and subtracting"""
+    length += length % 2
+    lines = ['{x:1} -> w0']
+    for i in range(length):
+        lines.append(f'w{i} -> x = x {"+" if i % 2 == 0 else "-"} {i // 2 + 1} -> w{i + 1}')
+    start = length + 2
+    lines += ['test chain {',
+              f'    {start}: for {ticks} w{length} =~ {{x:1}}',
+              f'    {start + ticks}: w{length} =~ {{x:1}}',
+              '}']
+    return '\n'.join(lines) + '\n'
+
+
+def wildcard_deciders(width: int, signals: int = 20, ticks: int = 100) -> str:
+    """``width`` deciders with ``each`` and ``everything`` wildcards, evaluating a constant with ``signals`` signals"""
+    values = {f's{j}': j + 1 for j in range(signals)}
+    expected = dict.fromkeys(values, 0)
+    lines = ['{' + ', '.join(f'{s}:{v}' for s, v in values.items()) + '} -> in']
+    for i in range(width):
+        if i % 2 == 0:
+            threshold = i % signals
+            lines.append(f'in -> each > {threshold} : each -> out')
+            for s, v in values.items():
+                expected[s] += v if v > threshold else 0
+        else:
+            lines.append('in -> everything > 0 : everything -> out')
+            for s, v in values.items():
+                expected[s] += v
+    frame = '{' + ', '.join(f'{s}:{v}' for s, v in expected.items()) + '}'
+    lines += ['test wildcards {',
+              f'    4: for {ticks} out =~ {frame}',
+              f'    {4 + ticks}: out =~ {frame}',
+              '}']
+    return '\n'.join(lines) + '\n'
+
+
+def latch_array(count: int, ticks: int = 100) -> str:
+    """``count`` independent SR latches, which are all set and then reset one by one"""
+    lines = [f'in{i}, loop{i} -> S > R : S=1 -> loop{i}' for i in range(count)]
+    reset = 3 + ticks // 2
+    lines += ['test latches {',
+              '    0: ' + ', '.join(f'in{i} += {{S:1}}' for i in range(count)),
+              '    3: ' + ', '.join(f'for {reset - 3} loop{i} =~ {{S:1}}' for i in range(count)),
+              f'    {reset}: ' + ', '.join(f'in{i} += {{R:1}}' for i in range(count)),
+              f'    {reset + 3}: ' + ', '.join(f'for {ticks - reset} loop{i} =~ {{S:0}}' for i in range(count)),
+              f'    {ticks + 3}: loop0 =~ {{S:0}}',
+              '}']
+    return '\n'.join(lines) + '\n'
+
+
+def constant_signals(count: int, signals: int = 100, ticks: int = 100) -> str:
+    """``count`` constant combinators with ``signals`` signals each, summed up on a bus and doubled"""
+    lines = ['{' + ', '.join(f's{j}:{i + j + 1}' for j in range(signals)) + '} -> bus' for i in range(count)]
+    lines.append('bus -> each = each * 2 -> doubled')
+    frame = '{' + ', '.join(f's{j}:{2 * sum(i + j + 1 for i in range(count))}' for j in range(signals)) + '}'
+    lines += ['test constants {',
+              f'    4: for {ticks} doubled =~ {frame}',
+              f'    {4 + ticks}: doubled =~ {frame}',
+              '}']
+    return '\n'.join(lines) + '\n'
+
+
+def feedback_loops(depth: int, loops: int = 4, ticks: int = 100) -> str:
+    """``loops`` rings of ``depth`` (at least 2) arithmetic combinators, the first one of each ring counts up"""
+    lines = []
+    for k in range(loops):
+        lines.append(f'r{k}_0 -> x = x + {k + 1} -> r{k}_1')
+        lines += [f'r{k}_{i} -> x = x * 1 -> r{k}_{(i + 1) % depth}' for i in range(1, depth)]
+    # values on the wires of a ring counting up by 1, the other rings are multiples of this
+    ring = [0] * depth
+    history = [0]
+    for t in range(ticks):
+        ring = [ring[-1], ring[0] + 1] + ring[1:-1]
+        history.append(ring[1])
+    lines.append('test loops {')
+    for t in range(depth, ticks + 1, depth):
+        lines.append(f'    {t}: ' + ', '.join(f'r{k}_1 =~ {{x:{history[t] * (k + 1)}}}' for k in range(loops)))
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+generators = {
+    'arithmetic_chain': arithmetic_chain,
+    'wildcard_deciders': wildcard_deciders,
+    'latch_array': latch_array,
+    'constant_signals': constant_signals,
+    'feedback_loops': feedback_loops,
+}
+"""all generators by name. Each takes the size of the circuit as its first argument"""
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.stdout.write(generators[sys.argv[1]](int(sys.argv[2])))
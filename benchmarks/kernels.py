@@ -0,0 +1,58 @@
+"""Benchmarks of the wildcard kernels on wide frames, e.g. ``python -m benchmarks.kernels``.
+
+Each case is a combinator configuration evaluated on frames of ``--signals`` signals.
+The bulk kernels (see ``factorioccn.model.kernels``) are compared against the plain kernels evaluating every
+signal in Python, which is the path they replace. Cases without a bulk operation measure the same kernel twice.
+"""
+import argparse
+import sys
+import timeit
+from collections.abc import Callable
+
+from factorioccn.model.kernels import arithmetic_kernel, decider_kernel
+
+CASES = (
+    # name, kernel factory taking whether to use bulk operations, right operand
+    ('everything > c : everything', lambda bulk: decider_kernel('>', 'everything', True, 'everything', False, bulk),
+     -1000),
+    ('everything < c : each', lambda bulk: decider_kernel('<', 'everything', True, 'each', False, bulk), 1000),
+    ('everything = c : x=1', lambda bulk: decider_kernel('=', 'everything', True, 'signal', True, bulk), 0),
+    ('everything != c : everything', lambda bulk: decider_kernel('!=', 'everything', True, 'everything', True, bulk),
+     5000),
+    ('each > c : each', lambda bulk: decider_kernel('>', 'each', True, 'each', False, bulk), 0),
+    ('each > c : x', lambda bulk: decider_kernel('>', 'each', True, 'signal', False, bulk), 0),
+    ('anything > c : each', lambda bulk: decider_kernel('>', 'anything', True, 'each', True, bulk), 0),
+    ('each = each + 0', lambda bulk: arithmetic_kernel('+', 'each', True, 'each', bulk), 0),
+    ('each = each * 1', lambda bulk: arithmetic_kernel('*', 'each', True, 'each', bulk), 1),
+    ('each = each * 2', lambda bulk: arithmetic_kernel('*', 'each', True, 'each', bulk), 2),
+    ('x = each + 0', lambda bulk: arithmetic_kernel('+', 'each', True, 'signal', bulk), 0),
+)
+
+
+def frame(signals: int) -> dict[int, int]:
+    """a frame of signal ids to values, positive and negative but never 0"""
+    return {sid: (sid * 7919) % 1999 - 999 or 1 for sid in range(1, signals + 1)}
+
+
+def measure(kernel: Callable, values: dict[int, int], right: int, number: int) -> float:
+    """get the best time of a kernel call in seconds"""
+    return min(timeit.repeat(lambda: kernel(values, -1, right, 0), number=number, repeat=5)) / number
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.kernels',
+                                     description='Compare bulk and plain wildcard kernels.')
+    parser.add_argument('--signals', type=int, default=500, help='signals per frame, default %(default)s')
+    parser.add_argument('--number', type=int, default=1000, help='calls per measurement, default %(default)s')
+    options = parser.parse_args(args)
+    values = frame(options.signals)
+    print(f'{"case":32} {"plain us":>10} {"bulk us":>10} {"speedup":>8}')
+    for name, factory, right in CASES:
+        plain = measure(factory(False), values, right, options.number)
+        bulk = measure(factory(True), values, right, options.number)
+        print(f'{name:32} {plain * 1e6:10.2f} {bulk * 1e6:10.2f} {plain / bulk:7.2f}x')
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Benchmarks of placing large circuits, e.g. ``python -m benchmarks.placement --sizes 1000 10000``.
+
+The circuits are built directly rather than parsed, as parsing would take much longer than placing them.
+Each circuit consists of modules of chained combinators, which all read a bus of their module.
+Some combinators of every module also read a global bus, so its wire spans the whole circuit and needs relays.
+Reported are the time to place each circuit, the relay poles added and the longest connection.
+"""
+import argparse
+import random
+import sys
+import time
+
+from factorioccn.model.combinators import ArithmeticCombinator, ConstantCombinator, DeciderCombinator
+from factorioccn.model.core import Frame, Wire
+from factorioccn.model.toplevel import Circuit
+from factorioccn.placement import place
+
+
+def generate(size: int, module: int = 50, seed: int = 0) -> Circuit:
+    """generate a circuit of about ``size`` combinators, in modules of ``module`` combinators"""
+    rng = random.Random(seed)
+    wires = {'global': Wire()}
+    combinators = [ConstantCombinator(Frame({'g': 1}), [wires['global']])]
+    for m in range(max(size // module, 1)):
+        bus = wires[f'bus{m}'] = Wire()
+        combinators.append(ConstantCombinator(Frame({'b': m}), [bus]))
+        previous = bus
+        for i in range(module - 1):
+            out = wires[f'm{m}_{i}'] = Wire()
+            inputs = [previous, bus]
+            if rng.random() < 0.02:
+                inputs[1] = wires['global']
+            if i % 2:
+                combinator = DeciderCombinator(inputs, 'x', '>', 'b', 'x', None, [out])
+            else:
+                combinator = ArithmeticCombinator(inputs, 'x', '+', 'b', 'x', [out])
+            combinators.append(combinator)
+            previous = out
+    for combinator in combinators:
+        combinator.connect()
+    return Circuit(wires, combinators)
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.placement',
+                                     description='Measure placing generated circuits.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 10000],
+                        help='amounts of combinators, default %(default)s')
+    parser.add_argument('--passes', type=int, default=1, help='improvement passes, default %(default)s')
+    options = parser.parse_args(args)
+    print(f'{"combinators":>11} {"seconds":>8} {"relays":>7} {"span":>6}')
+    for size in options.sizes:
+        circuit = generate(size)
+        start = time.perf_counter()
+        placement = place(circuit, passes=options.passes)
+        elapsed = time.perf_counter() - start
+        print(f'{len(circuit.combinators):11} {elapsed:8.2f} {placement.relays:7} {placement.span():6.2f}')
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""Measure the startup time of the factorioccn CLI, e.g. ``python -m benchmarks.startup examples/steam_latch.fccn``.
+
+Each command is run once to warm up caches, then repeatedly in fresh processes,
+and the median wall time is reported against the target.
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+TARGET = 0.1
+"""targeted startup time of the CLI in seconds"""
+
+
+def measure(command, runs: int = 20) -> float:
+    """run a command repeatedly and return the median wall time in seconds"""
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    times = []
+    for i in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(infile_name: str, runs: int = 20):
+    baseline = measure([sys.executable, '-c', 'pass'], runs)
+    imports = measure([sys.executable, '-c', 'import factorioccn.__main__'], runs)
+    cli = measure([sys.executable, '-m', 'factorioccn', infile_name], runs)
+    print(f'interpreter:   {baseline * 1000:7.1f} ms')
+    print(f'imports:       {imports * 1000:7.1f} ms')
+    print(f'cli:           {cli * 1000:7.1f} ms (target {TARGET * 1000:.0f} ms)')
+    return cli <= TARGET
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(0 if main(*sys.argv[1:2]) else 1)
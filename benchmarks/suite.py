@@ -0,0 +1,159 @@
+"""Throughput benchmarks on synthetic circuits, e.g. ``python -m benchmarks.suite``.
+
+For each case of ``CASES``, the circuit is generated (see ``benchmarks.generator``) and measured for:
+
+* parse: parsing the source into its syntax tree
+* build: building the circuit from the syntax tree
+* tick.<engine>: simulating a single tick with each engine, reported as ticks per second
+* test.<engine>: running the tests of the circuit with each engine
+
+Each measurement is the best of several runs. Results are compared against the baselines stored in
+``baselines.json``, and the run fails if any measurement is slower than its baseline by more than the threshold.
+Baselines depend on the machine, so update them with ``--update`` after changing it, and whenever a change
+is expected to affect performance.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from collections.abc import Callable, Iterable, Mapping
+from pathlib import Path
+from typing import Union
+
+from benchmarks.generator import generators
+from factorioccn.model.engines import engines as all_engines
+from factorioccn.parser import build, parse_model
+
+CASES = (
+    ('arithmetic_chain', 200),
+    ('wildcard_deciders', 50),
+    ('latch_array', 100),
+    ('constant_signals', 50),
+    ('feedback_loops', 50),
+)
+"""benchmarked circuits as pairs of generator name and size"""
+
+BASELINES = Path(__file__).with_name('baselines.json')
+THRESHOLD = 0.25
+"""default tolerated slowdown against the baseline, as a fraction"""
+TICKS = 200
+"""ticks simulated per run of the tick benchmarks"""
+
+
+def available_engines() -> list[str]:
+    """get the names of all engines whose dependencies are installed"""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:  # pragma: no cover
+        return [engine for engine in all_engines if engine != 'vectorized']
+    return list(all_engines)
+
+
+def best(function: Callable[..., object], repeat: int, setup: Union[Callable[[], object], None] = None) -> float:
+    """run a function repeatedly and return the shortest wall time in seconds
+
+    :param setup: called before each run without being timed, e.g. to undo the state the function changes.
+        Its result is passed to the function
+    """
+    times = []
+    for i in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def measure(name: str, size: int, engines: Iterable[str], repeat: int = 3) -> dict[str, float]:
+    """measure a single case.
+
+    :param name: name of the generator, see ``benchmarks.generator.generators``
+    :param size: size of the generated circuit
+    :param engines: names of the engines to measure ticks and tests for
+    :param repeat: amount of runs of each measurement
+    :return: the measurements in seconds by name, per tick for the tick benchmarks
+    """
+    source = generators[name](size)
+    results = {'parse': best(lambda: parse_model(source), repeat)}
+    model = parse_model(source)
+    results['build'] = best(lambda: build(model), repeat)
+    for engine in engines:
+        def fresh():
+            circuit = build(model)
+            circuit.use_engine(engine)
+            circuit.engine.tick()  # create and warm up the engine
+            return circuit
+        # every run starts from a fresh circuit, as e.g. circuits settling would speed up later runs
+        results[f'tick.{engine}'] = best(lambda circuit: circuit.engine.tick(TICKS), repeat, fresh) / TICKS
+        results[f'test.{engine}'] = best(fresh().run_tests, repeat)
+    return results
+
+
+def compare(results: Mapping[str, Mapping[str, float]], baselines: Mapping[str, Mapping[str, float]],
+            threshold: float) -> list[str]:
+    """find measurements which are slower than their baseline by more than ``threshold``"""
+    regressions = []
+    for case, measurements in results.items():
+        for metric, value in measurements.items():
+            baseline = baselines.get(case, {}).get(metric)
+            if baseline is not None and value > baseline * (1 + threshold):
+                regressions.append(f'{case} {metric}: {_format(metric, value)}, baseline {_format(metric, baseline)}')
+    return regressions
+
+
+def _format(metric: str, value: float) -> str:
+    if metric.startswith('tick.'):
+        return f'{1 / value:,.0f} ticks/s'
+    return f'{value * 1000:.2f} ms'
+
+
+def load_baselines(path: Path = BASELINES) -> dict[str, dict[str, float]]:
+    try:
+        with open(path) as file:
+            return json.load(file)['results']
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(results: Mapping[str, Mapping[str, float]], path: Path = BASELINES) -> None:
+    data = {'machine': f'{platform.machine()} {platform.python_implementation()} {platform.python_version()}',
+            'results': results}
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description='Run the throughput benchmarks.')
+    parser.add_argument('--only', action='append', choices=sorted(generators), help='only run these generators')
+    parser.add_argument('--engine', action='append', dest='engines', choices=sorted(all_engines),
+                        help='only measure these engines')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, the best one counts')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='tolerated slowdown against the baseline as a fraction, default %(default)s')
+    parser.add_argument('--update', action='store_true', help='store the results as the new baselines')
+    options = parser.parse_args(args)
+    engines = options.engines or available_engines()
+    baselines = load_baselines()
+    results = {}
+    for name, size in CASES:
+        if options.only and name not in options.only:
+            continue
+        case = f'{name}[{size}]'
+        results[case] = measure(name, size, engines, options.repeat)
+        for metric, value in results[case].items():
+            baseline = baselines.get(case, {}).get(metric)
+            change = f'{value / baseline - 1:+7.1%}' if baseline else ''
+            print(f'{case:24} {metric:18} {_format(metric, value):>18} {change}')
+    if options.update:
+        save_baselines({**baselines, **results})
+        return 0
+    regressions = compare(results, baselines, options.threshold)
+    for regression in regressions:
+        print(f'regression: {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -1,14 +1,118 @@
+import argparse
 import sys
+from collections.abc import Sequence
 
-from factorioccn.parser import parse
+from factorioccn.model.engines import engines
+from factorioccn.runner import run
 
 
-def main(infile_name):
-    with open(infile_name) as infile:
-        instr = infile.read()
-    circuit = parse(instr)
-    circuit.run_tests()
+def main(*paths, jobs: int = 1, engine: str = None, batch: bool = False, shared: bool = False,
+         optimize: bool = False, slice: bool = False, profile: bool = False, profile_output: str = None,
+         probes: Sequence[str] = (), history: int = 32, trace: str = None, watch: bool = False,
+         cache: bool = False) -> int:
+    """run the tests of fccn files and report all failures.
+
+    :param paths: fccn files, compiled circuit files or directories containing them
+    :param jobs: amount of worker processes, see ``factorioccn.runner.run``
+    :param engine: simulation engine to use, see ``factorioccn.model.engines``
+    :param batch: run the tests of each file in lockstep, see ``factorioccn.runner.run``
+    :param shared: simulate common prefixes of the tests of each file only once, see ``factorioccn.runner.run``
+    :param optimize: simplify the circuits before running their tests, see ``factorioccn.optimizer``.
+        This is ignored while profiling or tracing
+    :param slice: simulate only the part of the circuit each test observes, see ``factorioccn.runner.run``
+    :param profile: run all tests in this process while profiling them and print the hot spots,
+        see ``factorioccn.profiling``
+    :param profile_output: if given, write the profile to this file in the collapsed stack format
+    :param probes: wires to record, see ``factorioccn.runner.run``
+    :param history: amount of ticks recorded by the probes
+    :param trace: if given, run the tests of the only file in this process and write a trace of the complete
+        simulation to this file, see ``factorioccn.trace``
+    :param watch: run the tests again whenever a file changes until interrupted, see ``factorioccn.watch``
+    :param cache: skip tests which passed before and can't be affected by any change since,
+        see ``factorioccn.results``
+    :return: the exit status, 0 if all tests passed
+    """
+    if watch:
+        from factorioccn.watch import Watcher
+        try:
+            Watcher(paths, engine, probes, history).watch()
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if trace:
+        from factorioccn.trace import trace_tests
+        results, profiler = trace_tests(paths[0], trace, engine), None
+    elif profile or profile_output:
+        from factorioccn.profiling import profile_tests
+        results, profiler = profile_tests(paths, engine)
+    else:
+        results = run(paths, jobs=jobs, engine=engine, batch=batch, probes=probes, history=history, shared=shared,
+                      optimize=optimize, slice=slice, cache=cache)
+        profiler = None
+    failed = [r for r in results if not r.is_success()]
+    for result in failed:
+        print(result, file=sys.stderr)
+    cached = sum(r.cached for r in results)
+    print(f'{len(results)} tests, {len(failed)} failed' + (f', {cached} cached' if cached else ''))
+    if profiler is not None:
+        print(profiler.format_table())
+        if profile_output:
+            profiler.write_collapsed(profile_output)
+    return 1 if failed else 0
+
+
+def parse_args(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='factorioccn', description='Run the tests of fccn circuits.')
+    parser.add_argument('paths', nargs='+', metavar='path', help='fccn files or directories containing them')
+    parser.add_argument('-j', '--jobs', type=int, nargs='?', default=1, const=None,
+                        help='run tests in JOBS worker processes, one per CPU if JOBS is omitted')
+    parser.add_argument('--engine', choices=sorted(engines), help='simulation engine to use')
+    parser.add_argument('--batch', action='store_true',
+                        help='simulate the tests of each file in lockstep as a batch (requires numpy)')
+    parser.add_argument('--shared', action='store_true',
+                        help='simulate the ticks which tests of the same file start with only once')
+    parser.add_argument('-O', '--optimize', action='store_true',
+                        help='merge constants, fold combinators with constant input and remove unused combinators '
+                             'before simulating')
+    parser.add_argument('--slice', action='store_true',
+                        help='simulate only the part of the circuit which can affect the wires a test checks')
+    parser.add_argument('--profile', action='store_true',
+                        help='profile combinators and wires and print the hot spots, '
+                             'this runs all tests in one process')
+    parser.add_argument('--profile-output', metavar='FILE',
+                        help='write the profile to FILE in the collapsed stack format used by flamegraph tools')
+    parser.add_argument('--probe', action='append', default=[], dest='probes', metavar='WIRE[:SIGNAL,...]',
+                        help='record the signals of a wire, and show them for failing tests')
+    parser.add_argument('--history', type=int, default=32, metavar='TICKS',
+                        help='amount of ticks recorded by probes, default %(default)s')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='write a trace of the complete simulation to FILE, see python -m factorioccn.trace')
+    parser.add_argument('--cache', action='store_true',
+                        help='skip tests which passed before and are unaffected by any change since, '
+                             'and remember the tests which pass')
+    parser.add_argument('--watch', action='store_true',
+                        help='run the tests again whenever a file changes, only those affected by the change')
+    options = parser.parse_args(args)
+    if options.trace and (len(options.paths) != 1 or options.batch or options.shared or options.profile
+                          or options.profile_output):
+        parser.error('tracing requires a single file, without --batch, --shared or profiling')
+    if options.shared and (options.batch or options.profile or options.profile_output):
+        parser.error('--shared can not be combined with --batch or profiling')
+    if options.slice and (options.batch or options.shared):
+        parser.error('--slice can not be combined with --batch or --shared')
+    if options.watch and (options.jobs != 1 or options.batch or options.shared or options.optimize or options.slice
+                          or options.profile or options.profile_output or options.trace or options.cache):
+        parser.error('--watch can only be combined with --engine, --probe and --history')
+    if options.cache and (options.profile or options.profile_output or options.trace):
+        parser.error('--cache can not be combined with profiling or tracing')
+    if (options.profile or options.profile_output) and (options.batch or options.engine == 'vectorized'):
+        parser.error('profiling requires the object or scheduled engine')
+    return options
 
 
 if __name__ == '__main__':  # pragma: no cover
-    main(sys.argv[1])
+    options = parse_args()
+    sys.exit(main(*options.paths, jobs=options.jobs, engine=options.engine, batch=options.batch,
+                  shared=options.shared, optimize=options.optimize, slice=options.slice, profile=options.profile,
+                  profile_output=options.profile_output, probes=options.probes, history=options.history,
+                  trace=options.trace, watch=options.watch, cache=options.cache))
@@ -0,0 +1,371 @@
+"""Import of Factorio blueprint strings as circuits, e.g. ``python -m factorioccn.blueprint file.txt``.
+
+A blueprint string is a version byte followed by the base64 of the zlib compressed JSON of a blueprint
+or a blueprint book, see ``decode``. ``build_circuit`` builds a ``Circuit`` directly from the entities of a
+blueprint, without generating fccn code:
+
+* each connection point of an entity and wire color is a node, and each red or green wire joins two nodes.
+  Nodes are merged into networks with union-find, so poles and other entities relay networks like in the game.
+  Each network becomes a ``Wire``, named after its color and its first node, e.g. ``red_3_1`` for the red
+  network at the input of entity 3 (``_2`` is the output side of a combinator)
+* decider, arithmetic and constant combinators become the respective combinators, reading from and outputting
+  to the networks connected to their input and output side. Other entities are not simulated
+
+Signals keep their names in the game, e.g. ``signal-A`` or ``iron-plate``, except for the wildcards which
+are named like in fccn. Both the connections of Factorio 1.1 and the wires of Factorio 2.0 are supported,
+but only the deciders of 2.0 with a single condition and output, and combinators reading or outputting
+both wire colors.
+Everything is done in a single pass over the entities, and books are decoded and imported one blueprint at
+a time, see ``load_book``.
+"""
+import argparse
+import base64
+import binascii
+import json
+import re
+import sys
+import zlib
+from collections.abc import Container, Iterator, Mapping
+from typing import Union
+
+from factorioccn.model.combinators import ArithmeticCombinator, Combinator, ConstantCombinator, DeciderCombinator
+from factorioccn.model.core import Frame, Wire
+from factorioccn.model.toplevel import Circuit
+
+VERSION = '0'
+"""the version byte of blueprint strings"""
+COLORS = ('red', 'green')
+WILDCARDS = {'signal-each': 'each', 'signal-everything': 'everything', 'signal-anything': 'anything'}
+"""wildcard signals by their name in the game"""
+COMPARATORS = {'>': '>', '<': '<', '=': '=', '≥': '>=', '≤': '<=', '≠': '!=', '>=': '>=', '<=': '<=', '!=': '!='}
+"""decider operations by their name in blueprints"""
+OPERATIONS = {'+': '+', '-': '-', '*': '*', '/': '/', '%': '%', '^': '**', '<<': '<<', '>>': '>>',
+              'AND': '&', 'OR': '|', 'XOR': '^'}
+"""arithmetic operations by their name in blueprints"""
+_WIRE_CONNECTORS = {1: (1, 'red'), 2: (1, 'green'), 3: (2, 'red'), 4: (2, 'green')}
+"""side and color of the wire connector ids of Factorio 2.0"""
+
+
+def _inflate(string: str) -> str:
+    """get the JSON text of a blueprint string, see ``decode``"""
+    string = string.strip()
+    if string[:1] != VERSION:
+        raise ValueError(f'unknown blueprint string version {string[:1]!r}')
+    try:
+        return zlib.decompress(base64.b64decode(string[1:], validate=True)).decode()
+    except (zlib.error, binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f'invalid blueprint string: {e}') from e
+
+
+def decode(string: str) -> dict:
+    """decode a blueprint string.
+
+    :param string: the blueprint string, surrounding whitespace is ignored
+    :return: the decoded JSON object, with a single key like ``blueprint`` or ``blueprint_book``
+    :raise ValueError: if the string is not a blueprint string of a known version
+    """
+    return json.loads(_inflate(string))
+
+
+def encode(data: Mapping) -> str:
+    """encode a JSON object as a blueprint string, the inverse of ``decode``"""
+    return VERSION + base64.b64encode(zlib.compress(json.dumps(data, separators=(',', ':')).encode(), 9)).decode()
+
+
+def _signal(signal: Union[Mapping, None]) -> Union[str, None]:
+    if signal is None:
+        return None
+    name = signal['name']
+    return WILDCARDS.get(name, name)
+
+
+class _Networks:
+    """union-find over the nodes of a blueprint, i.e. pairs of entity and side by color"""
+
+    def __init__(self):
+        self.index: dict[tuple[int, int, str], int] = {}
+        self.nodes: list[tuple[int, int, str]] = []
+        self.parent: list[int] = []
+
+    def node(self, entity: int, side: int, color: str) -> int:
+        key = entity, side, color
+        i = self.index.get(key)
+        if i is None:
+            i = self.index[key] = len(self.nodes)
+            self.nodes.append(key)
+            self.parent.append(i)
+        return i
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def join(self, a: tuple[int, int, str], b: tuple[int, int, str]) -> None:
+        a, b = self.find(self.node(*a)), self.find(self.node(*b))
+        # keep the smaller node as root, so each network is named after its first node
+        if self.nodes[a] < self.nodes[b]:
+            self.parent[b] = a
+        else:
+            self.parent[a] = b
+
+    def wires(self, entity: int, side: int, wires: dict[int, Wire]) -> list[Wire]:
+        """get the wires of the networks connected to a side of an entity, creating them if necessary"""
+        result = []
+        for color in COLORS:
+            i = self.index.get((entity, side, color))
+            if i is not None:
+                root = self.find(i)
+                wire = wires.get(root)
+                if wire is None:
+                    wire = wires[root] = Wire()
+                result.append(wire)
+        return result
+
+
+def _constant(behavior: Mapping) -> Frame:
+    signals = Frame()
+    if not behavior.get('is_on', True):
+        return signals
+    filters = behavior.get('filters', [])  # Factorio 1.1
+    sections = behavior.get('sections', {}).get('sections', [])  # Factorio 2.0
+    for section in sections:
+        if section.get('active', True):
+            filters = [*filters, *section.get('filters', [])]
+    for f in filters:
+        name = _signal(f['signal']) if 'signal' in f else f.get('name')
+        if name is not None:
+            signals[name] += f.get('count', 0)
+    return signals
+
+
+def _check_networks(entity: Mapping, settings: Mapping, *keys: str) -> None:
+    """check that the wire color filters of Factorio 2.0 include both colors, as the simulation can't exclude one"""
+    for key in keys:
+        networks = settings.get(key, {})
+        if not all(networks.get(color, True) for color in COLORS):
+            raise ValueError(f'{entity["name"].replace("-", " ")} {entity["entity_number"]} excludes a wire color '
+                             f'by {key}, which is not supported')
+
+
+def _decider(entity: Mapping, inputs: list[Wire], outputs: list[Wire]) -> Union[Combinator, None]:
+    conditions = entity.get('control_behavior', {}).get('decider_conditions', {})
+    if 'conditions' in conditions:  # Factorio 2.0
+        if len(conditions['conditions']) > 1 or len(conditions.get('outputs', [])) > 1:
+            raise ValueError(f'decider combinator {entity["entity_number"]} has several conditions or outputs, '
+                             'which are not supported')
+        condition = conditions['conditions'][0] if conditions['conditions'] else {}
+        output = conditions['outputs'][0] if conditions.get('outputs') else {}
+        _check_networks(entity, condition, 'first_signal_networks', 'second_signal_networks')
+        _check_networks(entity, output, 'networks')
+        output_signal = _signal(output.get('signal'))
+        copy = output.get('copy_count_from_input', True)
+        if not copy and output.get('constant', 1) != 1:
+            raise ValueError(f'decider combinator {entity["entity_number"]} outputs a constant other than 1, '
+                             'which is not supported')
+    else:
+        condition = conditions
+        output_signal = _signal(conditions.get('output_signal'))
+        copy = conditions.get('copy_count_from_input', True)
+    left = _signal(condition.get('first_signal'))
+    if left is None or output_signal is None:
+        return None  # not configured, so it never outputs anything
+    right = _signal(condition.get('second_signal'))
+    if right is None:
+        right = str(condition.get('constant', 0))
+    return DeciderCombinator(inputs, left, COMPARATORS[condition.get('comparator', '<')], right,
+                             output_signal, None if copy else 1, outputs)
+
+
+def _arithmetic(entity: Mapping, inputs: list[Wire], outputs: list[Wire]) -> Union[Combinator, None]:
+    conditions = entity.get('control_behavior', {}).get('arithmetic_conditions', {})
+    _check_networks(entity, conditions, 'first_signal_networks', 'second_signal_networks')
+    left = _signal(conditions.get('first_signal'))
+    output_signal = _signal(conditions.get('output_signal'))
+    if left is None:
+        if 'first_constant' in conditions:
+            raise ValueError(f'arithmetic combinator {entity["entity_number"]} has a constant left operand, '
+                             'which is not supported')
+        return None
+    if output_signal is None:
+        return None
+    right = _signal(conditions.get('second_signal'))
+    if right is None:
+        right = str(conditions.get('second_constant', 0))
+    return ArithmeticCombinator(inputs, left, OPERATIONS[conditions.get('operation', '*')], right,
+                                output_signal, outputs)
+
+
+def build_circuit(blueprint: Mapping) -> Circuit:
+    """build a circuit from a blueprint.
+
+    :param blueprint: the decoded blueprint, i.e. the value of the ``blueprint`` key of a decoded blueprint string
+    :return: the circuit of its combinators, which has no tests
+    :raise ValueError: if a combinator is configured in a way the simulation doesn't support
+    """
+    entities = blueprint.get('entities', [])
+    networks = _Networks()
+    for entity in entities:  # Factorio 1.1
+        number = entity['entity_number']
+        for side, colors in entity.get('connections', {}).items():
+            if not side.isdigit():  # copper wires of power switches
+                continue
+            for color in COLORS:
+                for target in colors.get(color, ()):
+                    networks.join((number, int(side), color), (target['entity_id'], target.get('circuit_id', 1), color))
+    for a, a_connector, b, b_connector in blueprint.get('wires', ()):  # Factorio 2.0
+        if a_connector in _WIRE_CONNECTORS and b_connector in _WIRE_CONNECTORS:  # not copper wires
+            networks.join((a, *_WIRE_CONNECTORS[a_connector]), (b, *_WIRE_CONNECTORS[b_connector]))
+    roots = {}
+    combinators = []
+    for entity in entities:
+        name = entity['name']
+        number = entity['entity_number']
+        if name == 'constant-combinator':
+            combinator = ConstantCombinator(_constant(entity.get('control_behavior', {})),
+                                            networks.wires(number, 1, roots))
+        elif name == 'decider-combinator':
+            combinator = _decider(entity, networks.wires(number, 1, roots), networks.wires(number, 2, roots))
+        elif name == 'arithmetic-combinator':
+            combinator = _arithmetic(entity, networks.wires(number, 1, roots), networks.wires(number, 2, roots))
+        else:
+            continue
+        if combinator is not None:
+            combinator.connect()
+            combinators.append(combinator)
+    wires = {}
+    for root, wire in sorted(roots.items(), key=lambda item: networks.nodes[item[0]]):
+        entity, side, color = networks.nodes[root]
+        wires[f'{color}_{entity}_{side}'] = wire
+    return Circuit(wires, combinators)
+
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+
+def _expect(text: str, pos: int, char: str) -> int:
+    """skip whitespace and the expected character, returning the position after it"""
+    pos = _whitespace.match(text, pos).end()
+    if text[pos:pos + 1] != char:
+        raise ValueError(f'invalid blueprint: expected {char!r} at {pos}')
+    return _whitespace.match(text, pos + 1).end()
+
+
+def _items(text: str, pos: int, close: str) -> Iterator[int]:
+    """iterate over the positions of the items of the JSON array or object starting at pos.
+
+    The generator must be sent the position after each item, and finally returns the position after the
+    array or object, see ``_object``.
+    """
+    pos = _expect(text, pos, '[' if close == ']' else '{')
+    while text[pos:pos + 1] != close:
+        pos = _whitespace.match(text, (yield pos)).end()
+        if text[pos:pos + 1] != close:
+            pos = _expect(text, pos, ',')
+    return pos + 1
+
+
+def _walk(text: str, pos: int, close: str, item) -> int:
+    """call item(pos) for each item of the JSON array or object at pos, which returns the position after it.
+
+    :return: the position after the array or object
+    """
+    items = _items(text, pos, close)
+    try:
+        pos = next(items)
+        while True:
+            pos = items.send(item(pos))
+    except StopIteration as stop:
+        return stop.value
+
+
+def _object(text: str, pos: int, lazy: Container[str]) -> tuple[dict, int]:
+    """decode the JSON object starting at pos, except for the values of the keys in lazy.
+
+    Lazy values are decoded to skip them, but only their positions are kept, so the memory needed
+    is that of the largest of them rather than all of them.
+
+    :return: the object, with positions as the values of lazy keys, and the position after it
+    """
+    result = {}
+
+    def member(pos):
+        key, pos = _decoder.raw_decode(text, pos)
+        pos = _expect(text, pos, ':')
+        value, end = _decoder.raw_decode(text, pos)
+        result[key] = pos if key in lazy else value
+        return end
+
+    return result, _walk(text, pos, '}', member)
+
+
+_ENTRIES = ('blueprint', 'blueprint_book')
+
+
+def _blueprints(text: str, data: Mapping, label: str = '') -> Iterator[tuple[str, Mapping]]:
+    """yield the blueprints of an object returned by ``_object``, decoding one at a time"""
+    if 'blueprint' in data:
+        blueprint = _decoder.raw_decode(text, data['blueprint'])[0]
+        yield blueprint.get('label', label), blueprint
+    elif 'blueprint_book' in data:
+        book, _ = _object(text, data['blueprint_book'], ('blueprints',))
+        label = book.get('label', label)
+        entries = []
+
+        def entry(pos):
+            data, pos = _object(text, pos, _ENTRIES)
+            entries.append(data)
+            return pos
+
+        if 'blueprints' in book:
+            _walk(text, book['blueprints'], ']', entry)
+        for entry in sorted(entries, key=lambda e: e.get('index', 0)):
+            yield from _blueprints(text, entry, f'{label}/{entry.get("index", 0)}')
+
+
+def load_book(string: str) -> Iterator[tuple[str, Circuit]]:
+    """import the blueprints of a blueprint string, which may also be a single blueprint.
+
+    The JSON text is decompressed at once, but blueprints are decoded from it and built one at a time
+    while iterating, so large books never have to be decoded or built at once.
+
+    :param string: the blueprint string
+    :return: pairs of the label of each blueprint and its circuit, in order. Blueprints without a label are
+        labelled by the label of their book and their index, e.g. ``book/3``. Nested books are flattened
+    :raise ValueError: if the string is invalid or a blueprint can't be imported, see ``build_circuit``
+    """
+    text = _inflate(string)
+    data, _ = _object(text, 0, _ENTRIES)
+    for label, blueprint in _blueprints(text, data):
+        yield label, build_circuit(blueprint)
+
+
+def load_blueprint(string: str) -> Circuit:
+    """import a blueprint string of a single blueprint.
+
+    :raise ValueError: if the string is invalid, is not a single blueprint, or can't be imported
+    """
+    data = decode(string)
+    if 'blueprint' not in data:
+        raise ValueError(f'not a single blueprint, but {", ".join(data)}')
+    return build_circuit(data['blueprint'])
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m factorioccn.blueprint',
+                                     description='Import the circuits of blueprint strings.')
+    parser.add_argument('files', nargs='+', metavar='file', help='files containing a blueprint string each')
+    options = parser.parse_args(args)
+    for file in options.files:
+        with open(file) as f:
+            for label, circuit in load_book(f.read()):
+                print(f'{file}: {label or "blueprint"}: {len(circuit.combinators)} combinators, '
+                      f'{len(circuit.wires)} wires')
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
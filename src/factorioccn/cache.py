@@ -0,0 +1,55 @@
+"""Location and helpers for the on-disk cache of factorioccn, e.g. for generated parsers.
+
+The cache lives in ``$FCCN_CACHE_DIR`` if set, otherwise in ``factorioccn`` below ``$XDG_CACHE_HOME``
+or ``~/.cache``. Everything in it is keyed by content hashes, so it is safe to delete at any time.
+Keys of cached results also include ``source_digest``, so they don't survive changes to factorioccn itself.
+"""
+import functools
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+
+def cache_dir(*parts: str) -> Path:
+    """get a directory in the cache, creating it if necessary.
+
+    :param parts: path components of the subdirectory
+    :return: the directory
+    """
+    base = os.environ.get('FCCN_CACHE_DIR')
+    if not base:
+        base = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'factorioccn'
+    path = Path(base, *parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """write a file so that concurrent readers either see the complete file or none at all.
+
+    :param path: the file to write
+    :param data: the full content
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+@functools.lru_cache(maxsize=None)
+def source_digest() -> str:
+    """hash the source code of factorioccn, i.e. its modules and grammar. Computed once per process.
+
+    :return: the hash as a hex string, which changes with any change to the code, even without a new version
+    """
+    package = Path(__file__).parent
+    digest = hashlib.sha256()
+    for path in sorted([*package.rglob('*.py'), *package.rglob('*.ebnf')]):
+        digest.update(f'{path.relative_to(package).as_posix()}\n'.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
@@ -0,0 +1,316 @@
+"""The compiled circuit format (``.fccnc``) and the build cache for fccn files.
+
+A compiled circuit stores a circuit as built from fccn code: its signal and wire names, the combinators
+with their connections, and the tests with their ticks. The layout is a fixed header followed by
+aligned sections of little-endian 64 bit integers and one section of NUL-separated UTF-8 strings,
+so a file can be memory-mapped and read without any parsing:
+
+* header: magic, format version and the (offset, count) of each section
+* strings: all names, referenced by index from the other sections
+* wires: the name of each wire
+* combinators: fixed-size records, see ``_COMBINATOR_FIELDS``. Instances of the same template combinator
+  refer to the record of the first of them, which holds the shared prototype, see ``InstanceCombinator``
+* wire refs: input and output wires of the combinators, as ranges of wire indices
+* entries: (name, value) pairs of constant frames and test operations
+* tests: (name, first tick, tick count) of each test
+* ticks: (tick, repeat count, first expect, expect count, first set, set count) of each run of test ticks,
+  see ``Timeline``
+* operations: (wire, first entry, entry count) of each test operation
+* imports: the paths imported by the source, see ``factorioccn.modules``
+
+``load_module`` uses this to cache built circuits, keyed by the hash of the source, the factorioccn version
+and the hash of its own source code, see ``cache.source_digest``.
+"""
+import hashlib
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Union
+
+from factorioccn import __version__
+from factorioccn.cache import cache_dir, source_digest
+from factorioccn.model.combinators import ArithmeticCombinator, ConstantCombinator, DeciderCombinator, \
+    InstanceCombinator
+from factorioccn.model.core import Frame, Wire, signal_table
+from factorioccn.model.testing import TestExpects, TestSets, Tick, Timeline
+from factorioccn.model.toplevel import Circuit, Test
+
+MAGIC = b'FCCNC\0\0\0'
+FORMAT_VERSION = 4
+SUFFIX = '.fccnc'
+
+_SECTIONS = ('strings', 'wires', 'combinators', 'wire_refs', 'entries', 'tests', 'ticks', 'operations', 'imports')
+_HEADER = struct.Struct('<8sQ' + 'QQ' * len(_SECTIONS))
+_COMBINATOR_FIELDS = ('kind', 'op', 'left', 'right', 'output', 'output_value',
+                      'inputs', 'input_count', 'outputs', 'output_count', 'entries', 'entry_count', 'prototype')
+_KINDS = (ConstantCombinator, ArithmeticCombinator, DeciderCombinator)
+_NONE = -1
+
+
+class ArtifactError(ValueError):
+    """Exception raised for files which are not a compiled circuit of the supported format version"""
+
+
+class _Writer:
+    def __init__(self):
+        self.strings = {}
+        self.sections = {name: array('q') for name in _SECTIONS[1:]}
+
+    def string(self, value) -> int:
+        if value is None:
+            return _NONE
+        value = str(value)
+        if value not in self.strings:
+            self.strings[value] = len(self.strings)
+        return self.strings[value]
+
+    def frame(self, frame: Frame) -> tuple[int, int]:
+        entries = self.sections['entries']
+        start = len(entries) // 2
+        for stype, value in frame.items():
+            entries.extend((self.string(stype), value))
+        return start, len(frame)
+
+    def wire_refs(self, wires, indices) -> tuple[int, int]:
+        refs = self.sections['wire_refs']
+        start = len(refs)
+        refs.extend(indices[id(wire)] for wire in wires)
+        return start, len(wires)
+
+    def operations(self, operations) -> tuple[int, int]:
+        section = self.sections['operations']
+        start = len(section) // 3
+        for operation in operations:
+            section.extend((self.string(operation.wire),) + self.frame(operation.values))
+        return start, len(operations)
+
+    def tobytes(self) -> bytes:
+        strings = '\0'.join(self.strings).encode()
+        strings += b'\0' * (-len(strings) % 8)
+        blobs = [strings] + [self.sections[name].tobytes() for name in _SECTIONS[1:]]
+        counts = [len(self.strings)] + [len(self.sections[name]) for name in _SECTIONS[1:]]
+        table = []
+        offset = _HEADER.size + (-_HEADER.size % 8)
+        for blob, count in zip(blobs, counts):
+            table += [offset, count]
+            offset += len(blob)
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, *table)
+        return header + b'\0' * (-_HEADER.size % 8) + b''.join(blobs)
+
+
+def dumps(circuit: Circuit) -> bytes:
+    """serialize a circuit as built by the parser to the compiled format.
+
+    :param circuit: the circuit, which may only contain decider, arithmetic and constant combinators
+    :return: the compiled circuit
+
+    :raise ValueError: if the circuit contains other combinators
+    :raise OverflowError: if a value does not fit into 64 bits
+    """
+    writer = _Writer()
+    indices = {}
+    for name, wire in circuit.wires.items():
+        indices[id(wire)] = len(indices)
+        writer.sections['wires'].append(writer.string(name))
+    prototypes = {}
+    for row, combinator in enumerate(circuit.combinators):
+        prototype = getattr(combinator, 'prototype', None)
+        kind = type(combinator if prototype is None else prototype)
+        if kind not in _KINDS:
+            raise ValueError(f'cannot compile {kind.__name__}')
+        record = dict.fromkeys(_COMBINATOR_FIELDS, _NONE)
+        record['kind'] = _KINDS.index(kind)
+        if prototype is not None:
+            record['prototype'] = prototypes.setdefault(id(prototype), row)
+        record['outputs'], record['output_count'] = writer.wire_refs(combinator.output_wires, indices)
+        if kind is ConstantCombinator:
+            record['entries'], record['entry_count'] = writer.frame(combinator.signals)
+        else:
+            record['inputs'], record['input_count'] = writer.wire_refs(combinator.input_wires, indices)
+            record['op'] = writer.string(combinator.op)
+            record['left'] = writer.string(combinator.left)
+            record['right'] = writer.string(combinator.right)
+            record['output'] = writer.string(combinator.output_signal)
+            if kind is DeciderCombinator:
+                record['output_value'] = _NONE if combinator.output_value is None else combinator.output_value
+        writer.sections['combinators'].extend(record.values())
+    for test in circuit.tests:
+        ticks = writer.sections['ticks']
+        runs = getattr(test._ticks, 'runs', test._ticks)
+        writer.sections['tests'].extend((writer.string(test._name), len(ticks) // 6, len(runs)))
+        for tick in runs:
+            ticks.extend((tick.tick, tick.count) + writer.operations(tick._expected) + writer.operations(tick._sets))
+    writer.sections['imports'].extend(writer.string(path) for path in circuit.imports)
+    return writer.tobytes()
+
+
+def loads(data: Union[bytes, memoryview, mmap.mmap]) -> Circuit:
+    """create a circuit from the compiled format.
+
+    :param data: the compiled circuit, e.g. memory-mapped from a file
+    :return: the circuit
+
+    :raise ArtifactError: if data is not a compiled circuit of the supported format version
+    """
+    with memoryview(data) as view:
+        if len(view) < _HEADER.size:
+            raise ArtifactError('truncated compiled circuit')
+        magic, version, *table = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ArtifactError(f'not a compiled circuit of format version {FORMAT_VERSION}')
+        strings_offset, string_count = table[0], table[1]
+        sections = {}
+        for name, offset, count in zip(_SECTIONS[1:], table[2::2], table[3::2]):
+            sections[name] = _integers(view, offset, count)
+        strings = bytes(view[strings_offset:table[2]]).rstrip(b'\0').decode().split('\0')[:string_count]
+    return _build(strings, sections)
+
+
+def _integers(view: memoryview, offset: int, count: int) -> list[int]:
+    """read a section of little-endian 64 bit integers"""
+    data = view[offset:offset + count * 8]
+    try:
+        if len(data) != count * 8:
+            raise ArtifactError('truncated compiled circuit')
+        if sys.byteorder == 'little':
+            with data.cast('q') as integers:
+                return integers.tolist()
+        integers = array('q', data.tobytes())
+        integers.byteswap()
+        return integers.tolist()
+    finally:
+        data.release()
+
+
+def _build(strings, sections) -> Circuit:
+    """create the circuit from the decoded sections, see ``loads``"""
+    def string(index):
+        return None if index == _NONE else strings[index]
+
+    entries = sections['entries']
+    intern = signal_table.intern
+
+    def frame(start, count):
+        return Frame.from_ids({intern(strings[entries[2 * i]]): entries[2 * i + 1]
+                               for i in range(start, start + count)})
+
+    wires = {}
+    for name in sections['wires']:
+        wires[strings[name]] = Wire()
+    wire_list = list(wires.values())
+    refs = sections['wire_refs']
+
+    def wire_refs(start, count):
+        return [wire_list[i] for i in refs[start:start + count]]
+
+    combinators = []
+    prototypes = {}
+    records = sections['combinators']
+    size = len(_COMBINATOR_FIELDS)
+    for row, i in enumerate(range(0, len(records), size)):
+        kind, op, left, right, output, output_value, inputs, input_count, outputs, output_count, first, count, \
+            prototype = records[i:i + size]
+        kind = _KINDS[kind]
+        input_wires = [] if kind is ConstantCombinator else wire_refs(inputs, input_count)
+        output_wires = wire_refs(outputs, output_count)
+        if prototype == _NONE or prototype == row:
+            # the prototype of template instances isn't connected to any wires
+            bound = (input_wires, output_wires) if prototype == _NONE else ([], [])
+            if kind is ConstantCombinator:
+                combinator = ConstantCombinator(frame(first, count), bound[1])
+            elif kind is ArithmeticCombinator:
+                combinator = ArithmeticCombinator(bound[0], string(left), string(op), string(right), string(output),
+                                                  bound[1])
+            else:
+                combinator = DeciderCombinator(bound[0], string(left), string(op), string(right), string(output),
+                                               None if output_value == _NONE else output_value, bound[1])
+            if prototype == row:
+                prototypes[row] = combinator
+        if prototype != _NONE:
+            combinator = InstanceCombinator(prototypes[prototype], input_wires, output_wires)
+        combinator.connect()
+        combinators.append(combinator)
+    circuit = Circuit(wires, combinators)
+    operations = sections['operations']
+
+    def operation_list(cls, start, count):
+        return [cls(strings[operations[3 * i]], frame(operations[3 * i + 1], operations[3 * i + 2]))
+                for i in range(start, start + count)]
+
+    ticks = sections['ticks']
+    tests = sections['tests']
+    for i in range(0, len(tests), 3):
+        name, first, count = tests[i:i + 3]
+        test_ticks = []
+        for j in range(first, first + count):
+            tick, repeat, expects, expect_count, sets, set_count = ticks[6 * j:6 * j + 6]
+            test_ticks.append(Tick(tick, operation_list(TestExpects, expects, expect_count),
+                                   operation_list(TestSets, sets, set_count), repeat))
+        circuit.tests.append(Test(strings[name], circuit, Timeline(test_ticks)))
+    circuit.imports = [strings[path] for path in sections['imports']]
+    return circuit
+
+
+def save(circuit: Circuit, path: Union[str, Path]) -> None:
+    """write a circuit to a compiled circuit file, see ``dumps``"""
+    Path(path).write_bytes(dumps(circuit))
+
+
+def load(path: Union[str, Path]) -> Circuit:
+    """memory-map and load a compiled circuit file, see ``loads``"""
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return loads(data)
+
+
+def cache_key(source: bytes) -> str:
+    """get the key of fccn source code in the build cache"""
+    digest = hashlib.sha256(f'{__version__}\n{source_digest()}\n{FORMAT_VERSION}\n'.encode())
+    digest.update(source)
+    return digest.hexdigest()
+
+
+def load_source(path: Union[str, Path], use_cache: bool = True) -> Circuit:
+    """load an fccn file and the files it imports, using the build cache to skip parsing unchanged files.
+
+    Compiled circuit files, i.e. files ending with ``SUFFIX``, are loaded directly.
+
+    :param path: the file to load
+    :param use_cache: whether to look up and store the circuits in the build cache
+    :return: the circuit, linked with the circuits of all imported files, see ``factorioccn.modules.load_project``
+    """
+    from factorioccn.modules import load_project
+    return load_project(path, use_cache)
+
+
+def load_module(path: Union[str, Path], use_cache: bool = True) -> Circuit:
+    """load a single fccn file, using the build cache to skip parsing it if unchanged. Imports are not resolved.
+
+    Compiled circuit files, i.e. files ending with ``SUFFIX``, are loaded directly.
+
+    :param path: the file to load
+    :param use_cache: whether to look up and store the circuit in the build cache
+    :return: the circuit
+    """
+    path = Path(path)
+    if path.suffix == SUFFIX:
+        return load(path)
+    source = path.read_bytes()
+    cached = None
+    if use_cache:
+        try:
+            cached = cache_dir('circuits') / (cache_key(source) + SUFFIX)
+            return load(cached)
+        except (OSError, ValueError):
+            pass
+    from factorioccn.parser import parse
+    circuit = parse(source.decode())
+    if cached is not None:
+        from factorioccn.cache import write_atomic
+        try:
+            write_atomic(cached, dumps(circuit))
+        except (OSError, ValueError, OverflowError):
+            pass  # not cacheable, e.g. values too large
+    return circuit
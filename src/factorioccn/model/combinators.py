@@ -1,8 +1,8 @@
 from collections.abc import Sequence
-from functools import reduce
 from typing import Any
 
-from factorioccn.model.core import Frame, Wire
+from factorioccn.model.core import Frame, Wire, signal_table
+from factorioccn.model.kernels import arithmetic_kernel, constant, decider_kernel, signal_mode
 
 
 class Combinator:
@@ -11,6 +11,7 @@ class Combinator:
     This already handles input from wires and most of the tick simulation.
     Subclasses are required to implement ``process``.
     """
+    __slots__ = ('input', 'output_wires')
 
     def __init__(self, output_wires: Sequence[Wire]):
         self.input = Frame()
@@ -18,6 +19,11 @@ class Combinator:
         self.output_wires = output_wires
         """wires to which ``Combinator.tick`` outputs"""
 
+    def connect(self):
+        """add this combinator to the inputs and outputs of the wires it is connected to"""
+        for wire in self.output_wires:
+            wire.inputs.append(self)
+
     def tick(self):
         """The combinators half of circuit simulation."""
         output = self.process(self.input)
@@ -61,12 +67,19 @@ class BinaryCombinator(Combinator):
         self.input_wires = input_wires
         self.left = left
         self.right = right
+        self.right_value = constant(right)
+        """the right operand as an integer constant, or None if it is a signal"""
         if left == 'each':
             self.select_inputs = lambda input: (
                 {s: input[s] for s in input}, BinaryCombinator.process_arg(input, right))
         else:
             self.select_inputs = lambda input: ({left: input[left]}, BinaryCombinator.process_arg(input, right))
 
+    def connect(self):
+        super().connect()
+        for wire in self.input_wires:
+            wire.outputs.append(self)
+
     def select_inputs(self, input: Frame):
         """extract arguments from an input frame according to ``left`` and ``right``
 
@@ -89,6 +102,17 @@ class BinaryCombinator(Combinator):
             return input[arg]
 
 
+def _kernel_args(combinator: BinaryCombinator) -> tuple:
+    """resolve the operands of a combinator to the arguments of its kernel, see ``factorioccn.model.kernels``"""
+    left = signal_table.intern(combinator.left) if combinator.left_mode == 'signal' else -1
+    if combinator.right_value is not None:
+        right = combinator.right_value
+    else:
+        right = signal_table.intern(combinator.right)
+    output = signal_table.intern(combinator.output_signal) if combinator.output_mode == 'signal' else left
+    return left, right, output
+
+
 class DeciderCombinator(BinaryCombinator):
     """Simulate a decider combinator, that is a combinator performing certain logic operations."""
     operations = {
@@ -116,67 +140,18 @@ class DeciderCombinator(BinaryCombinator):
         self.op = op
         self.output_signal = output_signal
         self.output_value = output_value
-        self._operation = DeciderCombinator.operations[op]
-        self._shortcircuit = left == 'everything' or left not in ('anything', 'everything', 'each')
-        self._determine_aggpasses(left)
-        self._determine_accsignal(left, output_signal)
-        self._determine_dataselects(right)
-
-    def _determine_aggpasses(self, left):
-        if self._shortcircuit:
-            self._aggpasses = lambda passes, cmp: passes and cmp
-        elif left == 'anything':
-            self._aggpasses = lambda passes, cmp: passes or cmp
-        else:
-            self._aggpasses = lambda _, __: True
-
-    def _determine_accsignal(self, left, output_signal):
-        if self.output_signal == 'each':
-            self._accsignal = lambda stype, rval, cmp: Frame({stype: rval}) if cmp else Frame()
-        elif self.output_signal == 'everything':
-            self._accsignal = lambda stype, rval, _: Frame({stype: rval})
-        elif self.output_signal == 'anything':
-            self._accsignal = lambda stype, rval, cmp: Frame({stype: rval}) if cmp else Frame()
-        elif left == 'each':
-            self._accsignal = lambda __, rval, cmp: Frame({output_signal: rval}) if cmp else Frame()
-        else:
-            self._accsignal = lambda stype, rval, _: Frame({stype: rval}) if stype == output_signal else Frame()
-
-    def _determine_dataselects(self, right):
-        if self.left in ('everything', 'anything'):
-            self.select_inputs = lambda input: (
-                {s: input[s] for s in input if s != right}, BinaryCombinator.process_arg(input, right))
-        if self.output_signal in ('each', 'anything'):
-            self._select_iter = lambda _, left: left
-        elif self.output_signal == 'everything':
-            self._select_iter = lambda input, _: input
-        else:
-            self._select_iter = lambda input, left: {**left, self.output_signal: input[self.output_signal]}
+        self.left_mode = signal_mode(left)
+        self.output_mode = signal_mode(output_signal)
+        self._kernel = decider_kernel(op, self.left_mode, self.right_value is not None, self.output_mode,
+                                      output_value is not None)
+        self._args = _kernel_args(self)
 
-    def _select_data(self, input):
-        (left, right) = self.select_inputs(input)
-        return left, right, self._select_iter(input, left)
+    def __str__(self):
+        return f'{self.left} {self.op} {self.right} : {self.output_signal}{"" if self.output_value is None else "=1"}'
 
     def process(self, input):
-        (left, right, iter) = self._select_data(input)
-        output = Frame()
-        passes = True
-        for stype, value in iter.items():
-            if stype in left.keys():
-                cmp = self._operation(value, right)
-                passes = self._aggpasses(passes, cmp)
-                if not passes and self._shortcircuit:
-                    break
-            else:
-                cmp = True
-            rval = value if self.output_value is None else self.output_value
-            output += self._accsignal(stype, rval, cmp)
-            if self.output_signal == 'anything' and cmp:
-                break  # TODO: proper ordering of signals!
-        if passes:
-            return output
-        else:
-            return Frame()
+        # noinspection PyProtectedMember
+        return Frame.from_ids(self._kernel(input._values, *self._args))
 
 
 class ArithmeticCombinator(BinaryCombinator):
@@ -209,15 +184,17 @@ class ArithmeticCombinator(BinaryCombinator):
         super().__init__(input_wires, left, right, output_wires)
         self.op = op
         self.output_signal = output_signal
-        self._operation = ArithmeticCombinator.operations[op]
+        self.left_mode = 'each' if left == 'each' else 'signal'
+        self.output_mode = 'each' if output_signal == 'each' else 'signal'
+        self._kernel = arithmetic_kernel(op, self.left_mode, self.right_value is not None, self.output_mode)
+        self._args = _kernel_args(self)
+
+    def __str__(self):
+        return f'{self.output_signal} = {self.left} {self.op} {self.right}'
 
     def process(self, input):
-        (left, right) = self.select_inputs(input)
-        intermediate = {x: self._operation(left[x], right) for x in left}
-        if self.output_signal == 'each':
-            return Frame(intermediate)
-        else:
-            return Frame({self.output_signal: reduce(lambda a, b: a + b, intermediate.values())})
+        # noinspection PyProtectedMember
+        return Frame.from_ids(self._kernel(input._values, *self._args))
 
 
 class ConstantCombinator(Combinator):
@@ -232,5 +209,80 @@ class ConstantCombinator(Combinator):
         super().__init__(output_wires)
         self.signals = signals
 
+    def __str__(self):
+        return '{' + ', '.join(f'{stype}:{value}' for stype, value in self.signals.items()) + '}'
+
     def process(self, _):
         return self.signals
+
+
+class SequenceCombinator(Combinator):
+    """simulate a fixed sequence of output frames, indexed by the value of a counter signal on the input.
+
+    This has no counterpart in the game. It is created by ``factorioccn.optimizer`` to replace parts of a circuit
+    with constant input, including the output they produce until their input has settled.
+    """
+
+    def __init__(self, input_wires: Sequence[Wire], signal: str, frames: Sequence[Frame],
+                 output_wires: Sequence[Wire]):
+        """create a sequence combinator
+
+        :param input_wires: wires connected as an input to this combinator, see ``BinaryCombinator.input_wires``
+        :param signal: the counter signal. Values beyond the last frame output the last frame
+        :param frames: the frame to output for each value of the counter, starting at 0
+        :param output_wires: wires to output to, see ``Combinator.output_wires``
+        """
+        super().__init__(output_wires)
+        self.input_wires = input_wires
+        self.signal = signal
+        self.frames = frames
+
+    def connect(self):
+        super().connect()
+        for wire in self.input_wires:
+            wire.outputs.append(self)
+
+    def __str__(self):
+        return f'sequence of {len(self.frames)} frames by {self.signal}'
+
+    def process(self, input):
+        return self.frames[max(min(input[self.signal], len(self.frames) - 1), 0)]
+
+
+class InstanceCombinator(Combinator):
+    """a combinator of a template instance, sharing everything but its wires and input with the template.
+
+    The configuration, e.g. the operation and its kernel, is built once per template as a ``prototype``
+    and looked up there for every instance, so an instance only stores its own wires and input.
+    See ``factorioccn.model.toplevel.Template``.
+    """
+    __slots__ = ('prototype', 'input_wires')
+
+    def __init__(self, prototype: Combinator, input_wires: Sequence[Wire], output_wires: Sequence[Wire]):
+        """create a combinator instance
+
+        :param prototype: the combinator of the template, which isn't connected to any wires
+        :param input_wires: wires connected as an input to this combinator, empty for constant combinators
+        :param output_wires: wires to output to, see ``Combinator.output_wires``
+        """
+        self.prototype = prototype
+        self.input = Frame()
+        self.input_wires = input_wires
+        self.output_wires = output_wires
+
+    def __getattr__(self, name):
+        # only called for attributes which aren't slots, e.g. the operands of the prototype
+        if name == 'prototype':  # not set yet, e.g. while copying
+            raise AttributeError(name)
+        return getattr(self.prototype, name)
+
+    def connect(self):
+        super().connect()
+        for wire in self.input_wires:
+            wire.outputs.append(self)
+
+    def __str__(self):
+        return str(self.prototype)
+
+    def process(self, input):
+        return self.prototype.process(input)
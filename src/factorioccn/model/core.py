@@ -1,27 +1,202 @@
-from collections import UserDict
-from collections.abc import MutableSequence
+from collections.abc import ItemsView, Mapping, MutableMapping, MutableSequence, ValuesView
 
+WILDCARDS = ('each', 'everything', 'anything')
+"""signal types which are wildcards rather than actual signals"""
 
-class Frame(UserDict[str, int]):
+
+class SignalTable:
+    """interning table which maps signal names to small, dense integer ids
+
+    ``Frame``s store their values keyed by these ids, so a signal name only needs to be hashed
+    when crossing the ``Mapping`` API. Names are interned while building a circuit,
+    so the ids of a circuits signals are usually assigned in order of their appearance in the code.
+    """
+    __slots__ = ('ids', 'names')
+
+    def __init__(self):
+        self.ids: MutableMapping[str, int] = {}
+        """signal name to id"""
+        self.names: MutableSequence[str] = []
+        """signal id to name"""
+
+    def intern(self, name: str) -> int:
+        """get the id of a signal name, assigning a new one if it is not yet known
+
+        :param name: the signal name
+        :return: the signal id
+        """
+        sid = self.ids.get(name)
+        if sid is None:
+            sid = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return sid
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+signal_table = SignalTable()
+"""the process-wide ``SignalTable`` used by all ``Frame``s"""
+
+
+class _FrameItems(ItemsView):
+    __slots__ = ()
+
+    def __iter__(self):
+        names = signal_table.names
+        for sid, value in self._mapping._values.items():
+            yield names[sid], value
+
+
+class _FrameValues(ValuesView):
+    __slots__ = ()
+
+    def __iter__(self):
+        return iter(self._mapping._values.values())
+
+
+class Frame(MutableMapping[str, int]):
     """represents a 'frame' of signals, e.g. the signals carried on a wire in a single tick
 
-    This extends UserDict to create a MutableMapping[str,int] that simulates signal behaviour.
+    This is a MutableMapping[str,int] that simulates signal behaviour.
     Specifically, Frames can be added, and return 0 for a missing key.
+    Internally, values are kept in a sparse mapping of interned signal ids (see ``SignalTable``).
+    Adding frames drops signals which sum up to 0, as those do not exist on an actual wire.
+    Signals explicitly assigned a 0 are kept though, as e.g. test expectations need them.
+    Comparison treats a missing signal as equal to 0.
+    Frames can share their values copy-on-write, see ``share``.
     """
+    __slots__ = ('_values', '_shared')
 
-    def __iadd__(self, other):
-        for key in list(other):
-            if key not in self.keys():
-                self[key] = 0
-            self[key] += other[key]
-        return self
+    def __init__(self, signals: Mapping[str, int] = None):
+        """create a frame
+
+        :param signals: initial signals, copied into the new frame
+        """
+        if signals is None:
+            self._values = {}
+        elif isinstance(signals, Frame):
+            self._values = signals._values.copy()
+        else:
+            intern = signal_table.intern
+            self._values = {intern(stype): value for stype, value in signals.items()}
+        self._shared = False
+
+    @classmethod
+    def from_ids(cls, values: MutableMapping[int, int]) -> 'Frame':
+        """wrap a dict of signal ids to values as a frame, without copying it
 
-    def __getitem__(self, key: str):
+        :param values: the signal values by id, owned by the new frame afterwards
+        :return: the new frame
+        """
+        frame = cls.__new__(cls)
+        frame._values = values
+        frame._shared = False
+        return frame
+
+    def share(self) -> 'Frame':
+        """create a frame with the same signals in constant time.
+
+        Both frames share their values until either one is modified, which then copies them first.
+        """
+        frame = Frame.from_ids(self._values)
+        frame._shared = self._shared = True
+        return frame
+
+    def _own(self) -> dict[int, int]:
+        """get the values for modification, copying them first if they are shared"""
+        if self._shared:
+            self._values = self._values.copy()
+            self._shared = False
+        return self._values
+
+    def __getitem__(self, key: str) -> int:
         """return 0 if key not in self instead of raising KeyError"""
-        try:
-            return super().__getitem__(key)
-        except KeyError:
+        sid = signal_table.ids.get(key)
+        if sid is None:
             return 0
+        return self._values.get(sid, 0)
+
+    def __setitem__(self, key: str, value: int) -> None:
+        self._own()[signal_table.intern(key)] = value
+
+    def __delitem__(self, key: str) -> None:
+        sid = signal_table.ids.get(key)
+        if sid is None or sid not in self._values:
+            raise KeyError(key)
+        del self._own()[sid]
+
+    def __contains__(self, key) -> bool:
+        sid = signal_table.ids.get(key)
+        return sid is not None and sid in self._values
+
+    def __iter__(self):
+        names = signal_table.names
+        return (names[sid] for sid in self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def items(self):
+        return _FrameItems(self)
+
+    def values(self):
+        return _FrameValues(self)
+
+    def clear(self) -> None:
+        if self._shared:
+            self._values = {}
+            self._shared = False
+        else:
+            self._values.clear()
+
+    def copy(self):
+        """create a shallow copy of this frame"""
+        return Frame.from_ids(self._values.copy())
+
+    def digest(self) -> int:
+        """hash the current signals, independent of their order. Signals explicitly set to 0 are included."""
+        return hash(frozenset(self._values.items()))
+
+    def __iadd__(self, other: Mapping[str, int]):
+        values = self._own() if self._shared else self._values
+        if isinstance(other, Frame):
+            pairs = other._values.items()
+        else:
+            intern = signal_table.intern
+            pairs = [(intern(stype), value) for stype, value in other.items()]
+        for sid, value in pairs:
+            total = values.get(sid, 0) + value
+            if total:
+                values[sid] = total
+            else:
+                values.pop(sid, None)
+        return self
+
+    def __add__(self, other: Mapping[str, int]):
+        result = self.copy()
+        result += other
+        return result
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Frame):
+            mine = self._values
+            theirs = other._values
+            return all(theirs.get(sid, 0) == value for sid, value in mine.items()) and \
+                all(mine.get(sid, 0) == value for sid, value in theirs.items())
+        if isinstance(other, Mapping):
+            return all(other.get(stype, 0) == value for stype, value in self.items()) and \
+                all(self[stype] == value for stype, value in other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # pickle by signal name, as signal ids differ between processes
+        return Frame, (dict(self.items()),)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
 
 
 class Wire:
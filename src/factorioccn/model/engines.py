@@ -0,0 +1,313 @@
+"""Simulation engines, i.e. the strategies a ``Circuit`` uses to simulate ticks.
+
+Engines are selected by name from ``engines`` or given as an ``Engine`` subclass,
+see ``Circuit.use_engine``. Engines which keep their own state must leave the circuits ``Wire.signals``
+up-to-date whenever ``Engine.tick`` returns, as tests read and write those in between ticks.
+"""
+from collections.abc import Callable, MutableSequence, Sequence
+from importlib import import_module
+from typing import Union
+
+from factorioccn.model.core import Frame
+
+engines = {
+    'object': 'factorioccn.model.engines.ObjectEngine',
+    'scheduled': 'factorioccn.model.engines.ScheduledEngine',
+    'vectorized': 'factorioccn.model.vectorized.VectorEngine',
+}
+"""known engines by name, mapped to the qualified name of their class"""
+
+
+class Engine:
+    """base class for all simulation engines
+
+    Subclasses implement ``_step`` to simulate a single tick. Simulating a sequence of ticks is bracketed
+    by ``_begin`` and ``_end``, which can be used to e.g. synchronize internal state with the wires.
+    """
+
+    period_search: Union[int, None] = 256
+    """ticks ``fast_forward`` looks for a period before giving up, as ``_digest`` still has to compare the whole
+    state with the last one unless the engine tracks changed wires itself. None looks for a period in all ticks"""
+
+    def __init__(self, circuit):
+        """create an engine for a specific circuit.
+
+        :param circuit: the ``Circuit`` to simulate
+        """
+        self.circuit = circuit
+        self._wires = list(circuit.wires.values())
+        """the wires of the circuit in order, see ``frame``"""
+        self._digested = None
+        """the state the last ``_digest`` was computed from, in a format specific to the engine"""
+
+    def tick(self, n: int = 1, record: Union[Callable[[], None], None] = None) -> None:
+        """simulate the circuit for n ticks.
+
+        :param n: amount of ticks to simulate
+        :param record: called after each tick, e.g. to record probes with ``frame`` and ``read``.
+            This is cheaper than simulating one tick at a time, which synchronizes the wires each time
+        """
+        self._begin()
+        if record is None:
+            for i in range(n):
+                self._step()
+        else:
+            for i in range(n):
+                self._step()
+                record()
+        self._end()
+
+    def frame(self, index: int) -> Frame:
+        """get the current signals of a wire from within the ``record`` callback of ``tick``.
+
+        :param index: index of the wire in ``Circuit.wires``
+        :return: the signals, which may share their values with the wire copy-on-write
+        """
+        return self._wires[index].signals.share()
+
+    def read(self, index: int, ids: Sequence[int], buffer: MutableSequence[int], offset: int) -> None:
+        """write the current values of some signals of a wire into a buffer, like ``frame``.
+
+        :param index: index of the wire in ``Circuit.wires``
+        :param ids: the ids of the signals, see ``signal_table``
+        :param buffer: the buffer, e.g. an ``array``, whose items from offset on are overwritten
+        :param offset: index in the buffer of the value of the first signal
+        """
+        # noinspection PyProtectedMember
+        values = self._wires[index].signals._values
+        for i, sid in enumerate(ids):
+            buffer[offset + i] = values.get(sid, 0)
+
+    def fast_forward(self, n: int) -> int:
+        """simulate the circuit for n ticks like ``tick``, but stop simulating once the state is periodic.
+
+        The digest of the state is checked for repetitions with Brent's algorithm, so this needs constant memory.
+        A repetition is verified by simulating one more period and comparing the actual state.
+        Afterwards, only the remaining ticks modulo the period are simulated,
+        so the cost is bound by the length of the transient and the period, rather than n.
+        If no period was found within ``period_search`` ticks or a sixteenth of n, whichever is less,
+        the remaining ticks are simulated without hashing, so circuits which aren't periodic pay little for the search.
+
+        :param n: amount of ticks to simulate
+        :return: amount of ticks which actually were simulated
+        """
+        self._begin()
+        t = 0
+        simulated = 0
+        saved = self._digest()
+        power = 1
+        distance = 0
+        limit = n if self.period_search is None else min(self.period_search, n // 16)
+        while t < n:
+            if t >= limit:
+                for i in range(n - t):
+                    self._step()
+                simulated += n - t
+                break
+            self._step()
+            t += 1
+            simulated += 1
+            distance += 1
+            digest = self._digest()
+            if digest == saved and n - t >= distance:
+                state = self._capture()
+                for i in range(distance):
+                    self._step()
+                t += distance
+                simulated += distance
+                if self._matches(state):
+                    t = n - (n - t) % distance
+                saved = self._digest()
+                power = 1
+                distance = 0
+            elif distance == power:
+                saved = digest
+                power *= 2
+                distance = 0
+        self._end()
+        return simulated
+
+    def _begin(self) -> None:
+        """prepare simulating a sequence of ticks"""
+
+    def _end(self) -> None:
+        """finish simulating a sequence of ticks, e.g. by updating the wires"""
+
+    def _step(self) -> None:  # pragma: no cover
+        """Abstract method to simulate a single tick.
+
+        :raise NotImplementedError: if not overwritten in a derived class
+        """
+        raise NotImplementedError("Engine._step")
+
+    def _digest(self) -> int:
+        """hash the current state, i.e. the signals on all wires.
+
+        The digest is the sum of the digests of the wires, which are only recomputed for wires whose signals
+        changed since the last call, so an unchanged wire costs a comparison of its signals rather than hashing them.
+        """
+        wires = self._wires
+        digested = self._digested
+        if digested is None or len(digested) != len(wires):
+            digested = self._digested = [None] * len(wires)
+            self._wire_digests = [0] * len(wires)
+            self._state_digest = 0
+        for index, wire in enumerate(wires):
+            signals = wire.signals
+            previous = digested[index]
+            # noinspection PyProtectedMember
+            if previous is None or signals._values != previous._values:
+                digest = _wire_digest(index, signals)
+                self._state_digest = (self._state_digest + digest - self._wire_digests[index]) & _MASK
+                self._wire_digests[index] = digest
+                digested[index] = signals.share()
+        return self._state_digest
+
+    def _capture(self):
+        """copy the current state for use with ``_matches``"""
+        return [wire.signals.copy() for wire in self.circuit.wires.values()]
+
+    def _matches(self, state) -> bool:
+        """check whether the current state equals a state returned by ``_capture``"""
+        return all(wire.signals == signals for wire, signals in zip(self.circuit.wires.values(), state))
+
+
+_MASK = (1 << 64) - 1
+
+
+def _wire_digest(index: int, signals: Frame) -> int:
+    return hash((index, signals.digest()))
+
+
+class ObjectEngine(Engine):
+    """the reference engine, which ticks every ``Wire`` and ``Combinator`` object in turn"""
+
+    def _begin(self):
+        self._wires = list(self.circuit.wires.values())
+
+    def _step(self):
+        for wire in self._wires:
+            wire.tick()
+        for combinator in self.circuit.combinators:
+            combinator.tick()
+
+
+class ScheduledEngine(Engine):
+    """an event-driven engine, which only evaluates combinators whose input changed since their last evaluation.
+
+    Combinators with unchanged input keep their last output, and a wire is only updated
+    if one of the combinators outputting to it changed its output. So the cost of a tick scales with
+    the activity in the circuit rather than its size, e.g. a ``ConstantCombinator`` is evaluated exactly once.
+    Changes to ``Wire.signals`` made in between calls to ``tick`` are detected by comparing all wires once per call.
+    """
+
+    period_search = None  # the digest is updated along with the changed wires
+
+    def __init__(self, circuit):
+        super().__init__(circuit)
+        wires = list(circuit.wires.values())
+        order = {wire: i for i, wire in enumerate(wires)}
+        self._combinator_inputs = {}
+        """input wires of each combinator, in the order the ``ObjectEngine`` would sum them up"""
+        self._readers = {wire: {} for wire in wires}
+        """combinators using each wire as input, as an ordered set"""
+        self._drivers = {wire: [] for wire in wires}
+        """combinators outputting to each wire"""
+        for combinator in circuit.combinators:
+            inputs = sorted(getattr(combinator, 'input_wires', ()), key=order.__getitem__)
+            self._combinator_inputs[combinator] = inputs
+            for wire in inputs:
+                self._readers[wire][combinator] = None
+            for wire in combinator.output_wires:
+                self._drivers[wire].append(combinator)
+        self._inputs = {}
+        """the input each combinator was last evaluated with"""
+        self._outputs = {}
+        """the last output of each combinator"""
+        self._driven = {wire: Frame() for wire in wires}
+        """the signals of each wire as of the end of the last tick"""
+        self._fresh = list(circuit.combinators)
+        """combinators which were never evaluated"""
+        self._changed = dict.fromkeys(wires)
+        """wires whose signals changed during the last tick, as an ordered set"""
+        self._pending = dict.fromkeys(wires)
+        """wires which need to be recomputed from their drivers, as an ordered set"""
+        self._index = order
+        self._wire_digests = {wire: _wire_digest(i, Frame()) for wire, i in order.items()}
+        """digest of each wires signals, see ``Engine._digest``"""
+        self._state_digest = sum(self._wire_digests.values()) & _MASK
+
+    def _update_digest(self, wire, signals: Frame) -> None:
+        digest = _wire_digest(self._index[wire], signals)
+        self._state_digest = (self._state_digest + digest - self._wire_digests[wire]) & _MASK
+        self._wire_digests[wire] = digest
+
+    def _begin(self) -> None:
+        """find wires which were changed from outside since the last tick"""
+        for wire, driven in self._driven.items():
+            if wire.signals != driven:
+                self._changed[wire] = None
+                self._pending[wire] = None
+                self._update_digest(wire, wire.signals)
+
+    def _evaluate(self, combinator) -> None:
+        input = Frame()
+        for wire in self._combinator_inputs[combinator]:
+            input += wire.signals
+        previous = self._inputs.get(combinator)
+        if previous is not None and input == previous:
+            return
+        self._inputs[combinator] = input
+        output = combinator.process(input)
+        if output != self._outputs.get(combinator, {}):
+            self._outputs[combinator] = output
+            for wire in combinator.output_wires:
+                self._pending[wire] = None
+
+    def _step(self) -> None:
+        candidates = {}
+        for wire in self._changed:
+            candidates.update(self._readers[wire])
+        fresh = self._fresh
+        if fresh:
+            candidates.update(dict.fromkeys(fresh))
+            self._fresh = []
+        for combinator in candidates:
+            self._evaluate(combinator)
+        changed = {}
+        outputs = self._outputs
+        for wire in self._pending:
+            signals = Frame()
+            for combinator in self._drivers[wire]:
+                output = outputs.get(combinator)
+                if output is not None:
+                    signals += output
+            if signals != wire.signals:
+                wire.signals.clear()
+                wire.signals += signals
+                changed[wire] = None
+                self._update_digest(wire, signals)
+            self._driven[wire] = signals
+        self._changed = changed
+        self._pending = {}
+
+    def _digest(self) -> int:
+        """the digest is updated incrementally with each wire that changes"""
+        return self._state_digest
+
+
+def engine_class(engine: Union[str, type]) -> type:
+    """resolve an engine given by name or class.
+
+    :param engine: name of an engine in ``engines``, or an ``Engine`` subclass
+    :return: the ``Engine`` subclass
+
+    :raise ValueError: if there is no engine with the given name
+    """
+    if isinstance(engine, type):
+        return engine
+    try:
+        module, _, name = engines[engine].rpartition('.')
+    except KeyError:
+        raise ValueError(f'unknown engine {engine}')
+    return getattr(import_module(module), name)
@@ -0,0 +1,170 @@
+"""Code generation of specialized processing functions ('kernels') for combinators.
+
+A kernel is generated once per combinator configuration, i.e. operation, wildcard modes,
+whether the right operand is a constant and the output mode. Wildcard branches are resolved while generating.
+Kernels are cached, so all combinators with the same configuration share one function.
+
+All kernels have the signature ``kernel(values, left, right, output) -> dict``:
+``values`` is the input as a dict of signal ids to values (see ``Frame.from_ids``),
+``left`` and ``output`` are signal ids, and ``right`` is either a signal id or the constant operand.
+Signal ids of wildcards are unused and may be anything.
+
+By default, kernels use bulk operations where a wildcard allows it, e.g. comparing ``everything`` by the
+minimum or maximum of all values, or copying the input for an arithmetic identity like ``each + 0``.
+These run in C instead of evaluating every signal in Python. Pass ``bulk=False`` for the plain kernels,
+e.g. to compare against them.
+"""
+import linecache
+from collections.abc import Callable
+from functools import lru_cache
+
+from factorioccn.model.core import WILDCARDS
+
+_decider_operators = {'>': '>', '>=': '>=', '=': '==', '!=': '!=', '<=': '<=', '<': '<'}
+_arithmetic_operators = {'+': '+', '-': '-', '*': '*', '/': '//', '%': '%', '**': '**',
+                         '<<': '<<', '>>': '>>', '&': '&', '|': '|', '^': '^'}
+_everything_tests = {'>': 'min(values.values()) > r', '>=': 'min(values.values()) >= r',
+                     '!=': 'r not in values.values()', '<=': 'max(values.values()) <= r',
+                     '<': 'max(values.values()) < r'}
+"""tests whether all values of a non-empty input pass a comparison, by decider operation.
+'=' is missing, as comparing each value stops at the first mismatch, which is usually early"""
+_identities = {'+': 0, '-': 0, '*': 1, '/': 1, '**': 1, '<<': 0, '>>': 0, '&': -1, '|': 0, '^': 0}
+"""right operands for which an arithmetic operation returns the left one unchanged"""
+_operator_names = {'>': 'gt', '>=': 'ge', '=': 'eq', '!=': 'ne', '<=': 'le', '<': 'lt',
+                   '+': 'add', '-': 'sub', '*': 'mul', '/': 'div', '%': 'mod', '**': 'pow',
+                   '<<': 'shl', '>>': 'shr', '&': 'and', '|': 'or', '^': 'xor'}
+
+
+def signal_mode(signal: str) -> str:
+    """classify an operand or output signal as either 'signal' or the name of its wildcard"""
+    return signal if signal in WILDCARDS else 'signal'
+
+
+def constant(arg):
+    """get the value of a constant operand, or None if it is a signal"""
+    try:
+        return int(arg)
+    except ValueError:
+        return None
+
+
+def _compile(name: str, lines) -> Callable:
+    source = '\n'.join([f'def {name}(values, left, right, output):'] + ['    ' + line for line in lines]) + '\n'
+    filename = f'<fccn kernel {name}>'
+    namespace = {}
+    exec(compile(source, filename, 'exec'), namespace)
+    # register the source so tracebacks and debuggers can show it
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    return namespace[name]
+
+
+@lru_cache(maxsize=None)
+def decider_kernel(op: str, left_mode: str, right_constant: bool, output_mode: str, output_one: bool,
+                   bulk: bool = True) -> Callable:
+    """get the kernel for a decider combinator configuration.
+
+    This reproduces the behaviour of the original ``DeciderCombinator`` implementation for all wildcard modes.
+
+    :param op: logic operation, one of '>', '>=', '=', '!=', '<=', '<'
+    :param left_mode: see ``signal_mode``
+    :param right_constant: whether the right operand is a constant instead of a signal
+    :param output_mode: see ``signal_mode``
+    :param output_one: whether to output 1 instead of the input value
+    :param bulk: whether to use bulk operations, see the module documentation
+    :return: the kernel function, see the module documentation
+    """
+    cmp = _decider_operators[op]
+
+    def value(expr):
+        return '1' if output_one else expr
+
+    # filter excluding the right operand signal from 'everything' and 'anything'
+    skip = '' if right_constant or left_mode == 'each' else ' if s != right'
+    also = 'and' if skip else 'if'
+    lines = ['r = right' if right_constant else 'r = values.get(right, 0)']
+    single_output = [f'v = {value("values.get(output, 0)")}', 'return {output: v} if v else {}']
+    everything = 'dict.fromkeys(values, 1)' if output_one else 'dict(values)'
+    if left_mode == 'signal':
+        lines.append('a = values.get(left, 0)')
+        if output_mode == 'everything':
+            # a missing left signal is never compared, so it passes
+            lines += [f'if left in values and not a {cmp} r:', '    return {}', f'return {everything}']
+        elif output_mode == 'signal':
+            lines += [f'if not a {cmp} r:', '    return {}'] + single_output
+        else:
+            lines += [f'if a {cmp} r and {value("a")}:', f'    return {{left: {value("a")}}}', 'return {}']
+    elif left_mode == 'everything' and output_mode == 'anything':
+        # only the first signal is compared
+        lines.append('for s, v in values.items():')
+        if skip:
+            lines += ['    if s == right:', '        continue']
+        lines += [f'    return {{s: {value("v")}}} if v {cmp} r else {{}}', 'return {}']
+    elif left_mode == 'everything':
+        if not bulk or op not in _everything_tests:
+            lines += [f'if not all(v {cmp} r for s, v in values.items(){skip}):', '    return {}']
+        elif skip:
+            # the bulk test can't exclude the right operand signal
+            lines += ['if right in values:',
+                      f'    if not all(v {cmp} r for s, v in values.items(){skip}):', '        return {}',
+                      f'elif values and not {_everything_tests[op]}:', '    return {}']
+        else:
+            lines += [f'if values and not {_everything_tests[op]}:', '    return {}']
+        if output_mode == 'signal':
+            lines += single_output
+        elif output_mode == 'each':
+            lines.append(f'return {{s: {value("v")} for s, v in values.items(){skip}}}')
+        else:
+            lines.append(f'return {everything}')
+    elif output_mode == 'signal':
+        if left_mode == 'anything':
+            lines += single_output
+        else:
+            lines.append(f'v = sum([{value("v")} for v in values.values() if v {cmp} r])')
+            if output_one:
+                # a missing output signal counts as passing
+                lines += ['if output not in values:', '    v += 1']
+            lines.append('return {output: v} if v else {}')
+    elif output_mode == 'each':
+        lines.append(f'return {{s: {value("v")} for s, v in values.items(){skip} {also} v {cmp} r}}')
+    elif output_mode == 'everything':
+        lines.append(f'return {everything}')
+    else:
+        lines += ['for s, v in values.items():',
+                  f'    if {"s != right and " if skip else ""}v {cmp} r:',
+                  f'        return {{s: {value("v")}}}',
+                  'return {}']
+    name = f'decider_{_operator_names[op]}_{left_mode}_{"const" if right_constant else "signal"}_{output_mode}' \
+           f'{"_one" if output_one else ""}{"" if bulk else "_plain"}'
+    return _compile(name, lines)
+
+
+@lru_cache(maxsize=None)
+def arithmetic_kernel(op: str, left_mode: str, right_constant: bool, output_mode: str, bulk: bool = True) -> Callable:
+    """get the kernel for an arithmetic combinator configuration.
+
+    :param op: arithmetic operation, one of '+', '-', '*', '/', '%', '**' (power), '<<', '>>', '&', '|', '^'
+    :param left_mode: either 'each' or 'signal'
+    :param right_constant: whether the right operand is a constant instead of a signal
+    :param output_mode: either 'each' or 'signal'. For a single left signal, 'each' outputs on that signal
+    :param bulk: whether to use bulk operations, see the module documentation
+    :return: the kernel function, see the module documentation
+    """
+    operator = _arithmetic_operators[op]
+    lines = ['r = right' if right_constant else 'r = values.get(right, 0)']
+    identity = _identities.get(op) if bulk and left_mode == 'each' else None
+    if left_mode == 'signal':
+        lines += [f'v = values.get(left, 0) {operator} r', 'return {output: v} if v else {}']
+    elif output_mode == 'each':
+        if identity is not None:
+            lines += [f'if r == {identity}:', '    return dict(values)']
+        lines.append(f'return {{s: v {operator} r for s, v in values.items()}}')
+    else:
+        total = f'v = sum([v {operator} r for v in values.values()])'
+        if identity is not None:
+            lines += [f'if r == {identity}:', '    v = sum(values.values())', 'else:', '    ' + total]
+        else:
+            lines.append(total)
+        lines.append('return {output: v} if v else {}')
+    name = f'arithmetic_{_operator_names[op]}_{left_mode}_{"const" if right_constant else "signal"}_{output_mode}' \
+           f'{"" if bulk else "_plain"}'
+    return _compile(name, lines)
@@ -0,0 +1,157 @@
+"""Running the tests of a circuit with their common prefixes simulated only once.
+
+Tests of a circuit often start with the same ticks, e.g. to set up some state, and only diverge later.
+``run_shared`` merges the ticks of all tests into a prefix trie, whose nodes are runs of ticks (see ``Timeline``).
+Each node is simulated once, and at each divergence point the state is captured by ``Circuit.snapshot``
+and restored for every branch. So the amount of simulated ticks is the size of the trie
+instead of the sum of the lengths of all tests.
+"""
+from collections.abc import Sequence
+from typing import Union
+
+from factorioccn.model.testing import Tick, Timeline, WrongSignalError
+
+
+def _key(run: Tick) -> tuple:
+    """identify the start and the operations of a run, exactly: expecting a signal to be 0 differs from not
+    expecting it, although the frames compare equal"""
+    # noinspection PyProtectedMember
+    return run.tick, tuple((type(op), op.wire, frozenset(op.values._values.items()))
+                           for op in (*run._expected, *run._sets))
+
+
+def _shift(run: Tick, offset: int) -> Tick:
+    """get the remainder of a run after its first ``offset`` ticks"""
+    # noinspection PyProtectedMember
+    return Tick(run.tick + offset, run._expected, run._sets, run.count - offset)
+
+
+class _Node:
+    """a run of ticks in the trie, shared by all tests passing through it"""
+    __slots__ = ('run', 'key', 'children', 'tests')
+
+    def __init__(self, run: Union[Tick, None]):
+        self.run = run
+        self.key = None if run is None else _key(run)
+        self.children: list[_Node] = []
+        self.tests: list[int] = []
+        """indices of the tests passing through this node"""
+
+    def child(self, run: Tick) -> '_Node':
+        """find the child starting like ``run``, or add a new one for it"""
+        key = _key(run)
+        for child in self.children:
+            if child.key == key:
+                return child
+        child = _Node(run)
+        self.children.append(child)
+        return child
+
+    def split(self, count: int) -> None:
+        """keep only the first ``count`` ticks of the run in this node, and move the rest into a single child"""
+        tail = _Node(_shift(self.run, count))
+        tail.children, tail.tests = self.children, list(self.tests)
+        # noinspection PyProtectedMember
+        self.run = Tick(self.run.tick, self.run._expected, self.run._sets, count)
+        self.children = [tail]
+
+    def insert(self, runs: Sequence[Tick], test: int) -> None:
+        """add the runs of a test below this node"""
+        node = self
+        node.tests.append(test)
+        for run in runs:
+            while run is not None:
+                child = node.child(run)
+                rest = None
+                if child.run.count > run.count:
+                    child.split(run.count)
+                elif child.run.count < run.count:
+                    rest = _shift(run, child.run.count)
+                child.tests.append(test)
+                node, run = child, rest
+
+    def size(self, t: int = 0) -> int:
+        """get the amount of ticks simulated for this node and all nodes below it, starting after tick ``t``"""
+        total = 0
+        stack = [(self, t)]
+        while stack:
+            node, t = stack.pop()
+            if node.run is not None:
+                total += max(node.run.tick - t, 0) + node.run.count - 1
+                t = node.run.tick + node.run.count - 1
+            stack += [(child, t) for child in node.children]
+        return total
+
+
+def build_trie(tests: Sequence) -> _Node:
+    """merge the ticks of tests into a prefix trie.
+
+    :param tests: the ``Test``s
+    :return: the root of the trie, which contains no ticks itself
+    """
+    root = _Node(None)
+    for i, test in enumerate(tests):
+        # noinspection PyProtectedMember
+        ticks = test._ticks
+        root.insert(ticks.runs if isinstance(ticks, Timeline) else [tick.at(0) for tick in ticks], i)
+    return root
+
+
+def _execute(circuit, run: Tick, t: int, name: str) -> int:
+    """simulate the ticks of a run like ``Test.run`` does, starting after tick ``t``, and return the last tick"""
+    for offset in range(run.count):
+        tick = run.at(offset)
+        delta = tick.tick - t
+        t += delta
+        circuit.tick(delta)
+        tick.execute(circuit.wires, name)
+    return t
+
+
+def run_shared(circuit, tests: Sequence) -> list[Union[WrongSignalError, None]]:
+    """run tests of a circuit, simulating the ticks they have in common only once.
+
+    Tests which use different engines are merged separately. If probes are attached to the circuit,
+    the tests are run one after another instead, as the history of the probes belongs to a single test.
+
+    :param circuit: the circuit the tests belong to
+    :param tests: the ``Test``s to run
+    :return: for each test, either the ``WrongSignalError`` it failed with or None if it passed
+    """
+    errors = [None] * len(tests)
+    if circuit.probes:
+        for i, test in enumerate(tests):
+            try:
+                test.run()
+            except WrongSignalError as e:
+                errors[i] = e
+        return errors
+    groups = {}
+    for i, test in enumerate(tests):
+        groups.setdefault(test.engine, []).append(i)
+    for engine, indices in groups.items():
+        if engine is not None:
+            circuit.use_engine(engine)
+        root = build_trie([tests[i] for i in indices])
+        circuit.reset()
+        stack = [(root, None, 0)]
+        while stack:
+            node, start, t = stack.pop()
+            if start is not None:
+                circuit.restore(start)
+            if node.run is not None:
+                first = indices[node.tests[0]]
+                # noinspection PyProtectedMember
+                try:
+                    t = _execute(circuit, node.run, t, tests[first]._name)
+                except WrongSignalError as e:
+                    for i in node.tests:
+                        i = indices[i]
+                        errors[i] = e if i == first else WrongSignalError(e.results, e.tick, tests[i]._name)
+                    continue
+            if len(node.children) == 1:
+                stack.append((node.children[0], None, t))
+            elif node.children:
+                snapshot = circuit.snapshot()
+                stack += [(child, snapshot, t) for child in reversed(node.children)]
+    return errors
@@ -0,0 +1,98 @@
+"""Recording the history of selected wires during simulation.
+
+A ``Probe`` watches a single wire of a ``Circuit`` and records its signals after every tick into a ring buffer
+of fixed size, so memory is bounded no matter how long a simulation runs.
+If a test fails while probes are attached, the ``WrongSignalError`` contains the recorded history.
+"""
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Union
+
+from factorioccn.model.core import Frame, Wire, signal_table
+from factorioccn.model.engines import Engine
+
+
+class Probe:
+    """records the signals of a wire for the last ``size`` ticks, see ``Circuit.attach_probe``"""
+
+    def __init__(self, wire: str, signals: Union[Sequence[str], None] = None, size: int = 32):
+        """create a probe.
+
+        :param wire: name of the wire to record
+        :param signals: signals to record, all signals if None. Recording selected signals is cheaper,
+            as their values are stored in a preallocated buffer of 64 bit integers instead of copies of the wires frame
+        :param size: amount of ticks to keep
+        """
+        if size < 1:
+            raise ValueError('probe size must be positive')
+        self.wire = wire
+        self.signals = None if signals is None else list(signals)
+        self.size = size
+        self._ids = None if signals is None else [signal_table.intern(s) for s in signals]
+        self._ticks = array('q', bytes(8 * size))
+        if self._ids is None:
+            self._frames: list[Union[Frame, None]] = [None] * size
+        else:
+            self._values = array('q', bytes(8 * size * len(self._ids)))
+        self._count = 0
+        """amount of ticks recorded since the last ``clear``"""
+        self._wire: Union[Wire, None] = None
+        self._index = 0
+        """index of the wire in the circuit, see ``Engine.frame``"""
+
+    @classmethod
+    def parse(cls, spec: str, size: int = 32) -> 'Probe':
+        """create a probe from a specification like ``wire`` or ``wire:signal,signal``"""
+        wire, _, signals = spec.partition(':')
+        return cls(wire, signals.split(',') if signals else None, size)
+
+    def attach(self, wires: Mapping[str, Wire]) -> None:
+        """bind the probe to its wire
+
+        :raise KeyError: if there is no wire of that name
+        """
+        self._wire = wires[self.wire]
+        self._index = list(wires).index(self.wire)
+        self.clear()
+
+    def clear(self) -> None:
+        """forget all recorded ticks"""
+        self._count = 0
+
+    def record(self, tick: int, engine: Union[Engine, None] = None) -> None:
+        """record the current signals of the wire as of the given tick.
+
+        :param tick: the tick
+        :param engine: the engine simulating the circuit while it calls this during ``Engine.tick``,
+            or None to read the wire itself
+        """
+        slot = self._count % self.size
+        self._ticks[slot] = tick
+        if self._ids is None:
+            self._frames[slot] = self._wire.signals.copy() if engine is None else engine.frame(self._index)
+        elif engine is None:
+            # noinspection PyProtectedMember
+            values = self._wire.signals._values
+            base = slot * len(self._ids)
+            buffer = self._values
+            for i, sid in enumerate(self._ids):
+                buffer[base + i] = values.get(sid, 0)
+        else:
+            engine.read(self._index, self._ids, self._values, slot * len(self._ids))
+        self._count += 1
+
+    def history(self) -> list[tuple[int, Frame]]:
+        """get the recorded ticks, oldest first.
+
+        :return: pairs of tick and the signals on the wire after it
+        """
+        count = min(self._count, self.size)
+        slots = [(self._count - count + i) % self.size for i in range(count)]
+        if self._ids is None:
+            return [(self._ticks[slot], self._frames[slot]) for slot in slots]
+        width = len(self._ids)
+        return [(self._ticks[slot], Frame(dict(zip(self.signals, self._values[slot * width:(slot + 1) * width]))))
+                for slot in slots]
+
+    def __str__(self) -> str:
+        return self.wire if self.signals is None else f'{self.wire}:{",".join(self.signals)}'
@@ -1,6 +1,8 @@
-from collections.abc import MutableMapping, Mapping, Sequence
+from bisect import bisect_right
+from collections.abc import Iterator, MutableMapping, Mapping, Sequence
 from dataclasses import dataclass
 from functools import reduce
+from itertools import accumulate
 
 from factorioccn.model.core import Frame, Wire
 
@@ -34,10 +36,19 @@ class TestOperation:
         cls = type(self)
         return cls(self.wire, self.values.copy())
 
+    def merge(self, other: 'TestOperation') -> None:
+        """Merge the ``values`` of another operation on the same ``wire`` into this one"""
+        self.values += other.values
+
 
 class TestExpects(TestOperation):
     """Test the specified ``wire`` against the ``values``."""
 
+    def merge(self, other: 'TestOperation') -> None:
+        """Merge like ``TestOperation.merge``, but keep signals expected to be 0"""
+        for stype, value in other.values.items():
+            self.values[stype] += value
+
     def test(self, wires: Mapping[str, Wire]) -> Sequence[SignalTest]:
         """Test the specified ``wire`` against the ``values``.
 
@@ -63,28 +74,43 @@ class WrongSignalError(Exception):
     """Exception raised if a test fails with a mismatching or missing signal"""
 
     def __init__(self, results: Sequence[SignalTest], tick: int, test: str):
+        super().__init__(results, tick, test)
         self.test = test
         self.tick = tick
         self.results = results
+        self.history: Sequence[tuple[str, Sequence[tuple[int, Frame]]]] = []
+        """signals recorded by the probes attached to the circuit, see ``factorioccn.model.probes``"""
 
     def __str__(self) -> str:
-        return reduce((lambda acc, r: acc + f'\t{r}'), self.results,
-                      f'unexpected signals in {self.test}:{self.tick}:\n')
+        message = reduce((lambda acc, r: acc + f'\t{r}'), self.results,
+                         f'unexpected signals in {self.test}:{self.tick}:\n')
+        for probe, history in self.history:
+            message += f'\n\t{probe}, last {len(history)} ticks:'
+            message += ''.join(f'\n\t\t{tick}: {signals}' for tick, signals in history)
+        return message
 
 
 class Tick:
     """a specific, non-empty tick of a circuit test"""
 
-    def __init__(self, tick: int, expected: Sequence[TestExpects], sets: Sequence[TestSets]):
+    def __init__(self, tick: int, expected: Sequence[TestExpects], sets: Sequence[TestSets], count: int = 1):
         """Create a test tick.
 
         :param tick: when this tick should be executed
         :param expected: ``TestExpects`` to check
         :param sets: ``TestSets`` to apply
+        :param count: amount of consecutive ticks with the same operations this stands for, see ``Timeline``
         """
         self._expected: Sequence[TestExpects] = expected
         self._sets: Sequence[TestSets] = sets
         self.tick = tick
+        self.count = count
+
+    def at(self, offset: int) -> 'Tick':
+        """get the single tick ``offset`` ticks after the first one this stands for"""
+        if offset == 0 and self.count == 1:
+            return self
+        return Tick(self.tick + offset, self._expected, self._sets)
 
     def execute(self, wires: MutableMapping[str, Wire], *errorargs) -> None:
         """Apply this tick to the given set of wires.
@@ -102,3 +128,34 @@ class Tick:
             raise WrongSignalError(failed, self.tick, *errorargs)
         for s in self._sets:
             s.set(wires)
+
+
+class Timeline(Sequence[Tick]):
+    """The ticks of a test, stored as runs of consecutive ticks with the same operations.
+
+    A hold like ``for 1000000 io += {...}`` is a single run, so memory is independent of the length of holds.
+    Single ticks are created on access.
+    """
+
+    def __init__(self, runs: Sequence[Tick]):
+        """:param runs: ticks in order, each standing for ``Tick.count`` consecutive ticks"""
+        self.runs = runs
+        self._starts = list(accumulate((run.count for run in runs), initial=0))
+
+    def __len__(self) -> int:
+        return self._starts[-1]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('timeline index out of range')
+        run = bisect_right(self._starts, index) - 1
+        return self.runs[run].at(index - self._starts[run])
+
+    def __iter__(self) -> Iterator[Tick]:
+        for run in self.runs:
+            for offset in range(run.count):
+                yield run.at(offset)
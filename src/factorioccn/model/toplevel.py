@@ -1,30 +1,207 @@
 """Classes that represent some constructs on the top level of a fccn file,
 most of which may be returned as a parsing result"""
-from collections.abc import Sequence, Mapping
+import copy
+from collections.abc import Iterable, Sequence, Mapping
+from typing import Union
 
-from factorioccn.model.combinators import Combinator
+from factorioccn.model.combinators import Combinator, InstanceCombinator
 from factorioccn.model.core import Wire, Frame
-from factorioccn.model.testing import Tick
+from factorioccn.model.engines import Engine, engine_class
+from factorioccn.model.probes import Probe
+from factorioccn.model.testing import Tick, WrongSignalError
+
+
+class Snapshot:
+    """the full simulation state of a ``Circuit`` at one point in time, see ``Circuit.snapshot``"""
+    __slots__ = ('time', 'wires', 'inputs')
+
+    def __init__(self, time: int, wires: Sequence[Frame], inputs: Sequence[Frame]):
+        """create a snapshot.
+
+        :param time: the ``Circuit.time`` of the snapshot
+        :param wires: the signals of each wire, in the order of ``Circuit.wires``
+        :param inputs: the pending input of each combinator, in the order of ``Circuit.combinators``
+        """
+        self.time = time
+        self.wires = wires
+        self.inputs = inputs
 
 
 class Circuit:
     """A combinator circuit and its associated tests"""
+    default_engine: Union[str, type] = 'object'
+    """engine used by circuits which don't specify one, see ``factorioccn.model.engines``"""
+    fast_forward_threshold: Union[int, None] = 256
+    """``tick`` checks for periodic states when simulating at least this many ticks at once, None disables it"""
+
+    def __init__(self, wires: Mapping[str, Wire], combinators: Sequence[Combinator],
+                 engine: Union[str, type] = None):
+        """create a circuit.
 
-    def __init__(self, wires: Mapping[str, Wire], combinators: Sequence[Combinator]):
+        :param wires: all wires by name
+        :param combinators: all combinators, already connected to the wires
+        :param engine: name or class of the simulation engine, defaults to ``Circuit.default_engine``
+        """
         self.wires = wires
         self.combinators = combinators
         self.tests: Sequence[Test] = []
+        self.imports: Sequence[str] = []
+        """paths of the fccn files imported by the source of this circuit, relative to it,
+        see ``factorioccn.modules``"""
+        self._engine_type = engine if engine is not None else Circuit.default_engine
+        self._engine: Union[Engine, None] = None
+        self.time = 0
+        """amount of ticks simulated, reset by ``Test.run``"""
+        self.probes: list[Probe] = []
+        """probes recording the history of wires, see ``attach_probe``"""
+
+    @property
+    def engine(self) -> Engine:
+        """the simulation engine, created on first use"""
+        if self._engine is None:
+            self._engine = engine_class(self._engine_type)(self)
+        return self._engine
+
+    def use_engine(self, engine: Union[str, type]) -> None:
+        """switch to another simulation engine. The current state of all wires is kept.
+
+        :param engine: name or class of the engine, see ``factorioccn.model.engines``
+        """
+        if engine != self._engine_type:
+            self._engine_type = engine
+            self._engine = None
+
+    def attach_probe(self, probe: Probe) -> None:
+        """record the history of a wire from now on. While probes are attached, each tick is recorded from within
+        ``Engine.tick`` and ticks are never fast-forwarded.
+
+        :param probe: the probe, or anything else implementing its ``attach``, ``record`` and ``clear``,
+            e.g. a ``factorioccn.trace.Tracer``
+        :raise KeyError: if the probed wire does not exist
+        """
+        probe.attach(self.wires)
+        self.probes.append(probe)
+
+    def detach_probe(self, probe: Probe) -> None:
+        """stop recording with a probe attached by ``attach_probe``"""
+        self.probes.remove(probe)
+
+    def snapshot(self) -> Snapshot:
+        """capture the current state of all wires and combinators.
+
+        This takes constant time per wire and combinator, as the signals are shared copy-on-write with the circuit,
+        see ``Frame.share``. Simulating further only copies the frames which actually change.
+        """
+        return Snapshot(self.time, [wire.signals.share() for wire in self.wires.values()],
+                        [combinator.input.share() for combinator in self.combinators])
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """return to a state captured by ``snapshot`` of this circuit or of one of its forks.
+
+        The snapshot stays valid and may be restored any number of times.
+        """
+        for wire, signals in zip(self.wires.values(), snapshot.wires):
+            wire.signals = signals.share()
+        for combinator, input in zip(self.combinators, snapshot.inputs):
+            combinator.input = input.share()
+        self.time = snapshot.time
+
+    def reset(self) -> None:
+        """clear all wires and combinator inputs and start over at time 0"""
+        for wire in self.wires.values():
+            wire.signals = Frame()
+        for combinator in self.combinators:
+            combinator.input = Frame()
+        self.time = 0
+
+    def fork(self) -> 'Circuit':
+        """create an independent copy of this circuit in its current state.
+
+        Combinators are copied with their configuration shared, and the state is shared copy-on-write
+        like with ``snapshot``, so forking is cheap. Tests, probes and the engine are not copied,
+        the fork creates an engine of the same type on first use.
+        """
+        return self._copy(self.wires, self.combinators)
+
+    def cone(self, wires: Iterable[str]) -> list[Combinator]:
+        """find the combinators which can influence the given wires, i.e. which reach them through other wires
+        and combinators.
+
+        :param wires: names of wires
+        :return: the combinators in the order of ``combinators``
+        """
+        found = set()
+        pending = [self.wires[name] for name in wires]
+        seen = set(pending)
+        while pending:
+            for combinator in pending.pop().inputs:
+                if combinator not in found:
+                    found.add(combinator)
+                    for wire in getattr(combinator, 'input_wires', ()):
+                        if wire not in seen:
+                            seen.add(wire)
+                            pending.append(wire)
+        return [combinator for combinator in self.combinators if combinator in found]
+
+    def slice(self, wires: Iterable[str], keep: Iterable[str] = ()) -> 'Circuit':
+        """create an independent circuit in the current state, with only the part which can influence some wires.
+
+        Within this part, the slice behaves exactly like the whole circuit, but simulating it only costs time
+        proportional to its size. Like ``fork``, tests, probes and the engine are not copied.
+
+        :param wires: names of the wires to keep the behaviour of, see ``cone``
+        :param keep: names of additional wires to include, e.g. wires set by a test.
+            They are unconnected unless they belong to the slice anyway
+        """
+        combinators = self.cone(wires)
+        names = set(wires) | set(keep)
+        included = {id(wire) for combinator in combinators
+                    for wire in (*getattr(combinator, 'input_wires', ()), *combinator.output_wires)}
+        return self._copy([name for name, wire in self.wires.items() if name in names or id(wire) in included],
+                          combinators)
+
+    def _copy(self, names: Iterable[str], combinators: Iterable[Combinator]) -> 'Circuit':
+        """copy the given wires and combinators into a new circuit, sharing their state copy-on-write.
+        All wires the combinators are connected to must be included."""
+        wires = {name: Wire() for name in names}
+        mapping = {id(self.wires[name]): wire for name, wire in wires.items()}
+        clones = []
+        for combinator in combinators:
+            clone = copy.copy(combinator)
+            clone.output_wires = [mapping[id(wire)] for wire in combinator.output_wires]
+            if hasattr(combinator, 'input_wires'):
+                clone.input_wires = [mapping[id(wire)] for wire in combinator.input_wires]
+            clone.input = combinator.input.share()
+            clone.connect()
+            clones.append(clone)
+        for name, wire in wires.items():
+            wire.signals = self.wires[name].signals.share()
+        circuit = Circuit(wires, clones, self._engine_type)
+        circuit.time = self.time
+        return circuit
 
     def tick(self, n: int = 1) -> None:
         """simulate the circuit for n ticks.
 
+        Large amounts of ticks are fast-forwarded once the state becomes periodic, see ``Engine.fast_forward``.
+
         :param n: amount of ticks to simulate
         """
-        for i in range(n):
-            for wire in self.wires.values():
-                wire.tick()
-            for combinator in self.combinators:
-                combinator.tick()
+        if self.probes:
+            self.engine.tick(n, self._record)
+            return
+        if self.fast_forward_threshold is not None and n >= self.fast_forward_threshold:
+            self.engine.fast_forward(n)
+        else:
+            self.engine.tick(n)
+        self.time += max(n, 0)
+
+    def _record(self) -> None:
+        """record all probes after a tick, see ``Engine.tick``"""
+        self.time += 1
+        engine = self.engine
+        for probe in self.probes:
+            probe.record(self.time, engine)
 
     def dump(self):  # pragma: no cover
         for key in self.wires:
@@ -36,27 +213,91 @@ class Circuit:
             t.run()
 
 
+class Template:
+    """A block of combinators which is built once and instantiated with different wires, see ``InstanceCombinator``"""
+
+    def __init__(self, name: str, params: Sequence[str],
+                 combinators: Sequence[tuple[Combinator, Sequence[str], Sequence[str]]]):
+        """create a template.
+
+        :param name: name of the template for error messages
+        :param params: names of the wires each instance binds to wires outside of the template
+        :param combinators: the prototype of each combinator, which isn't connected to any wires,
+            with the names of its input and its output wires
+        """
+        self.name = name
+        self.params = params
+        self.combinators = combinators
+        self.wires = list(dict.fromkeys([*params, *(wire for _, inputs, outputs in combinators
+                                                    for wire in (*inputs, *outputs))]))
+        """names of all wires of the template, the parameters first"""
+
+    def instantiate(self, wires: Mapping[str, Wire]) -> list[InstanceCombinator]:
+        """create the combinators of an instance. They are not connected to the wires yet.
+
+        :param wires: the wire of the instance for each name in ``Template.wires``
+        :return: the combinators, in the order of the template
+        """
+        return [InstanceCombinator(prototype, tuple(map(wires.__getitem__, inputs)),
+                                   tuple(map(wires.__getitem__, outputs)))
+                for prototype, inputs, outputs in self.combinators]
+
+
 class Test:
     """A full test run for a specific ``Circuit``"""
 
-    def __init__(self, name: str, circuit: Circuit, ticks: Sequence[Tick]):
+    def __init__(self, name: str, circuit: Circuit, ticks: Sequence[Tick], engine: Union[str, type] = None):
         """Create a test for a specific ``Circuit``.
 
         :param name: name of the test for output purposes
         :param circuit: ``Circuit`` to test
-        :param ticks: Sequence of ticks to apply to the circuit during simulation
+        :param ticks: Sequence of ticks to apply to the circuit during simulation, e.g. a ``Timeline``
+        :param engine: if given, the engine the circuit should use for this test, see ``Circuit.use_engine``
         """
         self._name = name
         self._circuit = circuit
         self._ticks = ticks
+        self.engine = engine
+
+    def wires(self) -> tuple[set[str], set[str]]:
+        """get the names of the wires this test checks and the ones it sets"""
+        expected, set_ = set(), set()
+        for tick in getattr(self._ticks, 'runs', self._ticks):
+            # noinspection PyProtectedMember
+            expected.update(op.wire for op in tick._expected)
+            # noinspection PyProtectedMember
+            set_.update(op.wire for op in tick._sets)
+        return expected, set_
 
-    def run(self):
-        """simulate the circuit while applying the test ticks at the appropriate tick"""
+    def slice(self) -> 'Test':
+        """get this test for a slice of the circuit with only the part it observes, see ``Circuit.slice``"""
+        expected, set_ = self.wires()
+        return Test(self._name, self._circuit.slice(expected, set_), self._ticks, self.engine)
+
+    def run(self, start: Snapshot = None):
+        """simulate the circuit while applying the test ticks at the appropriate tick
+
+        :param start: if given, the state to start from instead of a cleared circuit, e.g. after a warm-up sequence.
+            Tick numbers of the test count from there.
+        """
+        if self.engine is not None:
+            self._circuit.use_engine(self.engine)
         t = 0
-        for w in self._circuit.wires.values():
-            w.signals = Frame()
+        if start is None:
+            for w in self._circuit.wires.values():
+                w.signals = Frame()
+        else:
+            self._circuit.restore(start)
+        self._circuit.time = 0
+        for probe in self._circuit.probes:
+            probe.clear()
         for tick in self._ticks:
             delta = tick.tick - t
             t += delta
             self._circuit.tick(delta)
-            tick.execute(self._circuit.wires, self._name)
+            try:
+                tick.execute(self._circuit.wires, self._name)
+            except WrongSignalError as e:
+                e.history = [(str(probe), probe.history()) for probe in self._circuit.probes
+                             if isinstance(probe, Probe)]
+                raise
@@ -0,0 +1,508 @@
+"""A vectorized simulation engine based on NumPy.
+
+``VectorEngine`` compiles a ``Circuit`` once into a wires×signals state matrix and sparse incidence
+between wires and combinators. Combinators with the same configuration are grouped
+and evaluated together as masked array operations, so a tick costs a handful of NumPy calls.
+``BatchEngine`` adds a leading scenario dimension to simulate independent scenarios in lockstep,
+which ``run_batch`` uses to run many tests of one circuit at once.
+
+This module requires numpy. Results match the ``ObjectEngine``, except for a few corner cases:
+values are 64 bit integers, division or modulo by zero result in 0,
+powers with a negative exponent are truncated to integers, e.g. ``2 ** -1`` results in 0,
+and ``anything`` selects the signal interned first instead of the first one in input order.
+"""
+import heapq
+from collections.abc import Iterator, Mapping, Sequence
+from typing import Union
+
+import numpy as np
+
+from factorioccn.model.combinators import ArithmeticCombinator, ConstantCombinator, DeciderCombinator
+from factorioccn.model.core import Frame, signal_table
+from factorioccn.model.engines import _MASK, Engine
+from factorioccn.model.testing import Tick, WrongSignalError
+
+_decider_operations = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '=': np.equal,
+    '!=': np.not_equal,
+    '<=': np.less_equal,
+    '<': np.less,
+}
+
+
+def _power(base, exponent):
+    """``np.power``, which refuses negative exponents for integers, truncating those results like ``int``"""
+    negative = exponent < 0
+    result = np.power(base, np.abs(exponent))
+    # only 1 and -1 have an integer reciprocal, the reciprocal of 0 is 0 like for division
+    return np.where(negative & (np.abs(base) != 1), 0, result)
+
+
+_arithmetic_operations = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '/': np.floor_divide,
+    '%': np.remainder,
+    '**': _power,
+    '<<': np.left_shift,
+    '>>': np.right_shift,
+    '&': np.bitwise_and,
+    '|': np.bitwise_or,
+    '^': np.bitwise_xor,
+}
+
+
+class _Incidence:
+    """sparse incidence of source rows to target rows, applied as a segmented sum"""
+
+    def __init__(self, edges: Sequence[tuple[int, int]], count: int):
+        """:param edges: pairs of (target, source) indices, duplicates count multiple times
+        :param count: amount of targets
+        """
+        edges = sorted(edges)
+        self.sources = np.array([source for _, source in edges], dtype=np.intp)
+        targets = np.array([target for target, _ in edges], dtype=np.intp)
+        self.starts = np.flatnonzero(np.diff(targets, prepend=-1)) if len(edges) else targets
+        self.targets = targets[self.starts]
+        self.single = len(self.starts) == len(self.sources)
+        """whether each target has a single source, so no sum is needed"""
+        self.dense = len(self.targets) == count
+        """whether every target has a source, so results can be written directly"""
+
+    def apply(self, source: np.ndarray, target: np.ndarray) -> None:
+        """sum up the rows of ``source`` into the connected rows of a zeroed ``target``"""
+        if not len(self.sources):
+            return
+        if self.dense and self.single:
+            np.take(source, self.sources, axis=-2, out=target)
+            return
+        rows = np.take(source, self.sources, axis=-2)
+        if not self.single:
+            rows = np.add.reduceat(rows, self.starts, axis=-2)
+        if self.dense:
+            target[...] = rows
+        else:
+            target[..., self.targets, :] = rows
+
+
+class _Group:
+    """combinators of the same kind and configuration, evaluated together"""
+
+    def __init__(self):
+        self.rows = []
+        """indices of the grouped combinators"""
+
+    def add(self, row: int, combinator) -> None:
+        self.rows.append(row)
+
+    def finalize(self, width: int) -> None:
+        """convert collected data to arrays, for a signal dimension of ``width``"""
+        self.rows = np.array(self.rows, dtype=np.intp)
+
+    def evaluate(self, inputs: np.ndarray, outputs: np.ndarray) -> None:  # pragma: no cover
+        """write the output of all grouped combinators to a zeroed ``outputs``"""
+        raise NotImplementedError('_Group.evaluate')
+
+
+class _ConstantGroup(_Group):
+    def __init__(self):
+        super().__init__()
+        self.signals = []
+
+    def add(self, row, combinator):
+        super().add(row, combinator)
+        self.signals.append(combinator.signals)
+
+    def finalize(self, width):
+        super().finalize(width)
+        values = np.zeros((len(self.rows), width), dtype=np.int64)
+        for i, signals in enumerate(self.signals):
+            for stype, value in signals.items():
+                values[i, signal_table.intern(stype)] += value
+        self.signals = values
+
+    def evaluate(self, inputs, outputs):
+        outputs[..., self.rows, :] = self.signals
+
+
+class _BinaryGroup(_Group):
+    def __init__(self, operation, left_mode: str, right_constant: bool, output_mode: str):
+        super().__init__()
+        self.operation = operation
+        self.left_mode = left_mode
+        self.right_constant = right_constant
+        self.output_mode = output_mode
+        self.left = []
+        self.right = []
+        self.output = []
+
+    def add(self, row, combinator):
+        super().add(row, combinator)
+        self.left.append(signal_table.intern(combinator.left) if self.left_mode == 'signal' else -1)
+        if self.right_constant:
+            self.right.append(combinator.right_value)
+        else:
+            self.right.append(signal_table.intern(combinator.right))
+        if self.output_mode == 'signal':
+            self.output.append(signal_table.intern(combinator.output_signal))
+        else:
+            self.output.append(self.left[-1])
+
+    def finalize(self, width):
+        super().finalize(width)
+        self.left = np.array(self.left, dtype=np.intp)
+        self.right = np.array(self.right, dtype=np.int64 if self.right_constant else np.intp)
+        self.output = np.array(self.output, dtype=np.intp)
+
+    def _right(self, inputs):
+        if self.right_constant:
+            return self.right
+        return inputs[..., self.rows, self.right]
+
+
+class _ArithmeticGroup(_BinaryGroup):
+    def evaluate(self, inputs, outputs):
+        right = self._right(inputs)
+        if self.left_mode == 'signal':
+            outputs[..., self.rows, self.output] = self.operation(inputs[..., self.rows, self.left], right)
+            return
+        signals = inputs[..., self.rows, :]
+        results = np.where(signals != 0, self.operation(signals, right[..., None]), 0)
+        if self.output_mode == 'each':
+            outputs[..., self.rows, :] = results
+        else:
+            outputs[..., self.rows, self.output] = results.sum(axis=-1)
+
+
+class _DeciderGroup(_BinaryGroup):
+    def __init__(self, operation, left_mode, right_constant, output_mode, output_one: bool):
+        super().__init__(operation, left_mode, right_constant, output_mode)
+        self.output_one = output_one
+        self.candidates = None
+
+    def finalize(self, width):
+        super().finalize(width)
+        if self.left_mode in ('everything', 'anything') and not self.right_constant:
+            self.candidates = np.arange(width) != self.right[:, None]
+
+    def _output_value(self, inputs):
+        """value output for the output signal, either 1 or its input value"""
+        return 1 if self.output_one else inputs[..., self.rows, self.output]
+
+    @staticmethod
+    def _first(mask):
+        first = np.arange(mask.shape[-1]) == mask.argmax(axis=-1)[..., None]
+        return first & mask
+
+    def evaluate(self, inputs, outputs):
+        rows = self.rows
+        right = self._right(inputs)
+        if self.left_mode == 'signal':
+            left = inputs[..., rows, self.left]
+            passes = self.operation(left, right)
+            if self.output_mode == 'everything':
+                # a missing left signal is never compared, so it passes
+                passes |= left == 0
+                signals = inputs[..., rows, :]
+                values = (signals != 0) if self.output_one else signals
+                outputs[..., rows, :] = np.where(passes[..., None], values, 0)
+            elif self.output_mode == 'signal':
+                outputs[..., rows, self.output] = np.where(passes, self._output_value(inputs), 0)
+            else:
+                outputs[..., rows, self.left] = np.where(passes, 1 if self.output_one else left, 0)
+            return
+        signals = inputs[..., rows, :]
+        present = signals != 0
+        values = present if self.output_one else signals
+        compared = self.operation(signals, right[..., None])
+        candidates = present
+        if self.left_mode != 'each' and self.candidates is not None:
+            candidates = present & self.candidates
+        if self.left_mode == 'everything':
+            passes = np.all(compared | ~candidates, axis=-1)
+            if self.output_mode == 'signal':
+                outputs[..., rows, self.output] = np.where(passes, self._output_value(inputs), 0)
+            elif self.output_mode == 'each':
+                outputs[..., rows, :] = np.where(passes[..., None] & candidates, values, 0)
+            elif self.output_mode == 'everything':
+                outputs[..., rows, :] = np.where(passes[..., None], values, 0)
+            else:
+                # only the first candidate is compared
+                outputs[..., rows, :] = np.where(self._first(candidates) & compared, values, 0)
+        elif self.output_mode == 'signal':
+            if self.left_mode == 'anything':
+                outputs[..., rows, self.output] = self._output_value(inputs)
+            else:
+                total = np.where(present & compared, values, 0).sum(axis=-1)
+                if self.output_one:
+                    # a missing output signal counts as passing
+                    total += inputs[..., rows, self.output] == 0
+                outputs[..., rows, self.output] = total
+        elif self.output_mode == 'each':
+            outputs[..., rows, :] = np.where(candidates & compared, values, 0)
+        elif self.output_mode == 'everything':
+            outputs[..., rows, :] = values
+        else:
+            outputs[..., rows, :] = np.where(self._first(candidates & compared), values, 0)
+
+
+class _FallbackGroup(_Group):
+    """combinators without a vectorized implementation, evaluated through ``Combinator.process``"""
+
+    def __init__(self):
+        super().__init__()
+        self.combinators = []
+
+    def add(self, row, combinator):
+        super().add(row, combinator)
+        self.combinators.append(combinator)
+
+    def evaluate(self, inputs, outputs):
+        for index in np.ndindex(*inputs.shape[:-2]):
+            for row, combinator in zip(self.rows.tolist(), self.combinators):
+                signals = inputs[index + (row,)]
+                frame = Frame()
+                for sid in np.flatnonzero(signals).tolist():
+                    frame[signal_table.names[sid]] = int(signals[sid])
+                for stype, value in combinator.process(frame).items():
+                    outputs[index + (row, signal_table.intern(stype))] += value
+
+
+def _group_key(combinator) -> tuple:
+    """group combinators by their kind and configuration, apart from signals and constants.
+    Instances of a template are grouped by the kind of their prototype, so all instances are evaluated together."""
+    kind = type(getattr(combinator, 'prototype', combinator))
+    if kind is ConstantCombinator:
+        return kind,
+    if kind is ArithmeticCombinator:
+        return kind, combinator.op, combinator.left_mode, combinator.right_value is not None, combinator.output_mode
+    if kind is DeciderCombinator:
+        return kind, combinator.op, combinator.left_mode, combinator.right_value is not None, \
+            combinator.output_mode, combinator.output_value is not None
+    return None,
+
+
+def _create_group(key: tuple) -> _Group:
+    kind = key[0]
+    if kind is ConstantCombinator:
+        return _ConstantGroup()
+    if kind is ArithmeticCombinator:
+        return _ArithmeticGroup(_arithmetic_operations[key[1]], *key[2:])
+    if kind is DeciderCombinator:
+        return _DeciderGroup(_decider_operations[key[1]], *key[2:])
+    return _FallbackGroup()
+
+
+class VectorEngine(Engine):
+    """simulate a circuit with NumPy array operations. See the module documentation for details."""
+    _batch: tuple[int, ...] = ()
+    """leading dimensions of the state arrays, empty to simulate a single scenario"""
+
+    def __init__(self, circuit):
+        super().__init__(circuit)
+        self._compile()
+
+    def _compile(self):
+        """(re-)build state, incidence and combinator groups for the current amount of signals"""
+        self._wires = list(self.circuit.wires.values())
+        combinators = list(self.circuit.combinators)
+        wire_rows = {id(wire): i for i, wire in enumerate(self._wires)}
+        self._width = width = max(len(signal_table), 1)
+        inputs = []
+        outputs = []
+        groups = {}
+        for row, combinator in enumerate(combinators):
+            inputs += [(row, wire_rows[id(wire)]) for wire in getattr(combinator, 'input_wires', ())]
+            outputs += [(wire_rows[id(wire)], row) for wire in combinator.output_wires]
+            key = _group_key(combinator)
+            if key not in groups:
+                groups[key] = _create_group(key)
+            groups[key].add(row, combinator)
+        for group in groups.values():
+            group.finalize(width)
+        self._groups = list(groups.values())
+        self._inputs = _Incidence(inputs, len(combinators))
+        self._outputs = _Incidence(outputs, len(self._wires))
+        self._state = np.zeros(self._batch + (len(self._wires), width), dtype=np.int64)
+        self._combinator_inputs = np.zeros(self._batch + (len(combinators), width), dtype=np.int64)
+        self._combinator_outputs = np.zeros(self._batch + (len(combinators), width), dtype=np.int64)
+
+    def _load(self):
+        """read the current signals of all wires into the state matrix"""
+        state = self._state
+        state.fill(0)
+        for row, wire in enumerate(self._wires):
+            # noinspection PyProtectedMember
+            for sid, value in wire.signals._values.items():
+                state[row, sid] = value
+
+    def _store(self):
+        """write the state matrix back to the wires, keeping their ``Frame`` objects"""
+        wires = self._wires
+        for wire in wires:
+            wire.signals.clear()
+        rows, sids = np.nonzero(self._state)
+        values = self._state[rows, sids]
+        for row, sid, value in zip(rows.tolist(), sids.tolist(), values.tolist()):
+            # noinspection PyProtectedMember
+            wires[row].signals._values[sid] = value
+
+    def _step(self):
+        combinator_inputs = self._combinator_inputs
+        combinator_inputs.fill(0)
+        self._inputs.apply(self._state, combinator_inputs)
+        combinator_outputs = self._combinator_outputs
+        combinator_outputs.fill(0)
+        for group in self._groups:
+            group.evaluate(combinator_inputs, combinator_outputs)
+        self._state.fill(0)
+        self._outputs.apply(combinator_outputs, self._state)
+
+    def _begin(self):
+        if len(signal_table) > self._width:
+            self._compile()
+        self._load()
+        self._errors = np.seterr(all='ignore')
+
+    def _end(self):
+        np.seterr(**self._errors)
+        self._store()
+
+    def frame(self, index):
+        row = self._state[index]
+        sids = np.flatnonzero(row)
+        return Frame.from_ids(dict(zip(sids.tolist(), row[sids].tolist())))
+
+    def read(self, index, ids, buffer, offset):
+        row = self._state[index]
+        width = row.shape[-1]
+        for i, sid in enumerate(ids):
+            buffer[offset + i] = int(row[sid]) if sid < width else 0
+
+    def _digest(self):
+        """hash the state like ``Engine._digest``, only rehashing the rows which changed since the last call"""
+        state = self._state.reshape(-1, self._width)
+        digested = self._digested
+        if digested is None or digested.shape != state.shape:
+            self._digested = state.copy()
+            self._row_digests = [hash((row, values.tobytes())) for row, values in enumerate(state)]
+            self._state_digest = sum(self._row_digests) & _MASK
+        else:
+            changed = np.flatnonzero((state != digested).any(axis=1))
+            for row in changed.tolist():
+                digest = hash((row, state[row].tobytes()))
+                self._state_digest = (self._state_digest + digest - self._row_digests[row]) & _MASK
+                self._row_digests[row] = digest
+            digested[changed] = state[changed]
+        return self._state_digest
+
+    def _capture(self):
+        return self._state.copy()
+
+    def _matches(self, state):
+        return np.array_equal(self._state, state)
+
+
+class _ScenarioWire:
+    """a wire of a single scenario in a ``BatchEngine``, usable where ``Tick.execute`` expects a ``Wire``"""
+
+    def __init__(self, engine: 'BatchEngine', scenario: int, row: int):
+        self._engine = engine
+        self._scenario = scenario
+        self._row = row
+
+    @property
+    def signals(self) -> Frame:
+        """a copy of the signals on this wire, assign to change them"""
+        values = self._engine._state[self._scenario, self._row]
+        sids = np.flatnonzero(values)
+        return Frame.from_ids(dict(zip(sids.tolist(), values[sids].tolist())))
+
+    @signals.setter
+    def signals(self, frame: Frame):
+        engine = self._engine
+        # noinspection PyProtectedMember
+        values = frame._values
+        if values and max(values) >= engine._width:
+            engine._grow()
+        row = engine._state[self._scenario, self._row]
+        row.fill(0)
+        for sid, value in values.items():
+            row[sid] = value
+
+
+class BatchEngine(VectorEngine):
+    """simulate independent scenarios of one circuit in lockstep.
+
+    The state is a scenarios×wires×signals array, so each tick evaluates the combinators of all scenarios at once.
+    Unlike other engines, the state is not kept on the wires of the circuit: all scenarios start with empty wires,
+    and ``scenario`` gives access to the wires of a single scenario.
+    """
+
+    def __init__(self, circuit, scenarios: int):
+        """:param circuit: the circuit to simulate
+        :param scenarios: amount of scenarios
+        """
+        self._batch = (scenarios,)
+        super().__init__(circuit)
+
+    def scenario(self, index: int) -> Mapping[str, _ScenarioWire]:
+        """get the wires of a single scenario, by name"""
+        return {name: _ScenarioWire(self, index, row) for row, name in enumerate(self.circuit.wires)}
+
+    def _grow(self):
+        """recompile for newly interned signals, keeping the state"""
+        state = self._state
+        self._compile()
+        self._state[..., :state.shape[-1]] = state
+
+    def _begin(self):
+        if len(signal_table) > self._width:
+            self._grow()
+        self._errors = np.seterr(all='ignore')
+
+    def _end(self):
+        np.seterr(**self._errors)
+
+
+def _schedule(index: int, test) -> Iterator[tuple[int, int, int, Tick]]:
+    """yield the ticks of a test in order, as (simulated time, index, position, tick)"""
+    # simulated time as in ``Test.run``, which skips ticks that are out of order
+    t = previous = 0
+    # noinspection PyProtectedMember
+    for position, tick in enumerate(test._ticks):
+        t += max(tick.tick - previous, 0)
+        previous = tick.tick
+        yield t, index, position, tick
+
+
+def run_batch(circuit, tests: Sequence) -> list[Union[WrongSignalError, None]]:
+    """run tests of a circuit as scenarios of a ``BatchEngine``, instead of one after another.
+
+    :param circuit: the circuit the tests belong to
+    :param tests: the ``Test``s to run
+    :return: for each test, either the ``WrongSignalError`` it failed with or None if it passed
+    """
+    # the ticks of all tests are merged lazily, so memory doesn't grow with the amount of ticks
+    engine = BatchEngine(circuit, len(tests))
+    wires = [engine.scenario(i) for i in range(len(tests))]
+    errors = [None] * len(tests)
+    threshold = circuit.fast_forward_threshold
+    t = 0
+    for when, i, _, tick in heapq.merge(*(_schedule(i, test) for i, test in enumerate(tests))):
+        if when > t:
+            if threshold is not None and when - t >= threshold:
+                engine.fast_forward(when - t)
+            else:
+                engine.tick(when - t)
+            t = when
+        if errors[i] is None:
+            try:
+                # noinspection PyProtectedMember
+                tick.execute(wires[i], tests[i]._name)
+            except WrongSignalError as e:
+                errors[i] = e
+    return errors
@@ -0,0 +1,90 @@
+"""Multi-file fccn projects.
+
+An fccn file can import other files with ``import "path"``, relative to the directory of the importing file.
+Each file is a module which is parsed and built on its own, and cached by the hash of its source
+(see ``factorioccn.compiled.load_module``), so after a change only the changed files are parsed again.
+As a module doesn't depend on the content of the modules it imports, no other module has to be rebuilt.
+
+The modules are then linked by wire name: wires with the same name in different modules are the same wire.
+The linked circuit only contains the tests of the file which was loaded, the tests of imported files run when
+those files are loaded themselves. Each file is loaded once, even if it is imported by several modules,
+so import cycles are allowed.
+"""
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Union
+
+from factorioccn.compiled import load_module
+from factorioccn.model.core import Wire
+from factorioccn.model.toplevel import Circuit, Test
+
+
+def module_graph(path: Union[str, Path], use_cache: bool = True,
+                 load: Callable[[Path], Circuit] = None) -> dict[Path, Circuit]:
+    """load a file and all files it imports, directly or indirectly.
+
+    :param path: the file to load
+    :param use_cache: whether to look up and store the circuits in the build cache
+    :param load: if given, used instead of ``load_module`` to load each file, e.g. by ``factorioccn.watch``
+    :return: the circuit of each module by its resolved path. Modules come after the modules they import,
+        unless they import each other, and the file itself comes last
+
+    :raise OSError: if a file can't be read, e.g. an imported file doesn't exist
+    """
+    root = Path(path).resolve()
+    loaded = {}
+    modules = {}
+    stack = [(root, False)]
+    while stack:
+        file, done = stack.pop()
+        if done:
+            modules[file] = loaded[file]
+            continue
+        if file in loaded:
+            continue
+        loaded[file] = circuit = load_module(file, use_cache) if load is None else load(file)
+        stack.append((file, True))
+        stack += [((file.parent / name).resolve(), False) for name in reversed(circuit.imports)]
+    return modules
+
+
+def link(circuits: Sequence[Circuit]) -> Circuit:
+    """link the circuits of modules by wire name into a new circuit.
+
+    The combinators are moved into the new circuit, so the given circuits must not be used afterwards.
+
+    :param circuits: the circuits, which must not have been simulated yet
+    :return: the linked circuit, with all combinators in order and the tests and imports of the last circuit
+    """
+    wires = {}
+    combinators = []
+    for circuit in circuits:
+        mapping = {}
+        for name, wire in circuit.wires.items():
+            if name not in wires:
+                wires[name] = Wire()
+            mapping[id(wire)] = wires[name]
+        for combinator in circuit.combinators:
+            combinator.output_wires = [mapping[id(wire)] for wire in combinator.output_wires]
+            if hasattr(combinator, 'input_wires'):
+                combinator.input_wires = [mapping[id(wire)] for wire in combinator.input_wires]
+            combinator.connect()
+            combinators.append(combinator)
+    linked = Circuit(wires, combinators)
+    # noinspection PyProtectedMember
+    linked.tests = [Test(test._name, linked, test._ticks, test.engine) for test in circuits[-1].tests]
+    linked.imports = list(circuits[-1].imports)
+    return linked
+
+
+def load_project(path: Union[str, Path], use_cache: bool = True,
+                 load: Callable[[Path], Circuit] = None) -> Circuit:
+    """load a file and link it with all files it imports.
+
+    :param path: the file to load
+    :param use_cache: whether to look up and store the circuits in the build cache
+    :param load: if given, used to load each file, see ``module_graph``
+    :return: the linked circuit, or the circuit of the file itself if it doesn't import anything
+    """
+    circuits = list(module_graph(path, use_cache, load).values())
+    return circuits[0] if len(circuits) == 1 else link(circuits)
@@ -0,0 +1,281 @@
+"""Simplification of built circuits before simulation, e.g. ``python -m factorioccn.optimizer file.fccn``.
+
+``optimize`` rewrites a ``Circuit`` in place with three passes:
+
+* constant combinators outputting to the same wires are merged into one
+* combinators whose input is provably constant are folded into constant sources. A wire is provably constant
+  if no test sets it and it is only driven by constant combinators or folded combinators.
+  Folded parts are simulated once until they settle, and replaced by a ``ConstantCombinator`` per wire if
+  their output never changes, or else by a ``SequenceCombinator`` replaying it on a shared clock.
+  So the output of each wire keeps its per-hop delay and transient values.
+* combinators which can't affect any tested wire are removed, i.e. all but those with a path to a wire
+  used by a test
+
+The result is equivalent on every wire used by a test of the circuit. Other wires, e.g. wires only watched by
+probes, may differ. Folding simulates with Python integers, like the object and scheduled engines.
+"""
+import argparse
+import sys
+from collections import deque
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+from factorioccn.model.combinators import Combinator, ConstantCombinator, SequenceCombinator
+from factorioccn.model.core import Frame, Wire
+from factorioccn.model.toplevel import Circuit
+
+CLOCK_WIRE = '%clock'
+"""name of the wire added for ``SequenceCombinator``s, which can't clash with a wire name in fccn"""
+CLOCK_SIGNAL = 'optimizer-clock'
+
+
+@dataclass
+class Report:
+    """how much ``optimize`` simplified a circuit"""
+    combinators: int
+    """amount of combinators before optimizing"""
+    merged: int = 0
+    """constant combinators merged into another one"""
+    folded: int = 0
+    """combinators with constant input folded into constant sources"""
+    removed: int = 0
+    """combinators removed as they don't affect any tested wire"""
+    added: int = 0
+    """constant and sequence combinators added for folded combinators, including the clock"""
+
+    @property
+    def remaining(self) -> int:
+        """amount of combinators after optimizing"""
+        return self.combinators - self.merged - self.folded - self.removed + self.added
+
+    def __str__(self) -> str:
+        return f'{self.combinators} -> {self.remaining} combinators: merged {self.merged} constant combinators, ' \
+               f'folded {self.folded} into {self.added} sources, removed {self.removed} unused'
+
+
+def _inputs(combinator: Combinator) -> Sequence[Wire]:
+    return getattr(combinator, 'input_wires', ())
+
+
+def _fold(circuit: Circuit, set_: set[Wire]) -> list[Combinator]:
+    """find the combinators with provably constant input.
+
+    Wires and combinators are visited once each from a worklist, starting at the wires without drivers.
+
+    :return: the folded combinators in topological order, i.e. each after the combinators driving its input
+    """
+    # the amount of combinators driving each wire which are neither constant nor folded yet
+    drivers = {wire: len({c for c in wire.inputs if not isinstance(c, ConstantCombinator)})
+               for wire in circuit.wires.values()}
+    # the amount of input wires of each combinator which aren't known to be constant yet
+    pending = {combinator: len(set(_inputs(combinator))) for combinator in circuit.combinators
+               if not isinstance(combinator, ConstantCombinator)}
+    folded = []
+    wires = deque()  # wires which became constant
+
+    def add(wire: Wire) -> None:
+        if wire not in set_ and not drivers[wire]:
+            wires.append(wire)
+
+    def fold(combinator: Combinator) -> None:
+        folded.append(combinator)
+        for wire in dict.fromkeys(combinator.output_wires):
+            if wire in drivers:
+                drivers[wire] -= 1
+                add(wire)
+
+    for wire in circuit.wires.values():
+        add(wire)
+    for combinator, count in pending.items():
+        if not count:
+            fold(combinator)
+    while wires:
+        for combinator in dict.fromkeys(wires.popleft().outputs):
+            if combinator in pending:
+                pending[combinator] -= 1
+                if not pending[combinator]:
+                    fold(combinator)
+    return folded
+
+
+Runs = list[tuple[int, Frame]]
+"""a sequence of frames per tick as runs of equal frames, i.e. pairs of the first tick of each run and its frame.
+The first run starts at tick 0, and the last one repeats forever"""
+
+
+def _add(sequences: Sequence[Runs]) -> Runs:
+    """sum up sequences tick by tick"""
+    if len(sequences) == 1:
+        return sequences[0]
+    ticks = sorted({tick for runs in sequences for tick, _ in runs}) or [0]
+    positions = [0] * len(sequences)
+    result = []
+    for tick in ticks:
+        total = Frame()
+        for i, runs in enumerate(sequences):
+            while positions[i] + 1 < len(runs) and runs[positions[i] + 1][0] <= tick:
+                positions[i] += 1
+            total += runs[positions[i]][1]
+        if not result or total != result[-1][1]:
+            result.append((tick, total))
+    return result
+
+
+def _settle(folded: Sequence[Combinator]) -> dict[Wire, Runs]:
+    """simulate the constant part of a circuit until it settles.
+
+    The folded combinators form a directed acyclic graph, so they are evaluated in topological order,
+    once per run of equal input rather than once per tick.
+
+    :param folded: the folded combinators in topological order, see ``_fold``
+    :return: for each wire driven by a folded combinator, the sum of their output
+    """
+    outputs = {}
+    totals = {}
+
+    def total(wire: Wire) -> Runs:
+        runs = totals.get(wire)
+        if runs is None:
+            runs = totals[wire] = _add([outputs[c] if c in outputs else [(0, Frame()), (1, c.process(Frame()))]
+                                        for c in wire.inputs])
+        return runs
+
+    for combinator in folded:
+        input = _add([total(wire) for wire in _inputs(combinator)])
+        runs = [(0, Frame())]
+        for tick, frame in input:
+            output = combinator.process(frame)
+            if output != runs[-1][1]:
+                runs.append((tick + 1, output))
+        outputs[combinator] = runs
+    targets = {wire: None for combinator in folded for wire in combinator.output_wires}
+    return {wire: _add([outputs[c] for c in wire.inputs if c in outputs]) for wire in targets}
+
+
+def _frames(runs: Runs) -> list[Frame]:
+    """expand runs to the frame of each tick from 1 on, until the last run, whose frame repeats forever"""
+    frames = []
+    for i, (tick, frame) in enumerate(runs):
+        end = runs[i + 1][0] if i + 1 < len(runs) else max(tick, 1) + 1
+        frames += [frame] * (end - max(tick, 1))
+    return frames
+
+
+def _live(tested: set[Wire], folded: set[Combinator]) -> set[Combinator]:
+    """find the combinators with a path to a tested wire, not passing through folded combinators"""
+    live = set()
+    wires = list(tested)
+    seen = set(tested)
+    while wires:
+        for combinator in wires.pop().inputs:
+            if combinator not in live and combinator not in folded:
+                live.add(combinator)
+                for wire in _inputs(combinator):
+                    if wire not in seen:
+                        seen.add(wire)
+                        wires.append(wire)
+    return live
+
+
+def _merge_constants(combinators: Iterable[Combinator]) -> list[Combinator]:
+    """merge constant combinators with the same output wires, keeping the order of the first one of each"""
+    result = []
+    constants = {}
+    for combinator in combinators:
+        if not isinstance(combinator, ConstantCombinator):
+            result.append(combinator)
+            continue
+        key = tuple(sorted(id(wire) for wire in combinator.output_wires))
+        if key in constants:
+            constants[key].signals += combinator.signals
+        else:
+            constants[key] = ConstantCombinator(combinator.signals.copy(), combinator.output_wires)
+            result.append(constants[key])
+    return result
+
+
+def optimize(circuit: Circuit) -> Report:
+    """simplify a circuit in place, keeping its behaviour on all wires used by its tests.
+
+    This must be applied before simulating, as the state of the circuit is reset.
+    Afterwards, the circuit may contain an additional wire ``CLOCK_WIRE``.
+
+    :param circuit: the circuit, including its tests
+    :return: the amount of combinators merged, folded and removed
+    """
+    report = Report(len(circuit.combinators))
+    expected_names, set_names = set(), set()
+    for test in circuit.tests:
+        expected, set_ = test.wires()
+        expected_names |= expected
+        set_names |= set_
+    wires = circuit.wires
+    tested = {wires[name] for name in expected_names | set_names if name in wires}
+    order = _fold(circuit, {wires[name] for name in set_names if name in wires})
+    try:
+        sequences = _settle(order)
+    except ArithmeticError:  # e.g. division by zero, which is left to fail at simulation
+        order, sequences = [], {}
+    folded = set(order)
+    live = _live(tested, folded)
+    kept = [c for c in circuit.combinators if c in live]
+    report.folded = len(folded)
+    report.removed = len(circuit.combinators) - len(kept) - len(folded)
+    combinators = _merge_constants(kept)
+    report.merged = len(kept) - len(combinators)
+
+    # materialize folded output on the constant wires which are tested or read by a kept combinator
+    needed = set(tested)
+    for combinator in combinators:
+        needed.update(_inputs(combinator))
+    clock = None
+    length = 1
+    for wire in wires.values():
+        if wire not in needed or not any(c in folded for c in wire.inputs):
+            continue
+        frames = _frames(sequences[wire])
+        if all(frame == frames[-1] for frame in frames):
+            if frames[-1]:
+                combinators.append(ConstantCombinator(frames[-1].copy(), [wire]))
+                report.added += 1
+            continue
+        if clock is None:
+            clock = Wire()
+        combinators.append(SequenceCombinator([clock], CLOCK_SIGNAL, frames, [wire]))
+        report.added += 1
+        length = max(length, len(frames))
+    if clock is not None:
+        # counts from 1 up to the length of the longest sequence and stays there
+        counter = [Frame({CLOCK_SIGNAL: i}) for i in range(1, length + 1)]
+        combinators.append(SequenceCombinator([clock], CLOCK_SIGNAL, counter, [clock]))
+        report.added += 1
+        wires[CLOCK_WIRE] = clock
+
+    for wire in wires.values():
+        wire.inputs.clear()
+        wire.outputs.clear()
+        wire.signals = Frame()
+    for combinator in combinators:
+        combinator.input = Frame()
+        combinator.connect()
+    circuit.combinators = combinators
+    circuit.time = 0
+    # noinspection PyProtectedMember
+    circuit._engine = None
+    return report
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m factorioccn.optimizer',
+                                     description='Show how much the circuits of fccn files can be simplified.')
+    parser.add_argument('paths', nargs='+', metavar='path', help='fccn files or directories containing them')
+    options = parser.parse_args(args)
+    from factorioccn.compiled import load_source
+    from factorioccn.runner import collect_files
+    for file in collect_files(options.paths):
+        print(f'{file}: {optimize(load_source(file))}')
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
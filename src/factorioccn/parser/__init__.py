@@ -1,14 +1,75 @@
-from importlib import resources
+"""Parsing of fccn code.
 
-from tatsu import compile
-from tatsu.semantics import ModelBuilderSemantics
+The parser is generated from ``grammar.ebnf`` by TatSu once and kept in the cache (see ``factorioccn.cache``),
+keyed by the hash of the grammar and the TatSu version. A cached parser which can't be loaded, e.g. a truncated file,
+is generated again, and if that fails too, the parser is compiled in memory.
+TatSu itself is only imported on the first call to ``parse``.
+"""
+import hashlib
 
 from factorioccn.model.toplevel import Circuit
-from factorioccn.parser.builders import CircuitBuilder
 
-with resources.open_text('factorioccn.parser', 'grammar.ebnf') as grammar_file:
-    _grammar = grammar_file.read()
-_parser = compile(_grammar, semantics=ModelBuilderSemantics())
+_parser = None
+_COMPLETE = b'\n# end of the generated parser\n'
+"""appended to generated parsers, as a truncated parser may still be valid Python"""
+
+
+def _load_parser():
+    """load the generated parser from the cache, generating it if necessary"""
+    import tatsu
+    from importlib import resources, util
+    with resources.open_text('factorioccn.parser', 'grammar.ebnf') as grammar_file:
+        grammar = grammar_file.read()
+    key = hashlib.sha256(f'{tatsu.__version__}\n{grammar}'.encode()).hexdigest()[:16]
+    try:
+        from factorioccn.cache import cache_dir, write_atomic
+        path = cache_dir('parsers') / f'fccn_parser_{key}.py'
+        for attempt in range(2):
+            if attempt or not path.exists():
+                write_atomic(path, tatsu.to_python_sourcecode(grammar).encode() + _COMPLETE)
+            if not path.read_bytes().endswith(_COMPLETE):
+                continue  # e.g. a truncated file, which is generated again once
+            try:
+                spec = util.spec_from_file_location(f'factorioccn_generated_parser_{key}', path)
+                module = util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                return module.fccnParser()
+            except (SyntaxError, ValueError, ImportError, AttributeError):
+                pass  # e.g. a foreign file, which is generated again once as well
+    except OSError:
+        pass
+    # no usable cache, compile in memory
+    return tatsu.compile(grammar)
+
+
+def parse_model(input: str):
+    """parse fccn code into its syntax tree, i.e. the first half of ``parse``.
+
+    :param input: the code to parse as a string
+    :return: the syntax tree, see ``build``
+    """
+    global _parser
+    from tatsu.semantics import ModelBuilderSemantics
+    if _parser is None:
+        _parser = _load_parser()
+    return _parser.parse(input, semantics=ModelBuilderSemantics())
+
+
+def build(*models) -> Circuit:
+    """build the simulation object from a syntax tree returned by ``parse_model``, i.e. the second half of ``parse``.
+
+    :param models: the syntax tree. Several trees are built like the concatenation of their code,
+        e.g. the trees of the single statements of a file
+    :return: the resulting circuit
+    """
+    from factorioccn.parser.builders import CircuitBuilder
+    walker = CircuitBuilder()
+    if len(models) == 1:
+        return walker.walk(models[0])
+    for model in models:
+        walker.walk(model.lines)
+    # noinspection PyProtectedMember
+    return walker._finalize()
 
 
 def parse(input: str) -> Circuit:
@@ -17,6 +78,4 @@ def parse(input: str) -> Circuit:
     :param input: the code to parse as a string
     :return: the resulting circuit
     """
-    model = _parser.parse(input)
-    walker = CircuitBuilder()
-    return walker.walk(model)
+    return build(parse_model(input))
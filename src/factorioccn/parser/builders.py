@@ -4,11 +4,10 @@ from typing import MutableMapping
 from tatsu.ast import AST
 from tatsu.walkers import NodeWalker
 
-from factorioccn.model.combinators import BinaryCombinator, Combinator, ArithmeticCombinator, DeciderCombinator, \
-    ConstantCombinator
-from factorioccn.model.core import Frame, Wire
-from factorioccn.model.testing import TestExpects, TestOperation, TestSets, Tick
-from factorioccn.model.toplevel import Circuit, Test
+from factorioccn.model.combinators import Combinator, ArithmeticCombinator, DeciderCombinator, ConstantCombinator
+from factorioccn.model.core import Frame, Wire, signal_table, WILDCARDS
+from factorioccn.model.testing import TestExpects, TestOperation, TestSets, Tick, Timeline
+from factorioccn.model.toplevel import Circuit, Template, Test
 
 
 # noinspection PyMethodMayBeStatic
@@ -19,6 +18,12 @@ class CommonBuilder(NodeWalker):
         except AttributeError:  # empty constframe has no signals
             return Frame()
 
+    def _intern(self, *operands):
+        """intern all operands which are actual signals, so signal ids are assigned at parse time"""
+        for operand in operands:
+            if isinstance(operand, str) and operand not in WILDCARDS:
+                signal_table.intern(operand)
+
 
 class TestBuilder(CommonBuilder):
     def __init__(self, parent):
@@ -30,19 +35,22 @@ class TestBuilder(CommonBuilder):
 
     def walk__test(self, node: AST):
         self.walk(node.lines)
-        self.parent.add_test(node.name, self.ticks)
+        self.parent.add_test(node.name, Timeline(self.ticks))
 
     def walk__teststmt(self, node):
         # TODO: handle out-of-order ticks or raise error
         tick = TestTickBuilder(node.tick)
         tick.walk(node.cmds)
-        for i in range(self.last + 1, tick.tick):
-            gap = TestTickBuilder(i)
-            self.holds = [r for r in (h.apply(gap) for h in self.holds) if r]
-            if not gap.empty():
-                self.ticks.append(gap.finalize())
+        start = self.last + 1
+        while start < tick.tick and self.holds:
+            # the gap up to the next statement or the end of a hold is a run of identical ticks
+            stop = min([tick.tick] + [h.end for h in self.holds])
+            gap = TestTickBuilder(start)
+            self.holds = [r for r in (h.apply(gap) for h in self.holds) if r.end > stop]
+            self.ticks.append(gap.finalize(stop - start))
+            start = stop
         self.holds += tick.holds
-        self.holds = [r for r in (h.apply(tick) for h in self.holds) if r]
+        self.holds = [r for r in (h.apply(tick) for h in self.holds) if r.end > tick.tick + 1]
         self.ticks.append(tick.finalize())
         self.last = tick.tick
 
@@ -53,11 +61,35 @@ class CircuitBuilder(CommonBuilder):
         self.wires: MutableMapping[str, Wire] = {}
         self.combinators: MutableSequence[Combinator] = []
         self.tests: MutableSequence[Callable] = []
+        self.imports: MutableSequence[str] = []
+        self.templates: MutableMapping[str, Template] = {}
 
     def walk__circuit(self, node: AST):
         self.walk(node.lines)
         return self._finalize()
 
+    def walk__import(self, node: AST):
+        self.imports.append(node.path[1:-1])
+
+    def walk__template(self, node: AST):
+        builder = TemplateBuilder(self)
+        builder.walk(node)
+
+    def walk__instance(self, node: AST):
+        template = self.templates.get(node.template)
+        if template is None:
+            raise ValueError(f'unknown template {node.template}')
+        wires = node.wires or []
+        if len(wires) != len(template.params):
+            raise ValueError(f'template {template.name} has {len(template.params)} wires, but {node.name} binds '
+                             f'{len(wires)}')
+        names = dict(zip(template.params, wires))
+        # wires which are local to the template are named after the instance, e.g. 'latch1.loop'
+        names.update((wire, f'{node.name}.{wire}') for wire in template.wires if wire not in names)
+        wires = dict(zip(names, self._process_wires(list(names.values()))))
+        for combinator in template.instantiate(wires):
+            self._register_combinator(combinator)
+
     def walk__combinatorstmt(self, node: AST):
         input = self._process_wires(node.input) if node.input is not None else None
         output = self._process_wires(node.output)
@@ -66,6 +98,7 @@ class CircuitBuilder(CommonBuilder):
 
     # noinspection PyMethodMayBeStatic
     def walk__arithmetic(self, node: AST, inputs, outputs):
+        self._intern(node.left, node.right, node.result)
         return ArithmeticCombinator(inputs, node.left, node.op, node.right, node.result, outputs)
 
     # noinspection PyMethodMayBeStatic
@@ -74,6 +107,7 @@ class CircuitBuilder(CommonBuilder):
         output_value = node.result.value
         if output_value is not None:
             output_value = 1
+        self._intern(node.left, node.right, output_signal)
         return DeciderCombinator(inputs, node.left, node.op, node.right, output_signal, output_value, outputs)
 
     # noinspection PyMethodMayBeStatic
@@ -94,11 +128,7 @@ class CircuitBuilder(CommonBuilder):
 
     def _register_combinator(self, combinator):
         self.combinators.append(combinator)
-        if isinstance(combinator, BinaryCombinator):
-            for wire in combinator.input_wires:
-                wire.outputs.append(combinator)
-        for wire in combinator.output_wires:
-            wire.inputs.append(combinator)
+        combinator.connect()
 
     def add_test(self, name: str, ticks: Sequence[Tick]):
         self.tests.append(lambda circuit: Test(name, circuit, ticks))
@@ -106,9 +136,31 @@ class CircuitBuilder(CommonBuilder):
     def _finalize(self):
         circuit = Circuit(self.wires, self.combinators)
         circuit.tests = [t(circuit) for t in self.tests]
+        circuit.imports = list(self.imports)
         return circuit
 
 
+class TemplateBuilder(CircuitBuilder):
+    """build the combinators of a template once, with wires of its own which are only used to find their names"""
+
+    def __init__(self, parent: CircuitBuilder):
+        super().__init__()
+        self.parent = parent
+
+    def walk__template(self, node: AST):
+        self.walk(node.lines)
+        names = {id(wire): name for name, wire in self.wires.items()}
+        combinators = []
+        for combinator in self.combinators:
+            inputs = [names[id(wire)] for wire in getattr(combinator, 'input_wires', ())]
+            outputs = [names[id(wire)] for wire in combinator.output_wires]
+            if hasattr(combinator, 'input_wires'):
+                combinator.input_wires = []
+            combinator.output_wires = []
+            combinators.append((combinator, inputs, outputs))
+        self.parent.templates[node.name] = Template(node.name, node.params or [], combinators)
+
+
 class TestCmdsBuilder(CommonBuilder):
     def __init__(self):
         super().__init__()
@@ -128,7 +180,7 @@ class TestCmdsBuilder(CommonBuilder):
     def _merge_slice(dest: MutableMapping[str, TestOperation], op: TestOperation):
         wire = op.wire
         if wire in dest:
-            dest[wire].values += op.values
+            dest[wire].merge(op)
         else:
             dest[wire] = op.copy()
 
@@ -149,24 +201,23 @@ class TestTickBuilder(TestCmdsBuilder):
         self.holds: MutableSequence[TestHoldBuilder] = []
 
     def walk__testhold(self, node):
-        builder = TestHoldBuilder(node.count)
+        builder = TestHoldBuilder(self.tick + max(node.count, 1))
         builder.walk(node.cmds)
         self.holds.append(builder)
 
-    def finalize(self):
-        return Tick(self.tick, list(self.expects.values()), list(self.sets.values()))
+    def finalize(self, count: int = 1):
+        return Tick(self.tick, list(self.expects.values()), list(self.sets.values()), count)
 
 
 class TestHoldBuilder(TestCmdsBuilder):
-    def __init__(self, count: int):
+    def __init__(self, end: int):
         super().__init__()
-        self.count = count
+        self.end = end
+        """the first tick after the hold"""
 
     def apply(self, tick: TestTickBuilder):
         for sets in self.sets.values():
             tick.add_sets(sets)
         for expects in self.expects.values():
             tick.add_expects(expects)
-        self.count -= 1
-        if self.count > 0:
-            return self
+        return self
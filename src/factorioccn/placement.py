@@ -0,0 +1,477 @@
+"""Placement of built circuits for blueprints, e.g. ``python -m factorioccn.placement file.fccn``.
+
+``place`` assigns each combinator of a ``Circuit`` a position, and connects the combinators on each wire
+within the circuit wire reach of Factorio, adding medium electric poles as relays where they are too far apart:
+
+* combinators are placed greedily in breadth-first order over shared wires, each one on the free slot nearest
+  to the centroids of the wires it is connected to. Slots are 1x2 tiles. Every ``spacing``-th column of tiles
+  is kept free for poles, which also power the combinators
+* the placement is then improved by moving combinators closer to those centroids. The cost of a placement is
+  the sum of the squared distances of the combinators on each wire to its centroid, which is kept per wire as
+  running sums, so the cost of a move is updated in constant time per wire of the combinator
+* the combinators on each wire are connected to neighbours within reach, and the remaining groups are connected
+  to the nearest group already connected with a chain of relay poles
+
+All neighbour and reach queries use ``SpatialGrid``, so placing scales about linearly with the amount of
+combinators rather than with all pairs of them. Distances are measured between the centres of entities,
+with a margin of a tile for combinators as their connection points are at their ends.
+Wire colors aren't assigned yet, so each relay pole only carries a single wire.
+"""
+import argparse
+import heapq
+import math
+import sys
+from collections.abc import Hashable, Iterator
+from dataclasses import dataclass, field
+from typing import Union
+
+from factorioccn.model.combinators import Combinator
+from factorioccn.model.toplevel import Circuit
+
+REACH = 9
+"""circuit wire reach of combinators and medium electric poles in tiles"""
+
+Point = tuple[float, float]
+Node = Union[Combinator, int]
+"""an endpoint of a connection: a combinator, or the index of a relay pole in ``Placement.poles``"""
+
+
+class SpatialGrid:
+    """a spatial hash grid of items at points, for queries of the items near a point.
+
+    The plane is split into square cells, and only the cells overlapping the query area are searched.
+    """
+
+    def __init__(self, cell: float):
+        """create an empty grid.
+
+        :param cell: edge length of the cells, ideally about the radius of the typical query
+        """
+        self.cell = cell
+        self.positions: dict[Hashable, Point] = {}
+        """position of each item"""
+        self._cells: dict[tuple[int, int], dict[Hashable, Point]] = {}
+        self._bounds = None
+        """min and max cell coordinates ever used, bounding the search of ``nearest``"""
+
+    def _key(self, x: float, y: float) -> tuple[int, int]:
+        return math.floor(x / self.cell), math.floor(y / self.cell)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, item) -> bool:
+        return item in self.positions
+
+    def add(self, item: Hashable, x: float, y: float) -> None:
+        """add an item at a point, which must not be in the grid yet"""
+        key = self._key(x, y)
+        self._cells.setdefault(key, {})[item] = x, y
+        self.positions[item] = x, y
+        if self._bounds is None:
+            self._bounds = [*key, *key]
+        else:
+            bounds = self._bounds
+            bounds[0], bounds[1] = min(bounds[0], key[0]), min(bounds[1], key[1])
+            bounds[2], bounds[3] = max(bounds[2], key[0]), max(bounds[3], key[1])
+
+    def remove(self, item: Hashable) -> None:
+        """remove an item
+
+        :raise KeyError: if the item isn't in the grid
+        """
+        key = self._key(*self.positions.pop(item))
+        cell = self._cells[key]
+        del cell[item]
+        if not cell:
+            del self._cells[key]
+
+    def within(self, x: float, y: float, radius: float) -> Iterator[Hashable]:
+        """iterate over the items at most ``radius`` away from a point, in no particular order"""
+        limit = radius * radius + 1e-9
+        left, top = self._key(x - radius, y - radius)
+        right, bottom = self._key(x + radius, y + radius)
+        cells = self._cells
+        for cx in range(left, right + 1):
+            for cy in range(top, bottom + 1):
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    continue
+                for item, (ix, iy) in cell.items():
+                    if (ix - x) ** 2 + (iy - y) ** 2 <= limit:
+                        yield item
+
+    def nearest(self, x: float, y: float) -> Union[Hashable, None]:
+        """get the item nearest to a point, None if the grid is empty"""
+        if not self.positions:
+            return None
+        cx, cy = self._key(x, y)
+        left, top, right, bottom = self._bounds
+        reach = max(cx - left, right - cx, cy - top, bottom - cy)
+        cells = self._cells
+        best, best_distance = None, math.inf
+        for ring in range(reach + 1):
+            # all points in this ring are at least (ring - 1) cells away, so a nearer item can't be further out
+            if best is not None and best_distance <= ((ring - 1) * self.cell) ** 2:
+                break
+            if ring == 0:
+                keys = [(cx, cy)]
+            else:
+                keys = [(cx + d, cy - ring) for d in range(-ring, ring + 1)]
+                keys += [(cx + d, cy + ring) for d in range(-ring, ring + 1)]
+                keys += [(cx - ring, cy + d) for d in range(1 - ring, ring)]
+                keys += [(cx + ring, cy + d) for d in range(1 - ring, ring)]
+            for key in keys:
+                cell = cells.get(key)
+                if cell is None:
+                    continue
+                for item, (ix, iy) in cell.items():
+                    distance = (ix - x) ** 2 + (iy - y) ** 2
+                    if distance < best_distance:
+                        best, best_distance = item, distance
+        return best
+
+
+@dataclass
+class Placement:
+    """positions of the combinators of a circuit, and the connections of each wire"""
+    positions: dict[Combinator, tuple[int, int]]
+    """position of the upper tile of each combinator, which are all placed vertically and take 1x2 tiles"""
+    poles: list[tuple[int, int]] = field(default_factory=list)
+    """position of each relay pole, which take 1x1 tiles"""
+    connections: dict[str, list[tuple[Node, Node]]] = field(default_factory=dict)
+    """connections between the combinators and relays on each wire, by wire name"""
+    cost: float = 0.0
+    """the sum of the squared distances of the combinators on each wire to its centroid, see ``place``"""
+
+    @property
+    def relays(self) -> int:
+        """amount of relay poles"""
+        return len(self.poles)
+
+    def centre(self, node: Node) -> Point:
+        """get the centre of a combinator or relay pole"""
+        if isinstance(node, int):
+            x, y = self.poles[node]
+            return x + 0.5, y + 0.5
+        x, y = self.positions[node]
+        return x + 0.5, y + 1.0
+
+    def span(self) -> float:
+        """get the length of the longest connection, 0 if there aren't any"""
+        return max((math.dist(self.centre(a), self.centre(b))
+                    for connections in self.connections.values() for a, b in connections), default=0.0)
+
+    def __str__(self) -> str:
+        tiles = [*self.positions.values(), *self.poles]
+        if tiles:
+            width = max(x for x, _ in tiles) - min(x for x, _ in tiles) + 1
+            height = max(y for _, y in tiles) - min(y for _, y in tiles) + 2
+        else:
+            width = height = 0
+        return f'{len(self.positions)} combinators in {width}x{height} tiles, {self.relays} relay poles, ' \
+               f'longest connection {self.span():.1f} tiles'
+
+
+class _Placer:
+    """the state of ``place``. Slots are numbered by column and row, skipping the columns kept for poles"""
+
+    def __init__(self, circuit: Circuit, spacing: int):
+        self.columns = spacing - 1
+        """combinator columns between two pole columns"""
+        self.spacing = spacing
+        self.combinators = list(circuit.combinators)
+        names = {id(wire): name for name, wire in circuit.wires.items()}
+        self.names: list[str] = []
+        """name of each wire by index"""
+        index = {}
+        self.nets: dict[Combinator, list[int]] = {}
+        """wires of each combinator, by index"""
+        for combinator in self.combinators:
+            nets = []
+            for wire in (*getattr(combinator, 'input_wires', ()), *combinator.output_wires):
+                i = index.get(id(wire))
+                if i is None:
+                    i = index[id(wire)] = len(self.names)
+                    self.names.append(names.get(id(wire), f'%{i}'))
+                if i not in nets:
+                    nets.append(i)
+            self.nets[combinator] = nets
+        self.members: list[list[Combinator]] = [[] for _ in self.names]
+        """combinators on each wire"""
+        for combinator, nets in self.nets.items():
+            for i in nets:
+                self.members[i].append(combinator)
+        self.weight = [1 / max(len(members) - 1, 1) for members in self.members]
+        """weight of the cost of each wire, so large wires like a bus don't pull their combinators together"""
+        # running sums of the placed combinators on each wire: count, x, y and x² + y²
+        self.count = [0] * len(self.names)
+        self.sx = [0.0] * len(self.names)
+        self.sy = [0.0] * len(self.names)
+        self.sq = [0.0] * len(self.names)
+        self.slots: dict[tuple[int, int], Combinator] = {}
+        self.where: dict[Combinator, tuple[int, int]] = {}
+        self.free = SpatialGrid(16)
+        """free slots next to occupied ones, and initially the origin"""
+        self.free.add((0, 0), *self.centre((0, 0)))
+
+    def centre(self, slot: tuple[int, int]) -> Point:
+        i, j = slot
+        return (i // self.columns) * self.spacing + i % self.columns + 0.5, 2 * j + 1.0
+
+    def order(self) -> list[Combinator]:
+        """get the combinators in breadth-first order over shared wires, starting in circuit order.
+
+        The smallest wire reached so far is followed first, one combinator at a time, so e.g. chains of
+        combinators connected to a bus are placed one after the other rather than all around the bus.
+        """
+        order = []
+        seen = set()
+        cursor = [0] * len(self.members)
+        """members of each wire already followed"""
+        pending = []
+
+        def visit(combinator):
+            seen.add(combinator)
+            order.append(combinator)
+            for i in self.nets[combinator]:
+                if cursor[i] < len(self.members[i]):
+                    heapq.heappush(pending, (len(self.members[i]), i))
+
+        for start in self.combinators:
+            if start in seen:
+                continue
+            visit(start)
+            while pending:
+                size, i = heapq.heappop(pending)
+                members = self.members[i]
+                while cursor[i] < size and members[cursor[i]] in seen:
+                    cursor[i] += 1
+                if cursor[i] < size:
+                    visit(members[cursor[i]])
+                    heapq.heappush(pending, (size, i))
+        return order
+
+    def target(self, combinator: Combinator, placed: Union[Point, None]) -> Union[Point, None]:
+        """get the point minimizing the cost of a combinator, given the other combinators on its wires.
+
+        :param combinator: the combinator
+        :param placed: its centre if it is placed, in which case it doesn't count itself
+        :return: the point, None if no other combinator on its wires is placed
+        """
+        x = y = weight = 0.0
+        for i in self.nets[combinator]:
+            n, sx, sy = self.count[i], self.sx[i], self.sy[i]
+            if placed is not None:
+                n, sx, sy = n - 1, sx - placed[0], sy - placed[1]
+            if n <= 0:
+                continue
+            # adding a point p to n points with centroid c adds n / (n + 1) * |p - c|² to their cost
+            w = self.weight[i] * n / (n + 1)
+            x += w * sx / n
+            y += w * sy / n
+            weight += w
+        if weight == 0:
+            return None
+        return x / weight, y / weight
+
+    def delta(self, combinator: Combinator, old: Point, new: Point) -> float:
+        """get the change of cost by moving a placed combinator"""
+        change = 0.0
+        for i in self.nets[combinator]:
+            n, sx, sy = self.count[i], self.sx[i], self.sy[i]
+            moved_x, moved_y = sx - old[0] + new[0], sy - old[1] + new[1]
+            change += self.weight[i] * (new[0] ** 2 + new[1] ** 2 - old[0] ** 2 - old[1] ** 2
+                                        - (moved_x ** 2 + moved_y ** 2 - sx ** 2 - sy ** 2) / n)
+        return change
+
+    def update(self, combinator: Combinator, point: Point, sign: int) -> None:
+        x, y = point
+        for i in self.nets[combinator]:
+            self.count[i] += sign
+            self.sx[i] += sign * x
+            self.sy[i] += sign * y
+            self.sq[i] += sign * (x * x + y * y)
+
+    def occupy(self, combinator: Combinator, slot: tuple[int, int]) -> None:
+        self.slots[slot] = combinator
+        self.where[combinator] = slot
+        self.free.remove(slot)
+        i, j = slot
+        for neighbour in ((i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1)):
+            if neighbour not in self.slots and neighbour not in self.free:
+                self.free.add(neighbour, *self.centre(neighbour))
+        self.update(combinator, self.centre(slot), 1)
+
+    def vacate(self, combinator: Combinator) -> None:
+        slot = self.where.pop(combinator)
+        del self.slots[slot]
+        self.free.add(slot, *self.centre(slot))
+        self.update(combinator, self.centre(slot), -1)
+
+    def cost(self) -> float:
+        return sum(w * (sq - (sx * sx + sy * sy) / n)
+                   for w, n, sx, sy, sq in zip(self.weight, self.count, self.sx, self.sy, self.sq) if n)
+
+    def place(self, passes: int) -> None:
+        order = self.order()
+        last = self.centre((0, 0))
+        for combinator in order:
+            target = self.target(combinator, None) or last
+            slot = self.free.nearest(*target)
+            self.occupy(combinator, slot)
+            last = self.centre(slot)
+        for _ in range(passes):
+            for combinator in order:
+                old = self.centre(self.where[combinator])
+                target = self.target(combinator, old)
+                if target is None:
+                    continue
+                slot = self.free.nearest(*target)
+                if self.delta(combinator, old, self.centre(slot)) < -1e-9:
+                    self.vacate(combinator)
+                    self.occupy(combinator, slot)
+
+
+class _Router:
+    """connects the combinators on each wire, adding relay poles"""
+
+    def __init__(self, placement: Placement, reach: float, spacing: int):
+        self.placement = placement
+        self.reach = reach
+        self.spacing = spacing
+        self.used: set[tuple[int, int]] = set()
+        """tiles of relay poles"""
+
+    def limit(self, a: Node, b: Node) -> float:
+        """get the maximum distance between the centres of two connected nodes"""
+        return self.reach if isinstance(a, int) and isinstance(b, int) else self.reach - 1
+
+    def relay(self, start: Point, reach: float, end: Point) -> tuple[int, int]:
+        """find a free pole tile within ``reach`` of ``start`` nearest to ``end``
+
+        :raise ValueError: if all pole tiles within reach are used
+        """
+        x, y = start
+        best, best_distance = None, math.inf
+        limit = reach ** 2 + 1e-9
+        first = math.ceil((x - 0.5 - reach - self.spacing + 1) / self.spacing) * self.spacing + self.spacing - 1
+        for px in range(first, math.floor(x - 0.5 + reach) + 1, self.spacing):
+            for py in range(math.ceil(y - 0.5 - reach), math.floor(y - 0.5 + reach) + 1):
+                cx, cy = px + 0.5, py + 0.5
+                if (cx - x) ** 2 + (cy - y) ** 2 > limit or (px, py) in self.used:
+                    continue
+                distance = (cx - end[0]) ** 2 + (cy - end[1]) ** 2
+                if distance < best_distance:
+                    best, best_distance = (px, py), distance
+        if best is None:
+            raise ValueError(f'no free tile for a relay pole near {start}')
+        return best
+
+    def bridge(self, a: Node, b: Node, connections: list, tree: SpatialGrid) -> None:
+        """connect two nodes with a chain of relay poles, which are added to ``tree``"""
+        placement = self.placement
+        end = placement.centre(b)
+        node = a
+        while math.dist(placement.centre(node), end) > self.limit(node, b) + 1e-9:
+            tile = self.relay(placement.centre(node), self.limit(node, -1), end)
+            self.used.add(tile)
+            pole = len(placement.poles)
+            placement.poles.append(tile)
+            connections.append((node, pole))
+            tree.add(pole, *placement.centre(pole))
+            node = pole
+        connections.append((node, b))
+
+    def connect(self, members: list[Combinator]) -> list[tuple[Node, Node]]:
+        """connect the combinators on a wire"""
+        centre = self.placement.centre
+        reach = self.reach - 1
+        grid = SpatialGrid(reach)
+        for combinator in members:
+            grid.add(combinator, *centre(combinator))
+        parent = {combinator: combinator for combinator in members}
+
+        def find(node):
+            while parent[node] is not node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        connections = []
+        for combinator in members:
+            point = centre(combinator)
+            # nearest first, so the connections are about as short as they can be
+            for other in sorted(grid.within(*point, reach), key=lambda o: math.dist(point, centre(o))):
+                a, b = find(combinator), find(other)
+                if a is not b:
+                    parent[a] = b
+                    connections.append((combinator, other))
+        groups = {}
+        for combinator in members:
+            groups.setdefault(find(combinator), []).append(combinator)
+        if len(groups) == 1:
+            return connections
+        # connect the other groups to the first one, nearest groups first so relays can be reused
+        groups = list(groups.values())
+        tree = SpatialGrid(reach)
+        for combinator in groups[0]:
+            tree.add(combinator, *centre(combinator))
+        origin = centre(groups[0][0])
+        for group in sorted(groups[1:], key=lambda g: math.dist(centre(g[0]), origin)):
+            best = None
+            for combinator in group:
+                point = centre(combinator)
+                nearest = tree.nearest(*point)
+                distance = math.dist(point, centre(nearest))
+                if best is None or distance < best[0]:
+                    best = distance, combinator, nearest
+            _, a, b = best
+            self.bridge(b, a, connections, tree)
+            for combinator in group:
+                tree.add(combinator, *centre(combinator))
+        return connections
+
+
+def place(circuit: Circuit, reach: float = REACH, spacing: int = 4, passes: int = 1) -> Placement:
+    """place the combinators of a circuit and connect them within reach.
+
+    :param circuit: the circuit, which is not modified
+    :param reach: the circuit wire reach in tiles
+    :param spacing: distance between the columns kept free for poles, at least 2 and at most ``reach``
+    :param passes: amount of passes moving the combinators closer to the others on their wires
+    :return: the placement
+    """
+    if not 2 <= spacing <= reach:
+        raise ValueError(f'spacing must be between 2 and the reach, got {spacing}')
+    placer = _Placer(circuit, spacing)
+    placer.place(passes)
+    positions = {}
+    for combinator in placer.combinators:
+        x, y = placer.centre(placer.where[combinator])
+        positions[combinator] = int(x - 0.5), int(y - 1)
+    placement = Placement(positions, cost=placer.cost())
+    router = _Router(placement, reach, spacing)
+    for name, members in zip(placer.names, placer.members):
+        if len(members) > 1:
+            placement.connections[name] = router.connect(members)
+    return placement
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m factorioccn.placement',
+                                     description='Show how the circuits of fccn files would be placed.')
+    parser.add_argument('paths', nargs='+', metavar='path', help='fccn files or directories containing them')
+    parser.add_argument('--reach', type=float, default=REACH, help='circuit wire reach, default %(default)s')
+    parser.add_argument('--spacing', type=int, default=4,
+                        help='distance between the columns of poles, default %(default)s')
+    options = parser.parse_args(args)
+    from factorioccn.compiled import load_source
+    from factorioccn.runner import collect_files
+    for file in collect_files(options.paths):
+        print(f'{file}: {place(load_source(file), options.reach, options.spacing)}')
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
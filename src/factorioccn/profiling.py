@@ -0,0 +1,222 @@
+"""Opt-in profiling of circuit simulation per combinator and per wire.
+
+``Profile.instrument`` swaps the combinators of a circuit for stand-ins timing their ``process``, and replaces
+``Wire.tick`` with an instrumented version on the wire instances. Both are undone afterwards,
+so there is no overhead at all while not profiling. Stand-ins also work for combinators which don't allow
+setting attributes, like the slotted ``InstanceCombinator``s of templates.
+Engines which don't call these, e.g. the vectorized engine, are not covered.
+The scheduled engine only calls ``Combinator.process`` for changed inputs and never ``Wire.tick``,
+so its profile shows the work it actually does.
+
+Results are available as a table of hot spots and in the collapsed stack format used by flamegraph tools.
+"""
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Union
+
+from factorioccn.model.combinators import Combinator
+from factorioccn.model.core import Wire
+from factorioccn.model.toplevel import Circuit
+from factorioccn.runner import TestResult, collect_files, run_test
+
+
+@dataclass
+class Stats:
+    """measurements of a single combinator or wire"""
+    count: int = 0
+    """amount of evaluations"""
+    time: float = 0.0
+    """cumulative time in seconds"""
+    signals: int = 0
+    """amount of signals processed, i.e. input signals of combinators and signals passed on by wires"""
+
+
+def describe(combinator: Combinator, index: int, wire_names: Mapping[Wire, str]) -> str:
+    """describe a combinator in fccn notation, prefixed by its index in the circuit"""
+    inputs = ', '.join(wire_names[w] for w in getattr(combinator, 'input_wires', ()) or ())
+    outputs = ', '.join(wire_names[w] for w in combinator.output_wires)
+    return f'#{index} {inputs + " -> " if inputs else ""}{combinator} -> {outputs}'
+
+
+class _TimedCombinator(Combinator):
+    """stands in for a combinator while profiling, timing each call of its ``process``"""
+    __slots__ = ('combinator', 'input_wires', '_profile', '_key')
+
+    def __init__(self, combinator: Combinator, profile: 'Profile', key: tuple[str, str]):
+        super().__init__(combinator.output_wires)
+        self.combinator = combinator
+        self.input = combinator.input  # keeps input which was already written, e.g. by ``Wire.tick``
+        self.input_wires = getattr(combinator, 'input_wires', ())
+        self._profile = profile
+        self._key = key
+
+    def __str__(self):
+        return str(self.combinator)
+
+    def process(self, input):
+        start = time.perf_counter()
+        output = self.combinator.process(input)
+        elapsed = time.perf_counter() - start
+        # noinspection PyProtectedMember
+        stats = self._profile._current[self._key]
+        stats.count += 1
+        stats.time += elapsed
+        stats.signals += len(input)
+        return output
+
+
+class Profile:
+    """collects ``Stats`` of instrumented circuits, grouped by sections like the file and test being run"""
+
+    def __init__(self):
+        self.sections: dict[tuple[str, ...], dict[tuple[str, str], Stats]] = {}
+        """stats by section and (kind, name) of the element, kind being either 'combinator' or 'wire'"""
+        self.times: dict[tuple[str, ...], float] = defaultdict(float)
+        """total time spent in each section"""
+        self._context: tuple[str, ...] = ()
+        self._current = self._stats(())
+
+    def _stats(self, context: tuple[str, ...]) -> dict[tuple[str, str], Stats]:
+        if context not in self.sections:
+            self.sections[context] = defaultdict(Stats)
+        return self.sections[context]
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """attribute all measurements within this context to a nested section, e.g. a test"""
+        outer = self._context
+        self._context = outer + (name,)
+        self._current = self._stats(self._context)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[self._context] += time.perf_counter() - start
+            self._context = outer
+            self._current = self._stats(outer)
+
+    @contextmanager
+    def instrument(self, circuit: Circuit) -> Iterator[None]:
+        """instrument the combinators and wires of a circuit within this context.
+
+        The combinators are swapped for stand-ins in ``Circuit.combinators`` and in the inputs and outputs
+        of the wires, and the engine of the circuit is recreated on entering and leaving the context,
+        as it may refer to the combinators.
+        """
+        wire_names = {wire: name for name, wire in circuit.wires.items()}
+        originals = circuit.combinators
+        timed = {combinator: _TimedCombinator(combinator, self,
+                                              ('combinator', describe(combinator, index, wire_names)))
+                 for index, combinator in enumerate(originals)}
+        self._swap(circuit, timed, [timed[combinator] for combinator in originals])
+        for name, wire in circuit.wires.items():
+            self._instrument_wire(wire, name)
+        try:
+            yield
+        finally:
+            self._swap(circuit, {stand_in: combinator for combinator, stand_in in timed.items()}, originals)
+            for combinator, stand_in in timed.items():
+                combinator.input = stand_in.input
+            for wire in circuit.wires.values():
+                del wire.tick
+
+    @staticmethod
+    def _swap(circuit: Circuit, replacements: Mapping[Combinator, Combinator],
+              combinators: Sequence[Combinator]) -> None:
+        """replace combinators in a circuit and its wires"""
+        circuit.combinators = combinators
+        for wire in circuit.wires.values():
+            wire.inputs[:] = [replacements.get(c, c) for c in wire.inputs]
+            wire.outputs[:] = [replacements.get(c, c) for c in wire.outputs]
+        # noinspection PyProtectedMember
+        circuit._engine = None
+
+    def _instrument_wire(self, wire: Wire, name: str) -> None:
+        tick = wire.tick
+        clock = time.perf_counter
+        key = ('wire', name)
+
+        def instrumented():
+            signals = len(wire.signals)
+            start = clock()
+            tick()
+            elapsed = clock() - start
+            stats = self._current[key]
+            stats.count += 1
+            stats.time += elapsed
+            stats.signals += signals
+
+        wire.tick = instrumented
+
+    def hot_spots(self) -> Sequence[tuple[tuple[str, ...], Stats]]:
+        """get the stats of all elements summed over nested sections, most expensive first.
+
+        :return: pairs of (outermost section, kind, name) of each element and its stats
+        """
+        totals = defaultdict(Stats)
+        for context, stats in self.sections.items():
+            for key, element in stats.items():
+                total = totals[context[:1] + key]
+                total.count += element.count
+                total.time += element.time
+                total.signals += element.signals
+        return sorted(totals.items(), key=lambda item: item[1].time, reverse=True)
+
+    def format_table(self, limit: Union[int, None] = 20) -> str:
+        """format the hot spots as a table, limited to the ``limit`` most expensive elements"""
+        hot_spots = self.hot_spots()
+        total = sum(stats.time for _, stats in hot_spots) or 1.0
+        lines = [f'{"time ms":>10} {"%":>6} {"count":>10} {"us/eval":>9} {"signals":>10}  element']
+        for key, stats in hot_spots[:limit]:
+            per_eval = stats.time / stats.count * 1e6 if stats.count else 0.0
+            lines.append(f'{stats.time * 1e3:10.2f} {stats.time / total * 100:6.1f} {stats.count:10d} '
+                         f'{per_eval:9.2f} {stats.signals:10d}  {" ".join(key)}')
+        return '\n'.join(lines)
+
+    def collapsed(self) -> Iterable[str]:
+        """get the profile in the collapsed stack format, i.e. lines of ``frame;frame;... microseconds``.
+
+        Sections are the outer frames, with the time spent in them outside of combinators and wires as their own value.
+        """
+        for context, stats in self.sections.items():
+            frames = [frame.replace(';', ',') for frame in context]
+            measured = 0.0
+            for (kind, name), element in stats.items():
+                measured += element.time
+                yield f'{";".join(frames + [kind + " " + name.replace(";", ",")])} {round(element.time * 1e6)}'
+            nested = sum(t for c, t in self.times.items() if len(c) == len(context) + 1 and c[:-1] == context)
+            own = self.times.get(context, 0.0) - measured - nested
+            if frames and own > 0:
+                yield f'{";".join(frames)} {round(own * 1e6)}'
+
+    def write_collapsed(self, path: Union[str, Path]) -> None:
+        """write the profile in the collapsed stack format to a file, see ``collapsed``"""
+        with open(path, 'w') as file:
+            for line in self.collapsed():
+                file.write(line + '\n')
+
+
+def profile_tests(paths: Iterable[Union[str, Path]], engine: Union[str, type] = None) \
+        -> tuple[Sequence[TestResult], Profile]:
+    """run all tests of the given files in this process while profiling them.
+
+    :param paths: fccn files, compiled circuit files or directories containing them, see ``runner.run``
+    :param engine: if given, the simulation engine to use, see ``Circuit.use_engine``
+    :return: the results of all tests and the profile, with a section per file and test
+    """
+    from factorioccn.compiled import load_source
+    profile = Profile()
+    results = []
+    for file in collect_files(paths):
+        circuit = load_source(file)
+        if engine is not None:
+            circuit.use_engine(engine)
+        with profile.section(file), profile.instrument(circuit):
+            for test in circuit.tests:
+                with profile.section(test._name):
+                    results.append(run_test(file, test))
+    return results, profile
@@ -0,0 +1,136 @@
+"""A persistent cache of passed tests, keyed by everything which can affect their result.
+
+The key of a test (see ``result_key``) is a hash of
+
+* its name and tick script, i.e. the expectations and sets of every tick
+* the combinators in its cone (see ``Circuit.cone``): their kind, configuration and the names of their wires,
+  in circuit order
+* the simulation engine, the factorioccn version, the hash of its source code (see ``cache.source_digest``)
+  and ``RESULTS_VERSION``
+
+So a test keeps its key as long as nothing it can observe changes, even if other parts of its file do.
+Keys only depend on names and values, not e.g. on file paths or signal ids, so they are the same on every machine.
+
+``ResultCache`` stores the keys of passed tests as empty files in the cache (see ``factorioccn.cache``),
+written atomically so concurrent runs can share it. Each hit refreshes the modification time of its entry,
+and ``ResultCache.evict`` deletes the least recently used entries beyond ``ResultCache.max_entries``.
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import Union
+
+from factorioccn import __version__
+from factorioccn.cache import cache_dir, source_digest
+from factorioccn.model.toplevel import Circuit, Test
+
+RESULTS_VERSION = 1
+"""version of the key format, changed whenever equal keys could stand for different results"""
+
+
+def describe_test(test: Test) -> tuple:
+    """describe a test by everything which affects its result, apart from the circuit"""
+    runs = []
+    # noinspection PyProtectedMember
+    for run in getattr(test._ticks, 'runs', test._ticks):
+        # noinspection PyProtectedMember
+        runs.append((run.tick, getattr(run, 'count', 1),
+                     tuple((type(op).__name__, op.wire, tuple(op.values.items()))
+                           for op in (*run._expected, *run._sets))))
+    # noinspection PyProtectedMember
+    return test._name, tuple(runs)
+
+
+def describe_combinators(circuit: Circuit) -> dict:
+    """describe each combinator of a circuit by its kind, configuration and the names of its wires"""
+    names = {id(wire): name for name, wire in circuit.wires.items()}
+    descriptions = {}
+    for combinator in circuit.combinators:
+        description = (type(getattr(combinator, 'prototype', combinator)).__name__, str(combinator),
+                       tuple(names[id(wire)] for wire in getattr(combinator, 'input_wires', ())),
+                       tuple(names[id(wire)] for wire in combinator.output_wires))
+        frames = getattr(combinator, 'frames', None)
+        if frames is not None:  # a SequenceCombinator, whose string doesn't include its output
+            description += tuple(tuple(frame.items()) for frame in frames),
+        descriptions[combinator] = description
+    return descriptions
+
+
+def _engine_name(engine: Union[str, type]) -> str:
+    return engine if isinstance(engine, str) else f'{engine.__module__}.{engine.__qualname__}'
+
+
+def result_key(circuit: Circuit, test: Test, combinators: dict = None, engine: Union[str, type] = None) -> str:
+    """get the key of a test in the result cache.
+
+    :param circuit: the circuit the test runs on
+    :param test: the test
+    :param combinators: the descriptions of the combinators of the circuit, see ``describe_combinators``.
+        Computed if not given, but passing them is much faster for several tests of the same circuit
+    :param engine: the engine the test is simulated with, defaults to the one of the test or of the circuit
+    :return: the key, as a hex string
+    """
+    if combinators is None:
+        combinators = describe_combinators(circuit)
+    if engine is None:
+        # noinspection PyProtectedMember
+        engine = test.engine if test.engine is not None else circuit._engine_type
+    expected, _ = test.wires()
+    cone = circuit.cone(name for name in expected if name in circuit.wires)
+    description = (RESULTS_VERSION, __version__, source_digest(), _engine_name(engine), describe_test(test),
+                   tuple(combinators[combinator] for combinator in cone))
+    return hashlib.sha256(repr(description).encode()).hexdigest()
+
+
+class ResultCache:
+    """the keys of passed tests, stored as files in a directory"""
+    max_entries: int = 100_000
+    """amount of entries kept by ``evict``"""
+
+    def __init__(self, directory: Union[str, Path] = None):
+        """open the result cache.
+
+        :param directory: where to store the entries, defaults to ``results`` in the cache of factorioccn
+        """
+        if directory is None:
+            directory = cache_dir('results')
+        self.directory = Path(directory)
+
+    def hit(self, key: str) -> bool:
+        """check whether a test with this key passed before, and mark the entry as recently used"""
+        try:
+            os.utime(self.directory / key)
+        except OSError:  # missing, or just evicted by another process
+            return False
+        return True
+
+    def add(self, key: str) -> None:
+        """record that a test with this key passed"""
+        from factorioccn.cache import write_atomic
+        try:
+            write_atomic(self.directory / key, b'')
+        except OSError:
+            pass  # the cache is only an optimization
+
+    def evict(self) -> int:
+        """delete the least recently used entries beyond ``max_entries``.
+
+        :return: amount of entries deleted
+        """
+        try:
+            with os.scandir(self.directory) as entries:
+                entries = [(entry.stat().st_mtime_ns, entry.path) for entry in entries
+                           if entry.is_file() and not entry.name.startswith('.')]
+        except OSError:
+            return 0
+        if len(entries) <= self.max_entries:
+            return 0
+        entries.sort()
+        deleted = 0
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.unlink(path)
+                deleted += 1
+            except OSError:  # e.g. deleted concurrently
+                pass
+        return deleted
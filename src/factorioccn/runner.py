@@ -0,0 +1,184 @@
+"""Running the tests of fccn files, optionally in parallel across a pool of worker processes.
+
+Each worker loads its own copy of a circuit (see ``factorioccn.compiled.load_source``, so this is cheap for
+unchanged files) and runs single tests on it. Results are always reported in the order of the files and of
+the tests within each file, independent of the amount of workers.
+"""
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Union
+
+from factorioccn.compiled import SUFFIX, load_source
+from factorioccn.model.probes import Probe
+from factorioccn.model.testing import WrongSignalError
+from factorioccn.model.toplevel import Circuit, Test
+
+_circuits = {}
+"""circuits loaded by this process, by file and engine"""
+_descriptions = {}
+"""descriptions of the combinators of the loaded circuits for the result cache, see ``describe_combinators``"""
+
+
+@dataclass
+class TestResult:
+    """The outcome of a single test"""
+    file: str
+    test: str
+    error: Union[WrongSignalError, None] = None
+    """the failure of the test, None if it passed"""
+    cached: bool = False
+    """whether the test wasn't run because it passed before, see ``factorioccn.results``"""
+
+    def is_success(self) -> bool:
+        """checks and returns whether the test passed"""
+        return self.error is None
+
+    def __str__(self) -> str:
+        if self.error is None:
+            return f'{self.file}: {self.test} passed{" (cached)" if self.cached else ""}'
+        return f'{self.file}: {self.error}'
+
+
+def collect_files(paths: Iterable[Union[str, Path]]) -> list[str]:
+    """expand directories to the fccn and compiled circuit files they contain.
+
+    :param paths: files and directories
+    :return: the files, directories expanded recursively in sorted order
+    """
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files += sorted(str(file) for file in path.rglob('*') if file.suffix in ('.fccn', SUFFIX))
+        else:
+            files.append(str(path))
+    return files
+
+
+@dataclass(frozen=True)
+class _Setup:
+    """how to prepare loaded circuits, see ``run``"""
+    engine: Union[str, type, None] = None
+    probes: tuple[str, ...] = ()
+    history: int = 32
+    shared: bool = False
+    optimize: bool = False
+    slice: bool = False
+    cache: bool = False
+
+
+def _load(file: str, setup: _Setup) -> Circuit:
+    key = (file, setup)
+    if key not in _circuits:
+        circuit = load_source(file)
+        if setup.optimize:
+            from factorioccn.optimizer import optimize
+            optimize(circuit)
+        if setup.engine is not None:
+            circuit.use_engine(setup.engine)
+        _attach_probes(circuit, setup)
+        _circuits[key] = circuit
+    return _circuits[key]
+
+
+def _attach_probes(circuit: Circuit, setup: _Setup) -> None:
+    for spec in setup.probes:
+        probe = Probe.parse(spec, setup.history)
+        if probe.wire in circuit.wires:
+            circuit.attach_probe(probe)
+
+
+def _run_tests(file: str, index: Union[int, None], setup: _Setup) -> list[TestResult]:
+    """run a single test of a file, or all of them as a batch or with shared prefixes if index is None"""
+    circuit = _load(file, setup)
+    tests = circuit.tests if index is None else [circuit.tests[index]]
+    results: list[Union[TestResult, None]] = [None] * len(tests)
+    if setup.cache:
+        from factorioccn.results import ResultCache, describe_combinators, result_key
+        cache = ResultCache()
+        if (file, setup) not in _descriptions:
+            _descriptions[file, setup] = describe_combinators(circuit)
+        engine = 'vectorized' if index is None and not setup.shared else None
+        keys = [result_key(circuit, test, _descriptions[file, setup], engine) for test in tests]
+        results = [TestResult(file, test._name, cached=True) if cache.hit(key) else None
+                   for test, key in zip(tests, keys)]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if index is None and pending:
+        if setup.shared:
+            from factorioccn.model.prefixes import run_shared
+            errors = run_shared(circuit, [tests[i] for i in pending])
+        else:
+            from factorioccn.model.vectorized import run_batch
+            errors = run_batch(circuit, [tests[i] for i in pending])
+        for i, error in zip(pending, errors):
+            results[i] = TestResult(file, tests[i]._name, error)
+    elif pending:
+        test = tests[0]
+        if setup.slice:
+            test = test.slice()
+            # noinspection PyProtectedMember
+            _attach_probes(test._circuit, setup)
+        results[0] = run_test(file, test)
+    if setup.cache:
+        for i in pending:
+            if results[i].is_success():
+                cache.add(keys[i])
+    return results
+
+
+def run_test(file: str, test: Test) -> TestResult:
+    """run a single test, catching its failure.
+
+    :param file: the file the test is from, for reporting
+    :param test: the test
+    :return: the result of the test
+    """
+    try:
+        test.run()
+    except WrongSignalError as e:
+        return TestResult(file, test._name, e)
+    return TestResult(file, test._name)
+
+
+def run(paths: Iterable[Union[str, Path]], jobs: int = 1, engine: Union[str, type] = None,
+        batch: bool = False, probes: Sequence[str] = (), history: int = 32,
+        shared: bool = False, optimize: bool = False, slice: bool = False,
+        cache: bool = False) -> Sequence[TestResult]:
+    """run all tests of the given files, collecting all failures.
+
+    :param paths: fccn files, compiled circuit files or directories containing them
+    :param jobs: amount of worker processes, 1 runs all tests in this process and None uses one per CPU
+    :param engine: if given, the simulation engine to use, see ``Circuit.use_engine``
+    :param batch: run the tests of each file in lockstep, see ``factorioccn.model.vectorized.run_batch``.
+        This requires numpy, and ``engine`` and ``probes`` are ignored
+    :param probes: wires to record while running tests, given like ``wire`` or ``wire:signal,signal``
+        (see ``Probe.parse``). Failures include the recorded history. Probes of wires missing in a file are ignored
+    :param history: amount of ticks recorded by the probes
+    :param shared: simulate the ticks which tests of the same file start with only once,
+        see ``factorioccn.model.prefixes.run_shared``. The tests of each file then run in a single worker
+    :param optimize: simplify each circuit before running its tests, see ``factorioccn.optimizer``
+    :param slice: simulate only the part of the circuit each test observes, see ``Test.slice``.
+        This is ignored with ``batch`` or ``shared``, and probes only record wires within the slice
+    :param cache: skip tests which passed before with the same key, and remember the ones which pass,
+        see ``factorioccn.results``. Skipped tests are reported as passed with ``TestResult.cached`` set
+    :return: the results of all tests, ordered by file and by the order of tests in each file
+    """
+    _circuits.clear()  # files may have changed since the last run
+    _descriptions.clear()
+    setup = _Setup(engine, tuple(probes), history, shared, optimize, slice, cache)
+    tasks = []
+    for file in collect_files(paths):
+        if batch or shared:
+            tasks.append((file, None))
+        else:
+            tasks += [(file, i) for i in range(len(_load(file, setup).tests))]
+    if jobs == 1 or len(tasks) <= 1:
+        results = [_run_tests(file, i, setup) for file, i in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # only imported when needed, to keep startup fast
+        with ProcessPoolExecutor(jobs) as executor:
+            results = list(executor.map(_run_tests, *zip(*tasks), [setup] * len(tasks)))
+    if cache:
+        from factorioccn.results import ResultCache
+        ResultCache().evict()
+    return [result for file_results in results for result in file_results]
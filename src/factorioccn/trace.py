@@ -0,0 +1,390 @@
+"""Columnar trace files (``.fccnt``) of the full state of a simulation, for offline analysis.
+
+A ``Tracer`` is attached to a circuit like a ``Probe`` (see ``Circuit.attach_probe``) and records every signal
+of every wire after each tick. Tick 0 is the state when the tracer was attached, and ticks keep counting up across
+tests. Each (wire, signal) pair is a column. Ticks are grouped into blocks of fixed size,
+and within a block each column is stored run-length encoded, as the points at which its value changes.
+Columns which are 0 throughout a block are omitted from it. Blocks are buffered and written in bulk.
+
+The file consists of little-endian 64 bit integers (strings are NUL-separated and padded):
+
+* header: magic, format version, ticks per block, tick count, block count, the offsets of the block index
+  and the column table counted in 64 bit words, column count and string count
+* blocks: column count, then (column, point count, offset of points) per column sorted by column,
+  then (tick within block, value) for each point. The first point of each column is at tick 0
+* block index: offset of each block
+* column table: (wire, signal) as indices into the string table
+* string table: the names of wires and signals
+
+``Trace`` memory-maps such a file and decodes only the blocks of a requested tick range.
+Run ``python -m factorioccn.trace --help`` for the command line interface to query traces and export them to VCD.
+"""
+import argparse
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import TextIO, Union
+
+from factorioccn.model.core import Wire, signal_table
+from factorioccn.model.engines import Engine
+
+MAGIC = b'FCCNT\0\0\0'
+FORMAT_VERSION = 1
+SUFFIX = '.fccnt'
+BLOCK_TICKS = 1024
+"""default amount of ticks per block"""
+
+_HEADER = struct.Struct('<8s8Q')
+_HEADER_WORDS = _HEADER.size // 8
+_FLUSH_BYTES = 1 << 20
+
+
+class TraceError(ValueError):
+    """Exception raised for files which are not a trace of the supported format version"""
+
+
+class Tracer:
+    """records the complete state of a circuit into a trace file, see the module documentation"""
+
+    def __init__(self, path: Union[str, Path], block_ticks: int = BLOCK_TICKS):
+        """create a trace file. The tracer must be closed to complete the file.
+
+        :param path: the file to write
+        :param block_ticks: amount of ticks per block, smaller blocks make reading short tick ranges faster
+        """
+        if block_ticks < 1:
+            raise ValueError('block size must be positive')
+        self.path = Path(path)
+        self.block_ticks = block_ticks
+        self.ticks = 0
+        """amount of ticks recorded"""
+        self._file = open(self.path, 'wb')
+        self._file.write(bytes(_HEADER.size))
+        self._words = _HEADER_WORDS
+        """size of the file written so far, in 64 bit words"""
+        self._buffer = bytearray()
+        self._blocks = array('q')
+        self._strings: dict[str, int] = {}
+        self._columns: dict[tuple[int, int], int] = {}
+        """column index by (wire index, signal id)"""
+        self._column_names = array('q')
+        self._wires: Sequence[Wire] = []
+        self._last: list[dict[int, int]] = []
+        """signals of each wire as of the last recorded tick"""
+        self._current: dict[int, int] = {}
+        """value of each nonzero column as of the last recorded tick"""
+        self._carried: dict[int, int] = {}
+        """value of each nonzero column at the start of the current block"""
+        self._points: dict[int, list[int]] = {}
+        """(tick, value) points of the columns changed in the current block"""
+
+    def attach(self, wires: Mapping[str, Wire]) -> None:
+        """bind the tracer to the wires of a circuit and record their current state as the first tick"""
+        if self._wires:
+            raise ValueError('a tracer can only be attached once')
+        self._wires = list(wires.values())
+        self._wire_names = list(wires)
+        self._last = [{} for _ in self._wires]
+        self.record(0)
+
+    def clear(self) -> None:
+        """does nothing, as traces continue across tests"""
+
+    def _column(self, wire: int, sid: int) -> int:
+        column = self._columns.get((wire, sid))
+        if column is None:
+            column = self._columns[(wire, sid)] = len(self._columns)
+            for name in (self._wire_names[wire], signal_table.names[sid]):
+                if name not in self._strings:
+                    self._strings[name] = len(self._strings)
+                self._column_names.append(self._strings[name])
+        return column
+
+    def record(self, _=None, engine: Union[Engine, None] = None) -> None:
+        """record the current state of all wires as the next tick, see ``Probe.record``"""
+        offset = self.ticks % self.block_ticks
+        for index, wire in enumerate(self._wires):
+            # noinspection PyProtectedMember
+            values = (wire.signals if engine is None else engine.frame(index))._values
+            last = self._last[index]
+            if values == last:
+                continue
+            for sid in values.keys() | last.keys():
+                value = values.get(sid, 0)
+                if value != last.get(sid, 0):
+                    column = self._column(index, sid)
+                    self._points.setdefault(column, []).extend((offset, value))
+                    if value:
+                        self._current[column] = value
+                    else:
+                        self._current.pop(column, None)
+            self._last[index] = dict(values)
+        self.ticks += 1
+        if self.ticks % self.block_ticks == 0:
+            self._end_block()
+
+    def _end_block(self) -> None:
+        """encode the current block and start the next one with the current values"""
+        points = self._points
+        columns = sorted(points.keys() | self._carried)
+        block = array('q', [len(columns)])
+        data = array('q')
+        base = 1 + 3 * len(columns)
+        for column in columns:
+            column_points = points.get(column, ())
+            if not column_points or column_points[0] != 0:
+                column_points = [0, self._carried.get(column, 0)] + list(column_points)
+            block.extend((column, len(column_points) // 2, base + len(data)))
+            data.extend(column_points)
+        self._blocks.append(self._words)
+        block.extend(data)
+        self._buffer += block.tobytes()
+        self._words += len(block)
+        if len(self._buffer) >= _FLUSH_BYTES:
+            self._flush()
+        self._carried = dict(self._current)
+        self._points = {}
+
+    def _flush(self) -> None:
+        if sys.byteorder == 'big':  # pragma: no cover
+            words = array('q', bytes(self._buffer))
+            words.byteswap()
+            self._buffer = bytearray(words.tobytes())
+        self._file.write(self._buffer)
+        self._buffer = bytearray()
+
+    def close(self) -> None:
+        """write the remaining ticks and the tables, and close the file"""
+        if self._file.closed:
+            return
+        if self.ticks % self.block_ticks:
+            self._end_block()
+        index_offset = self._words
+        strings = '\0'.join(self._strings).encode()
+        strings += b'\0' * (-len(strings) % 8)
+        tables = self._blocks.tobytes() + self._column_names.tobytes()
+        self._buffer += tables
+        self._flush()
+        self._file.write(strings)
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, self.block_ticks, self.ticks, len(self._blocks),
+                                      index_offset, index_offset + len(self._blocks),
+                                      len(self._columns), len(self._strings)))
+        self._file.close()
+
+    def __enter__(self) -> 'Tracer':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+class Trace:
+    """read access to a trace file, see the module documentation"""
+
+    def __init__(self, path: Union[str, Path]):
+        """memory-map a trace file.
+
+        :raise TraceError: if the file is not a trace of the supported format version
+        """
+        with open(path, 'rb') as file:
+            try:
+                self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise TraceError('empty trace file') from None
+        if len(self._mmap) < _HEADER.size:
+            self.close()
+            raise TraceError('truncated trace file')
+        magic, version, self.block_ticks, self.ticks, block_count, index, columns, column_count, string_count = \
+            _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise TraceError(f'not a trace of format version {FORMAT_VERSION}')
+        view = memoryview(self._mmap)
+        self._words = view[:len(view) - len(view) % 8].cast('q')
+        view.release()
+        if sys.byteorder == 'big':  # pragma: no cover
+            words = array('q', self._words.tobytes())
+            words.byteswap()
+            self._words.release()
+            self._words = memoryview(words)
+        self._blocks = self._words[index:index + block_count]
+        names = self._words[columns:columns + 2 * column_count].tolist()
+        strings = self._mmap[8 * (columns + 2 * column_count):].rstrip(b'\0').decode().split('\0')[:string_count]
+        self.columns: list[tuple[str, str]] = [(strings[names[i]], strings[names[i + 1]])
+                                               for i in range(0, len(names), 2)]
+        """(wire, signal) of each column"""
+        self._column_index = {column: i for i, column in enumerate(self.columns)}
+
+    def close(self) -> None:
+        if hasattr(self, '_words'):
+            self._blocks.release()
+            self._words.release()
+        self._mmap.close()
+
+    def __enter__(self) -> 'Trace':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _points(self, block: int, column: int) -> Sequence[int]:
+        """get the (tick within block, value) points of a column in a block, empty if it is 0 throughout"""
+        words = self._words
+        base = self._blocks[block]
+        count = words[base]
+        ids = words[base + 1:base + 1 + 3 * count:3]
+        i = bisect_right(ids, column) - 1
+        if i < 0 or ids[i] != column:
+            return ()
+        entry = base + 1 + 3 * i
+        start = base + words[entry + 2]
+        return words[start:start + 2 * words[entry + 1]]
+
+    def _range(self, start: int, stop: Union[int, None]) -> tuple[int, int]:
+        stop = self.ticks if stop is None else min(stop, self.ticks)
+        return max(start, 0), stop
+
+    def changes(self, wire: str, signal: str, start: int = 0, stop: int = None) -> list[tuple[int, int]]:
+        """get the value of a signal at ``start`` and all changes of it until before ``stop``.
+
+        :param wire: name of the wire
+        :param signal: name of the signal
+        :param start: first tick
+        :param stop: tick after the last one, defaults to the end of the trace
+        :return: pairs of tick and the value from then on, starting with ``start``
+        """
+        start, stop = self._range(start, stop)
+        column = self._column_index.get((wire, signal))
+        changes = []
+        if column is None or start >= stop:
+            return [(start, 0)] if start < stop else []
+        for block in range(start // self.block_ticks, (stop - 1) // self.block_ticks + 1):
+            first = block * self.block_ticks
+            points = self._points(block, column)
+            if not points:
+                points = (0, 0)
+            for i in range(0, len(points), 2):
+                tick = first + points[i]
+                if tick >= stop:
+                    break
+                value = points[i + 1]
+                if tick <= start:
+                    changes = [(start, value)]
+                elif value != changes[-1][1]:
+                    changes.append((tick, value))
+        return changes
+
+    def values(self, wire: str, signal: str, start: int = 0, stop: int = None) -> list[int]:
+        """get the value of a signal for each tick from ``start`` until before ``stop``, see ``changes``"""
+        start, stop = self._range(start, stop)
+        values = []
+        changes = self.changes(wire, signal, start, stop)
+        for (tick, value), (end, _) in zip(changes, changes[1:] + [(stop, 0)]):
+            values += [value] * (end - tick)
+        return values
+
+
+def _vcd_identifier(index: int) -> str:
+    identifier = ''
+    while True:
+        identifier += chr(33 + index % 94)
+        index //= 94
+        if not index:
+            return identifier
+
+
+def write_vcd(trace: Trace, out: TextIO, start: int = 0, stop: int = None) -> None:
+    """export a tick range of a trace in the Value Change Dump format, e.g. for GTKWave.
+
+    Each wire is a scope containing a 64 bit variable per signal, and each tick is one time unit.
+    """
+    start, stop = trace._range(start, stop)
+    out.write('$comment factorioccn trace, one time unit per tick $end\n$timescale 1 ns $end\n')
+    out.write('$scope module circuit $end\n')
+    wires = {}
+    for index, (wire, signal) in enumerate(trace.columns):
+        wires.setdefault(wire, []).append((index, signal))
+    for wire, signals in wires.items():
+        out.write(f'$scope module {wire} $end\n')
+        for index, signal in signals:
+            out.write(f'$var integer 64 {_vcd_identifier(index)} {signal} $end\n')
+        out.write('$upscope $end\n')
+    out.write('$upscope $end\n$enddefinitions $end\n')
+    events = {}
+    for index, (wire, signal) in enumerate(trace.columns):
+        for tick, value in trace.changes(wire, signal, start, stop):
+            events.setdefault(tick, []).append((index, value))
+    for tick in sorted(events):
+        out.write(f'#{tick}\n')
+        for index, value in events[tick]:
+            out.write(f'b{value & (1 << 64) - 1:b} {_vcd_identifier(index)}\n')
+    if start < stop:
+        out.write(f'#{stop}\n')
+
+
+def trace_tests(file: Union[str, Path], output: Union[str, Path], engine: Union[str, type] = None,
+                block_ticks: int = BLOCK_TICKS) -> list:
+    """run all tests of a file in this process while tracing the circuit.
+
+    :param file: fccn file or compiled circuit file
+    :param output: the trace file to write
+    :param engine: if given, the simulation engine to use, see ``Circuit.use_engine``
+    :param block_ticks: amount of ticks per block, see ``Tracer``
+    :return: the ``TestResult`` of each test
+    """
+    from factorioccn.compiled import load_source
+    from factorioccn.runner import run_test
+    circuit = load_source(file)
+    if engine is not None:
+        circuit.use_engine(engine)
+    with Tracer(output, block_ticks) as tracer:
+        circuit.attach_probe(tracer)
+        return [run_test(str(file), test) for test in circuit.tests]
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m factorioccn.trace', description='Query and export trace files.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    info = commands.add_parser('info', help='show the ticks and columns of a trace')
+    info.add_argument('trace')
+    query = commands.add_parser('query', help='show the value of a signal on a wire over a range of ticks')
+    query.add_argument('trace')
+    query.add_argument('wire')
+    query.add_argument('signal')
+    query.add_argument('start', type=int, nargs='?', default=0, help='first tick, default %(default)s')
+    query.add_argument('stop', type=int, nargs='?', help='tick after the last one, defaults to the end')
+    query.add_argument('--changes', action='store_true', help='only show the ticks at which the value changes')
+    vcd = commands.add_parser('vcd', help='export to the Value Change Dump format')
+    vcd.add_argument('trace')
+    vcd.add_argument('output', help='file to write, - for stdout')
+    vcd.add_argument('--start', type=int, default=0, help='first tick, default %(default)s')
+    vcd.add_argument('--stop', type=int, help='tick after the last one, defaults to the end')
+    options = parser.parse_args(args)
+    with Trace(options.trace) as trace:
+        if options.command == 'info':
+            print(f'{trace.ticks} ticks in blocks of {trace.block_ticks}, {len(trace.columns)} columns:')
+            for wire, signal in trace.columns:
+                print(f'\t{wire}[{signal}]')
+        elif options.command == 'query':
+            if options.changes:
+                pairs = trace.changes(options.wire, options.signal, options.start, options.stop)
+            else:
+                pairs = enumerate(trace.values(options.wire, options.signal, options.start, options.stop),
+                                  max(options.start, 0))
+            for tick, value in pairs:
+                print(f'{tick}: {value}')
+        elif options.output == '-':
+            write_vcd(trace, sys.stdout, options.start, options.stop)
+        else:
+            with open(options.output, 'w') as out:
+                write_vcd(trace, out, options.start, options.stop)
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
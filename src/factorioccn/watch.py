@@ -0,0 +1,185 @@
+"""Running the tests of fccn files again whenever they change, see ``python -m factorioccn --watch``.
+
+``Watcher`` polls the files and the files they import, and keeps everything which is expensive to recreate
+between changes:
+
+* the parser, which is only generated once per process
+* the syntax tree of each top-level statement (see ``split_statements``), so after a change only the statements
+  which differ are parsed again. The circuits are rebuilt from the syntax trees, which is cheap compared to parsing
+* the result of each test, keyed by the test and the combinators in its cone (see ``factorioccn.results``),
+  so only tests which changed themselves or can observe a changed combinator are run again
+"""
+import os
+import re
+import sys
+import time
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import TextIO, Union
+
+from tatsu.exceptions import FailedParse
+
+from factorioccn.compiled import SUFFIX, load
+from factorioccn.model.probes import Probe
+from factorioccn.model.toplevel import Circuit
+from factorioccn.modules import load_project
+from factorioccn.parser import build, parse_model
+from factorioccn.results import describe_combinators, result_key
+from factorioccn.runner import TestResult, collect_files, run_test
+
+_STRING = re.compile(r'"[^"\n]*"')
+
+
+def split_statements(source: str) -> list[str]:
+    """split fccn code into chunks of top-level statements, which can usually be parsed on their own.
+
+    A chunk is a single line, or the lines from one opening a brace up to the one closing it, e.g. a test.
+    Lines without code are dropped.
+
+    :param source: the code
+    :return: the chunks, in order
+    """
+    chunks = []
+    lines = []
+    depth = 0
+    for line in source.splitlines():
+        code = _STRING.sub('""', line).partition('#')[0]
+        if not lines and not code.strip():
+            continue
+        lines.append(line)
+        depth += code.count('{') - code.count('}')
+        if depth <= 0:
+            chunks.append('\n'.join(lines))
+            lines = []
+            depth = 0
+    if lines:
+        chunks.append('\n'.join(lines))
+    return chunks
+
+
+def _stat(file: Union[str, Path]) -> Union[tuple[int, int], None]:
+    """get the modification time and size of a file, None if it doesn't exist"""
+    try:
+        stat = os.stat(file)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Watcher:
+    """runs the tests of fccn files, and on each change only the tests which are affected by it"""
+
+    def __init__(self, paths: Iterable[Union[str, Path]], engine: Union[str, type] = None,
+                 probes: Sequence[str] = (), history: int = 32):
+        """create a watcher.
+
+        :param paths: fccn files, compiled circuit files or directories containing them, see ``collect_files``
+        :param engine: if given, the simulation engine to use, see ``Circuit.use_engine``
+        :param probes: wires to record while running tests, see ``factorioccn.runner.run``
+        :param history: amount of ticks recorded by the probes
+        """
+        self.paths = list(paths)
+        self.engine = engine
+        self.probes = probes
+        self.history = history
+        self.errors: list[str] = []
+        """files which couldn't be loaded by the last ``run``, with the reason"""
+        self.ran = 0
+        """amount of tests which were actually run by the last ``run``"""
+        self._stats = {}
+        """modification time and size of each watched file"""
+        self._loaded = set()
+        """files loaded by the last ``run``, including imported ones"""
+        self._trees = {}
+        """syntax tree of each chunk of code, see ``split_statements``"""
+        self._used = {}
+        """syntax trees used by the current ``run``, the others are dropped afterwards"""
+        self._results = {}
+        """result of each test by file, test and cone"""
+
+    def poll(self) -> bool:
+        """check whether a file was changed, added or removed since the last call or since it was loaded"""
+        stats = {file: _stat(file) for file in {*collect_files(self.paths), *self._loaded}}
+        changed = stats != self._stats
+        self._stats = stats
+        return changed
+
+    def _tree(self, code: str):
+        tree = self._trees.get(code)
+        if tree is None:
+            tree = parse_model(code)
+        self._used[code] = tree
+        return tree
+
+    def _load_module(self, path: Path) -> Circuit:
+        """build a single file from the syntax trees of its statements, parsing only statements not seen before"""
+        self._loaded.add(str(path))
+        self._stats[str(path)] = _stat(path)
+        if path.suffix == SUFFIX:
+            return load(path)
+        source = path.read_text()
+        try:
+            trees = [self._tree(chunk) for chunk in split_statements(source)]
+        except FailedParse:  # a statement spanning several lines, or an actual error reported for the whole file
+            trees = [self._tree(source)]
+        return build(*trees)
+
+    def run(self) -> list[TestResult]:
+        """load all files and get the results of their tests, running only tests affected by a change.
+
+        Files which can't be loaded are skipped and listed in ``errors``.
+
+        :return: the results, ordered by file and by the order of tests in each file
+        """
+        results = []
+        known = self._results
+        self._results = {}
+        self._loaded = set()
+        self._used = {}
+        self.errors = []
+        self.ran = 0
+        for file in collect_files(self.paths):
+            try:
+                circuit = load_project(file, load=self._load_module)
+            except (OSError, ValueError, FailedParse) as e:
+                self.errors.append(f'{file}: {e}')
+                # keep the results, which will likely be valid again once the error is fixed
+                self._results.update((key, result) for key, result in known.items() if key[0] == file)
+                continue
+            if self.engine is not None:
+                circuit.use_engine(self.engine)
+            for spec in self.probes:
+                probe = Probe.parse(spec, self.history)
+                if probe.wire in circuit.wires:
+                    circuit.attach_probe(probe)
+            combinators = describe_combinators(circuit)
+            for test in circuit.tests:
+                key = file, result_key(circuit, test, combinators)
+                result = known.get(key)
+                if result is None:
+                    result = run_test(file, test)
+                    self.ran += 1
+                self._results[key] = result
+                results.append(result)
+        self._trees = self._used
+        return results
+
+    def watch(self, interval: float = 0.2, output: TextIO = sys.stdout) -> None:
+        """run the tests, and again after each change, until interrupted.
+
+        :param interval: seconds between polling the files
+        :param output: where to write the results. Failures are written to ``sys.stderr``
+        """
+        while True:
+            if self.poll():
+                start = time.perf_counter()
+                results = self.run()
+                elapsed = time.perf_counter() - start
+                for error in self.errors:
+                    print(error, file=sys.stderr)
+                failed = [result for result in results if not result.is_success()]
+                for result in failed:
+                    print(result, file=sys.stderr)
+                print(f'{len(results)} tests, {len(failed)} failed, {self.ran} run in {elapsed * 1000:.1f} ms',
+                      file=output, flush=True)
+            time.sleep(interval)
@@ -0,0 +1,14 @@
+"""Tests of factorioccn.
+
+The cache of factorioccn (see ``factorioccn.cache``) is pointed to a temporary directory for the whole test run,
+so running the tests never reads or writes the cache of the user. Tests which check the cache itself
+patch ``FCCN_CACHE_DIR`` with their own directory.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+_cache_dir = tempfile.mkdtemp(prefix='factorioccn-tests-')
+os.environ['FCCN_CACHE_DIR'] = _cache_dir
+atexit.register(shutil.rmtree, _cache_dir, ignore_errors=True)
@@ -0,0 +1,19 @@
+"""Helpers shared by several test modules."""
+from factorioccn.model.engines import engines
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class EngineSubTests:
+    """mixin for a ``unittest.TestCase`` which checks the same behaviour with every engine"""
+
+    def _engines(self):
+        """yield the name of each engine whose dependencies are installed, each within a subtest"""
+        for engine in engines:
+            if engine == 'vectorized' and numpy is None:  # pragma: no cover
+                continue
+            with self.subTest(engine=engine):
+                yield engine
@@ -0,0 +1,64 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from benchmarks import blueprint, kernels, placement
+from benchmarks.generator import generators
+from benchmarks.suite import available_engines, best, compare
+from factorioccn.blueprint import load_book
+from factorioccn.parser import parse
+
+
+class TestGenerator(unittest.TestCase):
+    def test_generated_tests_pass(self):
+        for name, generator in generators.items():
+            for engine in available_engines():
+                with self.subTest(name=name, engine=engine):
+                    circuit = parse(generator(6))
+                    circuit.use_engine(engine)
+                    circuit.run_tests()
+
+
+class TestSuite(unittest.TestCase):
+    def test_compare(self):
+        baselines = {'case': {'parse': 1.0, 'tick.object': 0.001}}
+        results = {'case': {'parse': 1.2, 'tick.object': 0.002, 'build': 5.0}, 'new': {'parse': 1.0}}
+        self.assertEqual(compare(results, baselines, 0.25), ['case tick.object: 500 ticks/s, baseline 1,000 ticks/s'])
+
+    def test_best_setup(self):
+        runs = []
+        best(runs.append, 3, lambda: [])
+        self.assertEqual(runs, [[], [], []])
+        self.assertEqual(len({id(run) for run in runs}), 3)
+
+
+class TestKernelBenchmarks(unittest.TestCase):
+    def test_runs(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(kernels.main(['--signals', '20', '--number', '1']), 0)
+        self.assertEqual(len(output.getvalue().splitlines()), len(kernels.CASES) + 1)
+
+
+class TestPlacementBenchmarks(unittest.TestCase):
+    def test_runs(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(placement.main(['--sizes', '200', '400']), 0)
+        self.assertEqual(len(output.getvalue().splitlines()), 3)
+
+
+class TestBlueprintBenchmarks(unittest.TestCase):
+    def test_generated_book(self):
+        circuits = list(load_book(blueprint.generate(200, 4)))
+        self.assertEqual([label for label, _ in circuits], [f'chain {i}' for i in range(4)])
+        for _, circuit in circuits:
+            circuit.tick(60)
+            self.assertEqual(len(circuit.wires), 45)
+            self.assertTrue(list(circuit.wires.values())[-1].signals)
+
+    def test_runs(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(blueprint.main(['--entities', '200']), 0)
+        self.assertEqual(len(output.getvalue().splitlines()), 1)
@@ -0,0 +1,138 @@
+import base64
+import json
+import unittest
+import zlib
+
+from factorioccn.blueprint import build_circuit, decode, encode, load_blueprint, load_book
+
+
+def signal(name, type_='virtual'):
+    return {'type': type_, 'name': name}
+
+
+# a constant doubled by an arithmetic combinator, whose output is relayed by a pole to a decider
+BLUEPRINT_1_1 = {'entities': [
+    {'entity_number': 1, 'name': 'constant-combinator',
+     'control_behavior': {'filters': [{'signal': signal('signal-A'), 'count': 5, 'index': 1},
+                                      {'signal': signal('iron-plate', 'item'), 'count': 2, 'index': 2}]},
+     'connections': {'1': {'red': [{'entity_id': 2}]}}},
+    {'entity_number': 2, 'name': 'arithmetic-combinator',
+     'control_behavior': {'arithmetic_conditions': {'first_signal': signal('signal-each'), 'second_constant': 2,
+                                                    'operation': '*', 'output_signal': signal('signal-each')}},
+     'connections': {'1': {'red': [{'entity_id': 1}]}, '2': {'green': [{'entity_id': 4}]}}},
+    {'entity_number': 3, 'name': 'decider-combinator',
+     'control_behavior': {'decider_conditions': {'first_signal': signal('signal-A'), 'constant': 10,
+                                                 'comparator': '≥', 'output_signal': signal('signal-B'),
+                                                 'copy_count_from_input': False}},
+     'connections': {'1': {'green': [{'entity_id': 4}]}, '2': {'red': [{'entity_id': 5, 'circuit_id': 1}]}}},
+    {'entity_number': 4, 'name': 'medium-electric-pole',
+     'connections': {'1': {'green': [{'entity_id': 2, 'circuit_id': 2}, {'entity_id': 3, 'circuit_id': 1}]}}},
+    {'entity_number': 5, 'name': 'small-lamp', 'connections': {'1': {'red': [{'entity_id': 3, 'circuit_id': 2}]}}},
+]}
+
+BLUEPRINT_2_0 = {'entities': [
+    {'entity_number': 1, 'name': 'constant-combinator',
+     'control_behavior': {'sections': {'sections': [
+         {'index': 1, 'filters': [{'index': 1, 'type': 'virtual', 'name': 'signal-A', 'count': 5},
+                                  {'index': 2, 'name': 'iron-plate', 'count': 2}]},
+         {'index': 2, 'active': False, 'filters': [{'index': 1, 'name': 'copper-plate', 'count': 1}]}]}}},
+    {'entity_number': 2, 'name': 'arithmetic-combinator',
+     'control_behavior': {'arithmetic_conditions': {'first_signal': signal('signal-each'), 'second_constant': 2,
+                                                    'operation': '*', 'output_signal': signal('signal-each')}}},
+    {'entity_number': 3, 'name': 'decider-combinator',
+     'control_behavior': {'decider_conditions': {
+         'conditions': [{'first_signal': signal('signal-A'), 'constant': 10, 'comparator': '≥'}],
+         'outputs': [{'signal': signal('signal-B'), 'copy_count_from_input': False}]}}},
+    {'entity_number': 4, 'name': 'medium-electric-pole'},
+    {'entity_number': 5, 'name': 'small-lamp'},
+], 'wires': [[1, 1, 2, 1], [2, 4, 4, 2], [4, 2, 3, 2], [3, 3, 5, 1]]}
+
+
+class TestBlueprint(unittest.TestCase):
+    def test_encoding(self):
+        data = {'blueprint': BLUEPRINT_1_1}
+        string = encode(data)
+        self.assertEqual(string[0], '0')
+        self.assertEqual(decode(f'  {string}\n'), data)
+        for invalid in ('', '1' + string[1:], string[:-8], '0not base64!'):
+            with self.subTest(invalid=invalid), self.assertRaises(ValueError):
+                decode(invalid)
+
+    def test_build(self):
+        for blueprint in (BLUEPRINT_1_1, BLUEPRINT_2_0):
+            with self.subTest(version='2.0' if 'wires' in blueprint else '1.1'):
+                circuit = build_circuit(blueprint)
+                self.assertEqual(list(circuit.wires), ['red_1_1', 'green_2_2', 'red_3_2'])
+                self.assertEqual(len(circuit.combinators), 3)
+                circuit.tick(3)
+                self.assertEqual(circuit.wires['red_1_1'].signals, {'signal-A': 5, 'iron-plate': 2})
+                self.assertEqual(circuit.wires['green_2_2'].signals, {'signal-A': 10, 'iron-plate': 4})
+                self.assertEqual(circuit.wires['red_3_2'].signals, {'signal-B': 1})
+
+    def test_unconfigured(self):
+        circuit = build_circuit({'entities': [{'entity_number': 1, 'name': 'decider-combinator'},
+                                              {'entity_number': 2, 'name': 'arithmetic-combinator'}]})
+        self.assertEqual(circuit.combinators, [])
+
+    def test_unsupported(self):
+        decider = {'entity_number': 1, 'name': 'decider-combinator', 'control_behavior': {'decider_conditions': {
+            'conditions': [{'first_signal': signal('signal-A'), 'constant': 1, 'comparator': '>'}] * 2,
+            'outputs': [{'signal': signal('signal-A')}]}}}
+        arithmetic = {'entity_number': 1, 'name': 'arithmetic-combinator', 'control_behavior': {
+            'arithmetic_conditions': {'first_constant': 1, 'second_signal': signal('signal-A'),
+                                      'operation': '+', 'output_signal': signal('signal-A')}}}
+        for entity in (decider, arithmetic):
+            with self.subTest(entity=entity['name']), self.assertRaises(ValueError):
+                build_circuit({'entities': [entity]})
+
+    def test_networks(self):
+        def decider(condition=None, output=None):
+            condition = {'first_signal': signal('signal-A'), 'constant': 1, 'comparator': '>', **(condition or {})}
+            return {'entity_number': 1, 'name': 'decider-combinator', 'control_behavior': {'decider_conditions': {
+                'conditions': [condition], 'outputs': [{'signal': signal('signal-A'), **(output or {})}]}}}
+
+        def arithmetic(conditions):
+            return {'entity_number': 2, 'name': 'arithmetic-combinator', 'control_behavior': {
+                'arithmetic_conditions': {'first_signal': signal('signal-A'), 'second_constant': 1, 'operation': '+',
+                                          'output_signal': signal('signal-A'), **conditions}}}
+
+        both = {'red': True, 'green': True}
+        circuit = build_circuit({'entities': [decider({'first_signal_networks': both}, {'networks': both}),
+                                              arithmetic({'second_signal_networks': both})]})
+        self.assertEqual(len(circuit.combinators), 2)
+        for entity in (decider({'first_signal_networks': {'red': False}}),
+                       decider({'second_signal_networks': {'red': True, 'green': False}}),
+                       decider(output={'networks': {'red': False, 'green': True}}),
+                       arithmetic({'first_signal_networks': {'green': False}})):
+            with self.subTest(entity=entity), self.assertRaises(ValueError):
+                build_circuit({'entities': [entity]})
+
+    def test_book(self):
+        book = {'blueprint_book': {'label': 'book', 'blueprints': [
+            {'index': 1, 'blueprint_book': {'blueprints': [{'index': 0, 'blueprint': BLUEPRINT_2_0}]}},
+            {'index': 0, 'blueprint': {'label': 'first', **BLUEPRINT_1_1}},
+        ]}}
+        circuits = list(load_book(encode(book)))
+        self.assertEqual([label for label, _ in circuits], ['first', 'book/1/0'])
+        self.assertEqual([len(circuit.combinators) for _, circuit in circuits], [3, 3])
+        with self.assertRaises(ValueError):
+            load_blueprint(encode(book))
+        self.assertEqual(len(load_blueprint(encode({'blueprint': BLUEPRINT_1_1})).combinators), 3)
+
+    def test_book_json(self):
+        def pretty(data):
+            return '0' + base64.b64encode(zlib.compress(json.dumps(data, indent=2).encode())).decode()
+
+        book = {'blueprint_book': {'blueprints': [
+            {'index': 1, 'blueprint': BLUEPRINT_2_0},
+            {'blueprint': BLUEPRINT_1_1, 'index': 0},
+        ], 'label': 'book', 'blueprints_count': 2}}
+        self.assertEqual([label for label, _ in load_book(pretty(book))], ['book/0', 'book/1'])
+        self.assertEqual(list(load_book(pretty({'blueprint_book': {'label': 'empty', 'blueprints': []}}))), [])
+        for text in ('{"blueprint_book": {"blueprints": [{"index": 0} {"index": 1}]}}', '{"blueprint_book": []}'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                list(load_book('0' + base64.b64encode(zlib.compress(text.encode())).decode()))
+
+
+if __name__ == '__main__':
+    unittest.main()
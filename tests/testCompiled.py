@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from factorioccn import compiled
+from factorioccn.compiled import ArtifactError, dumps, load_source, loads
+from factorioccn.model.core import Frame
+from factorioccn.parser import parse
+
+
+class TestCompiled(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        patcher = mock.patch.dict(os.environ, {'FCCN_CACHE_DIR': self.tempdir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_round_trip_examples(self):
+        for file in os.listdir('./examples'):
+            if file.endswith('.fccn'):
+                with self.subTest(file):
+                    with open('./examples/' + file) as infile:
+                        original = parse(infile.read())
+                    circuit = loads(dumps(original))
+                    self.assertEqual(list(circuit.wires), list(original.wires))
+                    self.assertEqual(len(circuit.combinators), len(original.combinators))
+                    self.assertEqual([test._name for test in circuit.tests], [test._name for test in original.tests])
+                    circuit.run_tests()
+
+    def test_round_trip_behaviour(self):
+        source = '''
+            in -> x = each * 2 -> out
+            in -> each > 1 : y = 1 -> out
+            {x:5, z:-7} -> out
+        '''
+        original = parse(source)
+        circuit = loads(dumps(original))
+        for c in (original, circuit):
+            c.wires['in'].signals += Frame({'a': 1, 'b': 2, 'c': -3})
+            c.tick(2)
+        self.assertEqual(circuit.wires['out'].signals, original.wires['out'].signals)
+
+    def test_cache(self):
+        path = Path(self.tempdir.name) / 'clock.fccn'
+        path.write_text('clk -> x = x + 1 -> clk')
+        load_source(path)
+        with mock.patch('factorioccn.parser.parse') as parse_mock:
+            circuit = load_source(path)
+        parse_mock.assert_not_called()
+        circuit.tick(3)
+        self.assertEqual(circuit.wires['clk'].signals['x'], 3)
+
+    def test_cache_key(self):
+        self.assertNotEqual(compiled.cache_key(b'a -> x = 1 -> b'), compiled.cache_key(b'a -> x = 2 -> b'))
+        key = compiled.cache_key(b'a -> x = 1 -> b')
+        with mock.patch('factorioccn.compiled.source_digest', return_value='changed'):
+            self.assertNotEqual(compiled.cache_key(b'a -> x = 1 -> b'), key)
+
+    def test_load_compiled_file(self):
+        path = Path(self.tempdir.name) / ('clock' + compiled.SUFFIX)
+        compiled.save(parse('clk -> x = x + 1 -> clk'), path)
+        circuit = load_source(path)
+        circuit.tick()
+        self.assertEqual(circuit.wires['clk'].signals['x'], 1)
+
+    def test_invalid(self):
+        data = dumps(parse('clk -> x = x + 1 -> clk'))
+        with self.assertRaises(ArtifactError):
+            loads(b'NOPE' + data[4:])
+        with self.assertRaises(ArtifactError):
+            loads(data[:len(data) // 2])
+        with self.assertRaises(ArtifactError):
+            loads(b'')
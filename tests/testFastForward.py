@@ -0,0 +1,72 @@
+import unittest
+
+from factorioccn.model.core import Frame
+from factorioccn.parser import parse
+from tests.helpers import EngineSubTests
+
+
+class TestFastForward(EngineSubTests, unittest.TestCase):
+    clock = '''
+        clk -> x = x + 1 -> tmp
+        tmp -> x = x % 7 -> clk
+        clk -> x > 3 : y=1 -> out
+    '''
+
+    def _run(self, code, engine, n, reference_n=None):
+        reference = parse(code)
+        reference.fast_forward_threshold = None
+        reference.tick(n if reference_n is None else reference_n)
+        circuit = parse(code)
+        circuit.use_engine(engine)
+        simulated = circuit.engine.fast_forward(n)
+        for name, wire in reference.wires.items():
+            self.assertEqual(circuit.wires[name].signals, wire.signals)
+        return simulated
+
+    def test_periodic(self):
+        for engine in self._engines():
+            for n in (1000, 1001, 10003):
+                self.assertLess(self._run(self.clock, engine, n), 100)
+
+    def test_fixed_point(self):
+        for engine in self._engines():
+            self.assertLess(self._run('{a: 1} -> in\nin -> b = a * 2 -> out', engine, 10 ** 6, 100), 10)
+
+    def test_aperiodic(self):
+        for engine in self._engines():
+            self.assertEqual(self._run('clk -> x = x + 1 -> clk', engine, 500), 500)
+
+    def test_period_search(self):
+        for engine in self._engines():
+            circuit = parse('clk -> x = x + 1 -> clk')
+            circuit.use_engine(engine)
+            digests = []
+            digest = circuit.engine._digest
+            circuit.engine._digest = lambda: digests.append(None) or digest()
+            self.assertEqual(circuit.engine.fast_forward(2000), 2000)
+            self.assertEqual(circuit.wires['clk'].signals, {'x': 2000})
+            limit = type(circuit.engine).period_search
+            if limit is not None:
+                self.assertLessEqual(len(digests), limit + 1)
+
+    def test_incremental_digest(self):
+        for engine in self._engines():
+            circuit = parse(self.clock)
+            circuit.use_engine(engine)
+            circuit.engine._begin()
+            digests = []
+            for i in range(30):
+                circuit.engine._step()
+                digests.append(circuit.engine._digest())
+            circuit.engine._end()
+            self.assertEqual(len(set(digests[:14])), 14)
+            self.assertEqual(digests[:16], digests[14:])
+            fresh = type(circuit.engine)(circuit)
+            fresh._begin()
+            self.assertEqual(fresh._digest(), digests[-1])
+
+    def test_tick_threshold(self):
+        circuit = parse('data -> signal-s > signal-r : signal-s=1 -> data')
+        circuit.wires['data'].signals += Frame({'signal-s': 1})
+        circuit.tick(10 ** 9)
+        self.assertEqual(circuit.wires['data'].signals, {'signal-s': 1})
@@ -1,7 +1,8 @@
 import unittest
 
-from factorioccn.model.combinators import Combinator, BinaryCombinator
-from factorioccn.model.core import Frame, Wire
+from factorioccn.model.combinators import ArithmeticCombinator, BinaryCombinator, Combinator, DeciderCombinator
+from factorioccn.model.core import Frame, Wire, signal_table
+from factorioccn.model.kernels import arithmetic_kernel, decider_kernel
 
 
 class TestSignalSet(unittest.TestCase):
@@ -26,6 +27,24 @@ class TestSignalSet(unittest.TestCase):
         self.assertEqual(self.signal_a['a'], 3)
         self.assertEqual(self.signal_a['b'], 4)
 
+    def test_iadd_drops_zero(self):
+        self.signal_a += Frame({'a': -1, 'b': 4})
+        self.assertNotIn('a', self.signal_a)
+        self.assertEqual(len(self.signal_a), 1)
+
+    def test_explicit_zero(self):
+        frame = Frame({'a': 0})
+        self.assertIn('a', frame)
+        self.assertEqual(frame, self.empty_signals)
+        self.assertEqual(frame, {'b': 0})
+
+    def test_interning(self):
+        frame = Frame({'interned-signal': 3})
+        sid = signal_table.ids['interned-signal']
+        self.assertEqual(signal_table.names[sid], 'interned-signal')
+        self.assertEqual(signal_table.intern('interned-signal'), sid)
+        self.assertEqual(list(frame.items()), [('interned-signal', 3)])
+
 
 class TestWire(unittest.TestCase):
 
@@ -98,3 +117,45 @@ class TestBinaryCombinator(unittest.TestCase):
         self.assertEqual(self.mock([], 'each', '5', []).select_inputs(Frame({'a': 1, 'b': 2})), ({'a': 1, 'b': 2}, 5))
         # TODO: currently missing validation: self.assertRaises(ValueError, lambda: self.combinator.select_inputs(
         #  model.SignalSet(), '5', 'b'))
+
+
+class TestKernels(unittest.TestCase):
+    def test_shared(self):
+        first = DeciderCombinator([], 'a', '>', '5', 'b', 1, [])
+        second = DeciderCombinator([], 'c', '>', '7', 'd', 1, [])
+        other = DeciderCombinator([], 'c', '>', 'a', 'd', 1, [])
+        self.assertIs(first._kernel, second._kernel)
+        self.assertIsNot(first._kernel, other._kernel)
+        self.assertEqual(first._args[1], 5)
+
+    def test_process(self):
+        decider = DeciderCombinator([], 'each', '<', 'b', 'each', None, [])
+        self.assertEqual(decider.process(Frame({'a': 1, 'b': 2, 'c': 3})), {'a': 1})
+        arithmetic = ArithmeticCombinator([], 'each', '*', '2', 'x', [])
+        self.assertEqual(arithmetic.process(Frame({'a': 1, 'b': 2})), {'x': 6})
+        self.assertEqual(arithmetic.process(Frame()), {})
+
+    def test_bulk(self):
+        frames = [{}, {1: 3}, {1: 3, 2: 3}, {1: 5, 2: -1, 3: 3}, {2: 4, 3: 4}, {1: 0, 2: 3}]
+        for op in ('>', '>=', '=', '!=', '<=', '<'):
+            for left in ('everything', 'anything', 'each'):
+                for output in ('signal', 'each', 'everything', 'anything'):
+                    for right_constant in (False, True):
+                        for one in (False, True):
+                            bulk = decider_kernel(op, left, right_constant, output, one)
+                            plain = decider_kernel(op, left, right_constant, output, one, bulk=False)
+                            for values in frames:
+                                with self.subTest(op=op, left=left, output=output, const=right_constant, one=one,
+                                                  values=values):
+                                    right = 3 if right_constant else 2
+                                    self.assertEqual(bulk(values, -1, right, 3), plain(values, -1, right, 3))
+        for op in ('+', '-', '*', '/', '%', '**', '<<', '>>', '&', '|', '^'):
+            for output in ('each', 'signal'):
+                bulk = arithmetic_kernel(op, 'each', True, output)
+                plain = arithmetic_kernel(op, 'each', True, output, bulk=False)
+                for right in (-1, 0, 1, 2):
+                    if right == 0 and op in ('/', '%') or right < 0 and op in ('**', '<<', '>>'):
+                        continue
+                    for values in frames:
+                        with self.subTest(op=op, output=output, right=right, values=values):
+                            self.assertEqual(bulk(values, -1, right, 3), plain(values, -1, right, 3))
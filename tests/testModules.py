@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from factorioccn import parser
+from factorioccn.compiled import dumps, load_source, loads
+from factorioccn.modules import module_graph
+from factorioccn.parser import parse
+
+
+class TestModules(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        patcher = mock.patch.dict(os.environ, {'FCCN_CACHE_DIR': str(Path(self.tempdir.name) / 'cache')})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.root = Path(self.tempdir.name)
+        self.write('lib/clock.fccn', '''
+            clk -> x = x + 1 -> clk
+            test counts { 3: clk =~ {x:3} }
+        ''')
+        self.write('lib/limit.fccn', '''
+            import "clock.fccn"
+            clk -> x > 2 : y=1 -> out
+        ''')
+        self.write('main.fccn', '''
+            import "lib/clock.fccn"; import "lib/limit.fccn"
+            out -> y = y * 5 -> result
+            test result { 4: result =~ {} 5: result =~ {y:5} }
+        ''')
+
+    def write(self, name, source):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source)
+        return path
+
+    def test_parse_imports(self):
+        circuit = parse('import "a.fccn" import "../b.fccn";\n import -> x = x + 1 -> out')
+        self.assertEqual(circuit.imports, ['a.fccn', '../b.fccn'])
+        self.assertIn('import', circuit.wires)
+
+    def test_round_trip(self):
+        circuit = loads(dumps(parse('import "a.fccn"\n a -> x = x + 1 -> b')))
+        self.assertEqual(circuit.imports, ['a.fccn'])
+
+    def test_graph(self):
+        modules = module_graph(self.root / 'main.fccn')
+        self.assertEqual([path.relative_to(self.root.resolve()).as_posix() for path in modules],
+                         ['lib/clock.fccn', 'lib/limit.fccn', 'main.fccn'])
+
+    def test_link(self):
+        circuit = load_source(self.root / 'main.fccn')
+        self.assertEqual(set(circuit.wires), {'clk', 'out', 'result'})
+        self.assertEqual(len(circuit.combinators), 3)
+        self.assertEqual(len(circuit.wires['clk'].inputs), 1)
+        self.assertEqual([test._name for test in circuit.tests], ['result'])
+        circuit.run_tests()
+
+    def test_cycle(self):
+        self.write('a.fccn', 'import "b.fccn"\n a -> x = x + 1 -> b')
+        self.write('b.fccn', 'import "a.fccn"\n b -> x = x * 2 -> a')
+        circuit = load_source(self.root / 'a.fccn')
+        self.assertEqual(len(circuit.combinators), 2)
+        self.assertEqual(len(circuit.wires['a'].inputs), 1)
+
+    def test_incremental(self):
+        load_source(self.root / 'main.fccn')
+        self.write('lib/limit.fccn', '''
+            import "clock.fccn"
+            clk -> x > 3 : y=1 -> out
+        ''')
+        with mock.patch('factorioccn.parser.parse', wraps=parser.parse) as parse_mock:
+            circuit = load_source(self.root / 'main.fccn')
+        self.assertEqual(parse_mock.call_count, 1)
+        circuit.tick(5)
+        self.assertEqual(circuit.wires['result'].signals, {})
+
+    def test_missing(self):
+        self.write('broken.fccn', 'import "missing.fccn"')
+        with self.assertRaises(OSError):
+            load_source(self.root / 'broken.fccn')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+
+from benchmarks.generator import generators
+from factorioccn.model.combinators import ConstantCombinator, SequenceCombinator
+from factorioccn.model.probes import Probe
+from factorioccn.model.testing import WrongSignalError
+from factorioccn.optimizer import CLOCK_WIRE, optimize
+from factorioccn.parser import parse
+from tests.helpers import EngineSubTests
+
+FOLDING = '''
+{a:1} -> w0
+{b:2} -> w0
+w0 -> x = a + 5 -> w1
+w1 -> x > 5 : y=1 -> w2
+w2, in -> y = y * 3 -> out
+w0 -> z = a * 7 -> unused
+none -> c = c + 4 -> const
+{k:1} -> const, other
+{k:2} -> other, const
+test t {
+    0: in += {y:1}
+    1: out =~ {y:3}, const =~ {c:4, k:3}
+    2: for 2 out =~ {y:0}
+    4: in += {y:2}, out =~ {y:3}
+    5: out =~ {y:9}
+    6: for 5 out =~ {y:3}
+}
+'''
+
+
+class TestOptimizer(EngineSubTests, unittest.TestCase):
+    def _histories(self, circuit, wires, engine):
+        """record all tested wires at every tick of every test"""
+        circuit.use_engine(engine)
+        probes = [Probe(wire, size=64) for wire in wires]
+        for probe in probes:
+            circuit.attach_probe(probe)
+        histories = []
+        for test in circuit.tests:
+            try:
+                test.run()
+            except WrongSignalError:
+                pass
+            circuit.tick(10)
+            histories.append([[dict(frame) for _, frame in probe.history()] for probe in probes])
+        return histories
+
+    def assertEquivalent(self, source, wires):
+        for engine in self._engines():
+            optimized = parse(source)
+            report = optimize(optimized)
+            self.assertEqual(report.remaining, len(optimized.combinators))
+            self.assertEqual(self._histories(optimized, wires, engine),
+                             self._histories(parse(source), wires, engine))
+
+    def test_equivalent(self):
+        self.assertEquivalent(FOLDING, ['out', 'const', 'in'])
+
+    def test_chain(self):
+        # every hop adds a transient value, and the diamond at the end sums two chains of different length
+        source = '{x:1} -> w0\n' + '\n'.join(f'w{i} -> x = x + 1 -> w{i + 1}' for i in range(20)) + \
+            '\nw10, w20 -> x = x * 2 -> out\ntest t {\n 40: out =~ {x:64}\n}\n'
+        self.assertEquivalent(source, ['out'])
+        circuit = parse(source)
+        self.assertEqual(optimize(circuit).folded, 21)
+        circuit.run_tests()
+
+    def test_passes(self):
+        circuit = parse(FOLDING)
+        circuit.run_tests()
+        optimize(circuit)
+        circuit.run_tests()
+
+    def test_generated(self):
+        for name, generator in generators.items():
+            with self.subTest(name=name):
+                circuit = parse(generator(6))
+                optimize(circuit)
+                circuit.run_tests()
+
+    def test_report(self):
+        circuit = parse(FOLDING)
+        report = optimize(circuit)
+        # the constants on w0 are only read by folded combinators, 'unused' and 'other' are never tested
+        self.assertEqual((report.merged, report.folded, report.removed, report.added), (1, 4, 2, 3))
+        self.assertEqual(report.remaining, 5)
+        self.assertEqual(str(report), '9 -> 5 combinators: merged 1 constant combinators, '
+                                      'folded 4 into 3 sources, removed 2 unused')
+        kinds = sorted(type(c).__name__ for c in circuit.combinators)
+        self.assertEqual(kinds, ['ArithmeticCombinator', 'ConstantCombinator', 'ConstantCombinator',
+                                 'SequenceCombinator', 'SequenceCombinator'])
+        self.assertIn(CLOCK_WIRE, circuit.wires)
+
+    def test_no_transients(self):
+        circuit = parse('{a:1} -> in\nin -> b = a * 2 -> out\ntest t {\n 1: out =~ {b:0}\n 2: out =~ {b:2}\n}\n')
+        optimize(circuit)
+        # the delay of the arithmetic combinator needs a sequence, as its output is empty on the first tick
+        self.assertTrue(any(isinstance(c, SequenceCombinator) for c in circuit.combinators))
+        circuit.run_tests()
+        circuit = parse('none -> b = a + 2 -> out\ntest t {\n 1: out =~ {b:2}\n}\n')
+        optimize(circuit)
+        self.assertEqual([type(c) for c in circuit.combinators], [ConstantCombinator])
+        self.assertNotIn(CLOCK_WIRE, circuit.wires)
+        circuit.run_tests()
+
+    def test_set_wires_stay(self):
+        circuit = parse('in -> b = a * 2 -> out\ntest t {\n 0: in += {a:1}\n 1: out =~ {b:2}\n}\n')
+        report = optimize(circuit)
+        self.assertEqual(report.remaining, report.combinators)
+        circuit.run_tests()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from factorioccn import parser
+
+
+class TestParserCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        patcher = mock.patch.dict(os.environ, {'FCCN_CACHE_DIR': self.tempdir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_generated_once(self):
+        parser._load_parser()
+        files = list(Path(self.tempdir.name, 'parsers').glob('*.py'))
+        self.assertEqual(len(files), 1)
+        with mock.patch('tatsu.to_python_sourcecode') as generate:
+            parser._load_parser()
+        generate.assert_not_called()
+
+    def test_broken_file(self):
+        parser._load_parser()
+        path, = Path(self.tempdir.name, 'parsers').glob('*.py')
+        source = path.read_bytes()
+        # noinspection PyProtectedMember
+        complete = parser._COMPLETE
+        for broken in (source[:len(source) // 2], b'import no_such_module' + complete, b'x = 1' + complete,
+                       b'\0' + complete):
+            with self.subTest(broken=broken[:20]):
+                path.write_bytes(broken)
+                self.assertIsNotNone(parser._load_parser().parse('a -> x = x + 1 -> b'))
+                self.assertEqual(path.read_bytes(), source)
+
+
+if __name__ == '__main__':
+    unittest.main()
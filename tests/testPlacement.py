@@ -0,0 +1,113 @@
+import math
+import random
+import unittest
+
+from factorioccn.parser import parse
+from factorioccn.placement import REACH, SpatialGrid, place
+
+
+def chains(count: int, length: int, bus: str = 'head') -> str:
+    """``count`` chains of ``length`` combinators, the first of each chain reads ``bus``"""
+    lines = ['{x:1} -> ' + bus]
+    for c in range(count):
+        lines.append(f'{bus} -> x = x + 1 -> c{c}_0')
+        lines += [f'c{c}_{i}, clk{c} -> x = x + 1 -> c{c}_{i + 1}' for i in range(length - 1)]
+    return '\n'.join(lines)
+
+
+class TestSpatialGrid(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(1)
+        self.points = {i: (rng.uniform(-50, 50), rng.uniform(-50, 50)) for i in range(300)}
+        self.grid = SpatialGrid(8)
+        for item, point in self.points.items():
+            self.grid.add(item, *point)
+
+    def test_within(self):
+        for x, y in ((0, 0), (49, -49), (-200, 3)):
+            expected = {i for i, p in self.points.items() if math.dist(p, (x, y)) <= 12}
+            self.assertEqual(set(self.grid.within(x, y, 12)), expected)
+
+    def test_nearest(self):
+        for x, y in ((0, 0), (49, -49), (-200, 3), (13.5, 7.25)):
+            expected = min(self.points, key=lambda i: math.dist(self.points[i], (x, y)))
+            self.assertEqual(self.grid.nearest(x, y), expected)
+
+    def test_remove(self):
+        for item in range(299):
+            self.grid.remove(item)
+        self.assertEqual(len(self.grid), 1)
+        self.assertEqual(self.grid.nearest(1000, 1000), 299)
+        self.grid.remove(299)
+        self.assertIsNone(self.grid.nearest(0, 0))
+        with self.assertRaises(KeyError):
+            self.grid.remove(299)
+
+
+class TestPlace(unittest.TestCase):
+    def check(self, circuit, placement, reach=REACH, spacing=4):
+        tiles = set()
+        for combinator in circuit.combinators:
+            x, y = placement.positions[combinator]
+            self.assertNotEqual(x % spacing, spacing - 1)
+            tiles |= {(x, y), (x, y + 1)}
+        self.assertEqual(len(tiles), 2 * len(circuit.combinators))
+        for x, y in placement.poles:
+            self.assertEqual(x % spacing, spacing - 1)
+        self.assertEqual(len(set(placement.poles)), placement.relays)
+        for name, wire in circuit.wires.items():
+            members = {*wire.inputs, *wire.outputs}
+            connections = placement.connections.get(name, [])
+            for a, b in connections:
+                limit = reach if isinstance(a, int) and isinstance(b, int) else reach - 1
+                self.assertLessEqual(math.dist(placement.centre(a), placement.centre(b)), limit + 1e-9)
+            # all members are connected
+            if members:
+                reached = {next(iter(members))}
+                changed = True
+                while changed:
+                    changed = False
+                    for a, b in connections:
+                        if (a in reached) != (b in reached):
+                            reached |= {a, b}
+                            changed = True
+                self.assertLessEqual(members, reached)
+
+    def test_chains(self):
+        circuit = parse(chains(10, 30))
+        placement = place(circuit)
+        self.check(circuit, placement)
+        self.assertEqual(len(placement.positions), 301)
+        distances = []
+        for c in range(10):  # consecutive combinators of each chain are placed close to each other
+            for i in range(29):
+                wire = circuit.wires[f'c{c}_{i}']
+                distances.append(math.dist(placement.centre(wire.inputs[0]), placement.centre(wire.outputs[0])))
+        self.assertLessEqual(max(distances), REACH - 1)
+        self.assertLess(sum(distances) / len(distances), 2.0)
+
+    def test_relays(self):
+        circuit = parse(chains(12, 40))
+        placement = place(circuit, reach=5, spacing=2)
+        self.assertGreater(placement.relays, 0)
+        self.check(circuit, placement, 5, 2)
+
+    def test_improves_cost(self):
+        circuit = parse(chains(6, 20) + '\n' + '\n'.join(f'c{c}_5 -> x = x * 2 -> c{(c + 3) % 6}_15'
+                                                         for c in range(6)))
+        unimproved = place(circuit, passes=0)
+        improved = place(circuit)
+        self.check(circuit, improved)
+        self.assertLessEqual(improved.cost, unimproved.cost)
+
+    def test_invalid_spacing(self):
+        with self.assertRaises(ValueError):
+            place(parse('a -> x = x + 1 -> b'), spacing=10)
+
+    def test_str(self):
+        placement = place(parse('a -> x = x + 1 -> b\nb -> x = x * 2 -> c'))
+        self.assertEqual(str(placement), '2 combinators in 2x2 tiles, 0 relay poles, longest connection 1.0 tiles')
+
+
+if __name__ == '__main__':
+    unittest.main()
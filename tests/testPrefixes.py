@@ -0,0 +1,81 @@
+import unittest
+
+from factorioccn.model.prefixes import build_trie, run_shared
+from factorioccn.model.testing import WrongSignalError
+from factorioccn.parser import parse
+
+LATCH = '''
+in, mem -> S > R : S=1 -> mem
+mem -> x = S * 10 -> out
+test set {
+    0: in += {S:1}
+    3: for 5 mem =~ {S:1}
+    10: out =~ {x:10}
+}
+test reset {
+    0: in += {S:1}
+    3: for 2 mem =~ {S:1}
+    6: in += {R:2}
+    9: mem =~ {S:0}
+}
+test wrong {
+    0: in += {S:1}
+    3: for 5 mem =~ {S:1}
+    10: out =~ {x:20}
+}
+test broken {
+    0: in += {S:1}
+    2: mem =~ {S:7}
+    3: mem =~ {S:1}
+}
+test idle {
+    4: mem =~ {S:0}
+}
+'''
+
+
+class TestPrefixes(unittest.TestCase):
+    def setUp(self):
+        self.circuit = parse(LATCH)
+
+    def _serial(self):
+        errors = []
+        for test in self.circuit.tests:
+            try:
+                test.run()
+                errors.append(None)
+            except WrongSignalError as e:
+                errors.append(str(e))
+        return errors
+
+    def test_trie_size(self):
+        self.assertEqual([build_trie([test]).size() for test in self.circuit.tests], [10, 9, 10, 3, 4])
+        # wrong shares all ticks but the last 3 with set, reset the first 5 ticks and broken only the first tick
+        self.assertEqual(build_trie(self.circuit.tests).size(), 10 + 3 + 5 + 3 + 4)
+
+    def test_same_results(self):
+        for engine in ('object', 'scheduled'):
+            with self.subTest(engine=engine):
+                self.circuit.use_engine(engine)
+                errors = [None if e is None else str(e) for e in run_shared(self.circuit, self.circuit.tests)]
+                self.assertEqual(errors, self._serial())
+                self.assertEqual([e is None for e in errors], [True, True, False, False, True])
+
+    def test_simulates_trie(self):
+        ticks = []
+        tick = self.circuit.tick
+        self.circuit.tick = lambda n=1: (ticks.append(max(n, 0)), tick(n))
+        run_shared(self.circuit, self.circuit.tests[:3])
+        self.assertEqual(sum(ticks), build_trie(self.circuit.tests[:3]).size())
+        self.assertEqual(sum(ticks), 10 + 3 + 5)
+        del self.circuit.tick
+
+    def test_shared_failure(self):
+        circuit = parse(LATCH.replace('3: for 5 mem =~ {S:1}', '3: for 5 mem =~ {S:2}'))
+        errors = run_shared(circuit, circuit.tests)
+        self.assertEqual([e.test for e in errors[:3:2]], ['set', 'wrong'])
+        self.assertEqual(errors[0].results, errors[2].results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import pickle
+import unittest
+
+from factorioccn.model.core import Frame
+from factorioccn.model.probes import Probe
+from factorioccn.model.testing import WrongSignalError
+from factorioccn.parser import parse
+from tests.helpers import EngineSubTests
+
+
+class TestProbe(EngineSubTests, unittest.TestCase):
+    def setUp(self):
+        self.circuit = parse('clk -> x = x + 1 -> clk')
+
+    def test_ring_buffer(self):
+        probe = Probe('clk', ['x', 'y'], size=3)
+        self.circuit.attach_probe(probe)
+        self.circuit.tick(5)
+        self.assertEqual(probe.history(), [(3, Frame({'x': 3})), (4, Frame({'x': 4})), (5, Frame({'x': 5}))])
+        self.assertEqual(probe.history()[0][1], {'x': 3, 'y': 0})
+
+    def test_all_signals(self):
+        probe = Probe('clk')
+        self.circuit.attach_probe(probe)
+        self.circuit.tick(2)
+        self.assertEqual(probe.history(), [(1, Frame({'x': 1})), (2, Frame({'x': 2}))])
+
+    def test_no_fast_forward(self):
+        probe = Probe.parse('clk:x', size=4)
+        self.circuit.attach_probe(probe)
+        self.circuit.tick(1000)
+        self.assertEqual([tick for tick, _ in probe.history()], [997, 998, 999, 1000])
+        self.assertEqual(self.circuit.wires['clk'].signals, Frame({'x': 1000}))
+        self.circuit.detach_probe(probe)
+        self.circuit.tick(10)
+        self.assertEqual(probe.history()[-1][0], 1000)
+
+    def test_engines(self):
+        for engine in self._engines():
+            circuit = parse('clk -> x = x + 1 -> clk\nclk -> y = x * 2 -> out')
+            circuit.use_engine(engine)
+            probes = [Probe('out', size=3), Probe('clk', ['x', 'y'], size=3)]
+            for probe in probes:
+                circuit.attach_probe(probe)
+            circuit.tick(5)
+            circuit.wires['clk'].signals += Frame({'x': 10})
+            circuit.tick(2)
+            self.assertEqual(probes[0].history(), [(5, {'y': 8}), (6, {'y': 30}), (7, {'y': 32})])
+            self.assertEqual(probes[1].history(), [(5, {'x': 5}), (6, {'x': 16}), (7, {'x': 17})])
+            # recorded frames are independent of the wire, which changes on the next tick
+            circuit.tick()
+            self.assertEqual(circuit.wires['out'].signals, {'y': 34})
+            self.assertEqual(probes[0].history()[1], (7, {'y': 32}))
+
+    def test_unknown_wire(self):
+        with self.assertRaises(KeyError):
+            self.circuit.attach_probe(Probe('nope'))
+
+    def test_history_on_failure(self):
+        circuit = parse('''
+            clk -> x = x + 1 -> clk
+            test counting {
+                1: clk =~ {x:1}
+                6: clk =~ {x:7}
+            }
+        ''')
+        circuit.attach_probe(Probe('clk', ['x'], size=2))
+        with self.assertRaises(WrongSignalError) as context:
+            circuit.run_tests()
+        error = context.exception
+        self.assertEqual(error.history, [('clk:x', [(5, Frame({'x': 5})), (6, Frame({'x': 6}))])])
+        self.assertIn('clk:x, last 2 ticks:\n\t\t5: {\'x\': 5}\n\t\t6: {\'x\': 6}', str(error))
+        self.assertEqual(str(pickle.loads(pickle.dumps(error))), str(error))
@@ -0,0 +1,79 @@
+import unittest
+
+from factorioccn.model.core import Frame
+from factorioccn.parser import parse
+from factorioccn.profiling import Profile
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        self.circuit = parse('''
+            {a:1} -> c
+            c, clk -> x = x + 1 -> clk
+        ''')
+        self.profile = Profile()
+
+    def _stats(self, section=('run',)):
+        return {name: (stats.count, stats.signals) for (kind, name), stats in self.profile.sections[section].items()}
+
+    def test_counts(self):
+        with self.profile.instrument(self.circuit), self.profile.section('run'):
+            self.circuit.tick(5)
+        self.assertEqual(self._stats(), {
+            '#0 {a:1} -> c': (5, 0),
+            '#1 c, clk -> x = x + 1 -> clk': (5, 8),
+            'c': (5, 4),
+            'clk': (5, 4),
+        })
+        self.assertEqual(self.circuit.wires['clk'].signals, Frame({'x': 5}))
+
+    def test_scheduled_engine(self):
+        self.circuit.use_engine('scheduled')
+        with self.profile.instrument(self.circuit), self.profile.section('run'):
+            self.circuit.tick(5)
+        self.assertEqual(self._stats(), {
+            '#0 {a:1} -> c': (1, 0),
+            '#1 c, clk -> x = x + 1 -> clk': (5, 8),
+        })
+
+    def test_removes_instrumentation(self):
+        combinators = list(self.circuit.combinators)
+        with self.profile.instrument(self.circuit):
+            self.circuit.tick()
+        self.assertEqual(self.circuit.combinators, combinators)
+        for wire in self.circuit.wires.values():
+            self.assertNotIn('tick', vars(wire))
+            self.assertTrue(all(c in combinators for c in (*wire.inputs, *wire.outputs)))
+        self.circuit.tick()
+        self.assertEqual(self.circuit.wires['clk'].signals, Frame({'x': 2}))
+
+    def test_templates(self):
+        circuit = parse('''
+            template counter(out) {
+                {a:1} -> c
+                c, out -> x = x + 1 -> out
+            }
+            use counter(first) as one
+            use counter(second) as two
+            test counting { 3: first =~ {x:3}, second =~ {x:3} }
+        ''')
+        for engine in ('object', 'scheduled'):
+            with self.subTest(engine=engine):
+                circuit.use_engine(engine)
+                profile = Profile()
+                with profile.instrument(circuit), profile.section('run'):
+                    circuit.tests[0].run()
+                names = [name for _, name in profile.sections[('run',)]]
+                self.assertIn('#1 one.c, first -> x = x + 1 -> first', names)
+                self.assertEqual(len(names), 8 if engine == 'object' else 4)  # no wire ticks when scheduled
+
+    def test_output(self):
+        with self.profile.instrument(self.circuit), self.profile.section('file'), self.profile.section('test'):
+            self.circuit.tick(3)
+        self.assertEqual(self.profile.hot_spots()[0][0][0], 'file')
+        self.assertEqual(len(self.profile.format_table(limit=2).splitlines()), 3)
+        stacks = [line.rsplit(' ', 1)[0] for line in self.profile.collapsed()]
+        self.assertIn('file;test;combinator #1 c, clk -> x = x + 1 -> clk', stacks)
+        self.assertIn('file;test;wire clk', stacks)
+        for line in self.profile.collapsed():
+            self.assertRegex(line, r' \d+$')
@@ -0,0 +1,96 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from factorioccn.optimizer import optimize
+from factorioccn.parser import parse
+from factorioccn.results import ResultCache, result_key
+
+SOURCE = '''
+clk -> x = x + 1 -> clk
+clk -> x > 2 : y=1 -> high
+in -> x = x * 2 -> double
+test high { 4: high =~ {y:1} }
+test double { 1: in += {x:4} 2: double =~ {x:8} }
+'''
+
+
+def keys(source, **kwargs):
+    circuit = parse(source)
+    return [result_key(circuit, test, **kwargs) for test in circuit.tests]
+
+
+class TestResultKeys(unittest.TestCase):
+    def test_stable(self):
+        self.assertEqual(keys(SOURCE), keys(SOURCE))
+        self.assertEqual(keys(SOURCE), keys('# reordered\n' + SOURCE.replace('test high', 'unused -> x = x + 1 -> u\n'
+                                                                             'test high')))
+
+    def test_cone(self):
+        high, double = keys(SOURCE)
+        changed = keys(SOURCE.replace('x * 2', 'x * 3'))
+        self.assertEqual(changed[0], high)
+        self.assertNotEqual(changed[1], double)
+        changed = keys(SOURCE.replace('-> high', '-> high, double'))
+        self.assertNotEqual(changed[0], high)
+        self.assertNotEqual(changed[1], double)
+
+    def test_ticks(self):
+        high, double = keys(SOURCE)
+        changed = keys(SOURCE.replace('4: high', '5: high'))
+        self.assertNotEqual(changed[0], high)
+        self.assertEqual(changed[1], double)
+        self.assertNotEqual(keys(SOURCE.replace('{x:8}', '{x:8, y:0}'))[1], double)
+
+    def test_source(self):
+        unchanged = keys(SOURCE)
+        with mock.patch('factorioccn.results.source_digest', return_value='changed'):
+            self.assertNotEqual(keys(SOURCE), unchanged)
+
+    def test_engine(self):
+        self.assertNotEqual(keys(SOURCE), keys(SOURCE, engine='vectorized'))
+
+    def test_optimized(self):
+        source = '{x:1} -> a\na -> x = x * 2 -> b\ntest b { 3: b =~ {x:2} }'
+        circuit = parse(source)
+        optimize(circuit)
+        other = parse(source.replace('{x:1}', '{x:3}'))
+        optimize(other)
+        self.assertNotEqual(result_key(circuit, circuit.tests[0]), result_key(other, other.tests[0]))
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.cache = ResultCache(tempdir.name)
+
+    def test_hit(self):
+        self.assertFalse(self.cache.hit('a'))
+        self.cache.add('a')
+        self.assertTrue(self.cache.hit('a'))
+        self.assertEqual(sorted(os.listdir(self.cache.directory)), ['a'])
+
+    def test_evict_least_recently_used(self):
+        for i, key in enumerate('abcd'):
+            self.cache.add(key)
+            os.utime(self.cache.directory / key, ns=(0, i * 1_000_000_000))
+        self.cache.max_entries = 2
+        self.assertTrue(self.cache.hit('a'))
+        self.assertEqual(self.cache.evict(), 2)
+        self.assertEqual(sorted(os.listdir(self.cache.directory)), ['a', 'd'])
+        self.assertEqual(self.cache.evict(), 0)
+
+    def test_hit_refreshes(self):
+        self.cache.add('a')
+        path = Path(self.cache.directory, 'a')
+        os.utime(path, ns=(0, 0))
+        self.cache.hit('a')
+        self.assertGreater(path.stat().st_mtime, time.time() - 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,4 +9,4 @@ class TestRunExamples(unittest.TestCase):
         for file in os.listdir('./examples'):
             if file.endswith('.fccn'):
                 with self.subTest(file):
-                    main('./examples/' + file)
+                    self.assertEqual(main('./examples/' + file), 0)
@@ -0,0 +1,84 @@
+import os
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from factorioccn.model.core import Frame
+from factorioccn.model.testing import SignalTest, WrongSignalError
+from factorioccn.runner import collect_files, run
+
+CLOCK = '''
+clk -> x = x + 1 -> clk
+test pass1 {
+    3: clk =~ {x:3}
+}
+test fail {
+    2: clk =~ {x:5}
+}
+test pass2 {
+    1: clk =~ {x:1}
+}
+'''
+
+
+class TestRunner(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        patcher = mock.patch.dict(os.environ, {'FCCN_CACHE_DIR': str(Path(tempdir.name, 'cache'))})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dir = Path(tempdir.name, 'circuits')
+        (self.dir / 'sub').mkdir(parents=True)
+        (self.dir / 'b.fccn').write_text(CLOCK)
+        (self.dir / 'sub' / 'a.fccn').write_text(CLOCK)
+        (self.dir / 'notes.txt').write_text('not a circuit')
+
+    def test_collect_files(self):
+        self.assertEqual(collect_files([self.dir]), [str(self.dir / 'b.fccn'), str(self.dir / 'sub' / 'a.fccn')])
+
+    def test_collects_all_failures(self):
+        results = run([self.dir])
+        self.assertEqual([(Path(r.file).name, r.test, r.is_success()) for r in results],
+                         [('b.fccn', 'pass1', True), ('b.fccn', 'fail', False), ('b.fccn', 'pass2', True),
+                          ('a.fccn', 'pass1', True), ('a.fccn', 'fail', False), ('a.fccn', 'pass2', True)])
+        self.assertEqual(results[1].error.results, [SignalTest('clk', 'x', 5, 2)])
+
+    def test_parallel_is_deterministic(self):
+        serial = [str(r) for r in run([self.dir])]
+        for jobs in (2, 3):
+            with self.subTest(jobs=jobs):
+                self.assertEqual([str(r) for r in run([self.dir], jobs)], serial)
+
+    def test_shared(self):
+        self.assertEqual([str(r) for r in run([self.dir], shared=True)], [str(r) for r in run([self.dir])])
+
+    def test_optimize(self):
+        self.assertEqual([str(r) for r in run([self.dir], optimize=True)], [str(r) for r in run([self.dir])])
+
+    def test_slice(self):
+        self.assertEqual([str(r) for r in run([self.dir], slice=True)], [str(r) for r in run([self.dir])])
+
+    def test_cache(self):
+        for options in ({}, {'shared': True}, {'jobs': 2}):
+            with self.subTest(**options):
+                (self.dir / 'b.fccn').write_text(CLOCK)
+                expected = [str(r) for r in run([self.dir], **options)]
+                run([self.dir], cache=True, **options)
+                results = run([self.dir], cache=True, **options)
+                self.assertEqual([r.cached for r in results], [True, False, True] * 2)
+                self.assertEqual([str(r).replace(' (cached)', '') for r in results], expected)
+                (self.dir / 'b.fccn').write_text(CLOCK.replace('x:3}', 'x:4}'))
+                results = run([self.dir], cache=True, **options)
+                self.assertEqual([r.cached for r in results], [False, False, True, True, False, True])
+                self.assertFalse(results[0].is_success())
+
+    def test_error_pickles(self):
+        error = pickle.loads(pickle.dumps(WrongSignalError([SignalTest('w', 'x', 1, 2)], 3, 'test')))
+        self.assertEqual(str(error), 'unexpected signals in test:3:\n\tw[x]: expected 1, actual 2')
+
+    def test_probes(self):
+        results = run([self.dir / 'b.fccn'], probes=['clk:x', 'missing'], history=2)
+        self.assertEqual(results[1].error.history, [('clk:x', [(1, Frame({'x': 1})), (2, Frame({'x': 2}))])])
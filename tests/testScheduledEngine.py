@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+
+from factorioccn.model.combinators import ConstantCombinator
+from factorioccn.model.core import Frame
+from factorioccn.model.toplevel import Circuit
+from factorioccn.parser import parse
+from tests import testCombinatorsByExamples as examples
+
+
+class ScheduledEngineCase(unittest.TestCase):
+    """runs the tests of the mixed in TestCase with the scheduled engine as default"""
+
+    def setUp(self):
+        patcher = mock.patch.object(Circuit, 'default_engine', 'scheduled')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+
+class TestScheduledBasic(ScheduledEngineCase, examples.TestBasic):
+    pass
+
+
+class TestScheduledGrammarEdgeCases(ScheduledEngineCase, examples.TestGrammarEdgeCases):
+    pass
+
+
+class TestScheduledWildcardArithmetic(ScheduledEngineCase, examples.TestWildcardArithmetic):
+    pass
+
+
+class TestScheduledWildcardDecider(ScheduledEngineCase, examples.TestWildcardDecider):
+    pass
+
+
+class TestScheduledBarrier(ScheduledEngineCase, examples.TestBarrier):
+    pass
+
+
+class TestScheduledLatch(ScheduledEngineCase, examples.TestLatch):
+    pass
+
+
+class TestScheduledConstant(ScheduledEngineCase, examples.TestConstant):
+    pass
+
+
+class TestActivity(unittest.TestCase):
+    def setUp(self):
+        self.circuit = parse('''
+            {a: 1} -> const
+            data -> signal-s > signal-r : signal-s=1 -> data
+            const -> b = a * 2 -> out
+        ''')
+        self.circuit.use_engine('scheduled')
+        self.counts = {}
+        for combinator in self.circuit.combinators:
+            combinator.process = self._counting(combinator, combinator.process)
+
+    def _counting(self, combinator, process):
+        def counted(input):
+            self.counts[combinator] = self.counts.get(combinator, 0) + 1
+            return process(input)
+        return counted
+
+    def test_constant_once(self):
+        self.circuit.tick(10)
+        for combinator in self.circuit.combinators:
+            if isinstance(combinator, ConstantCombinator):
+                self.assertEqual(self.counts[combinator], 1)
+        self.assertEqual(self.circuit.wires['out'].signals, {'b': 2})
+
+    def test_idle_latch(self):
+        self.circuit.wires['data'].signals += Frame({'signal-s': 1})
+        self.circuit.tick(10)
+        latch = self.circuit.combinators[1]
+        self.assertEqual(self.counts[latch], 1)
+        self.assertEqual(self.circuit.wires['data'].signals, {'signal-s': 1})
+        self.circuit.wires['data'].signals += Frame({'signal-r': 1})
+        self.circuit.tick(10)
+        self.assertEqual(self.counts[latch], 3)
+        self.assertEqual(self.circuit.wires['data'].signals, {})
@@ -0,0 +1,59 @@
+import unittest
+
+from factorioccn.model.testing import WrongSignalError
+from factorioccn.parser import parse
+
+FACTORY = '''
+in -> x = a + 1 -> mid
+mid, loop -> x > 0 : x -> loop, out
+other -> y = b * 2 -> unrelated
+unrelated -> y > 1 : z=1 -> unrelated2
+out -> q = x + 0 -> sink
+test main {
+    0: in += {a:1}, other += {b:5}
+    2: out =~ {x:2}
+    4: out =~ {x:4}
+}
+test side {
+    0: other += {b:5}
+    2: unrelated2 =~ {z:1}
+}
+'''
+
+
+class TestSlicing(unittest.TestCase):
+    def setUp(self):
+        self.circuit = parse(FACTORY)
+
+    def test_cone(self):
+        self.assertEqual([str(c) for c in self.circuit.cone(['out'])], ['x = a + 1', 'x > 0 : x'])
+        self.assertEqual([str(c) for c in self.circuit.cone(['unrelated2'])], ['y = b * 2', 'y > 1 : z=1'])
+        self.assertEqual(self.circuit.cone(['in']), [])
+
+    def test_slice(self):
+        main, side = self.circuit.tests
+        sliced = main.slice()
+        # noinspection PyProtectedMember
+        circuit = sliced._circuit
+        self.assertEqual(sorted(circuit.wires), ['in', 'loop', 'mid', 'other', 'out'])
+        self.assertEqual(len(circuit.combinators), 2)
+        self.assertFalse(circuit.wires['other'].outputs)
+        sliced.run()
+        side.slice().run()
+        # the original circuit is unaffected
+        self.assertEqual(len(self.circuit.combinators), 5)
+        self.assertEqual(len(self.circuit.wires['other'].outputs), 1)
+        self.circuit.run_tests()
+
+    def test_same_failures(self):
+        circuit = parse(FACTORY.replace('4: out =~ {x:4}', '4: out =~ {x:5}'))
+        main = circuit.tests[0]
+        with self.assertRaises(WrongSignalError) as full:
+            main.run()
+        with self.assertRaises(WrongSignalError) as sliced:
+            main.slice().run()
+        self.assertEqual(str(sliced.exception), str(full.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
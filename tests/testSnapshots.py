@@ -0,0 +1,109 @@
+import unittest
+
+from factorioccn.model.core import Frame
+from factorioccn.model.testing import WrongSignalError
+from factorioccn.parser import parse
+from tests.helpers import EngineSubTests
+
+
+class TestFrameSharing(unittest.TestCase):
+    def test_copy_on_write(self):
+        frame = Frame({'a': 1})
+        shared = frame.share()
+        frame['b'] = 2
+        self.assertEqual(shared, {'a': 1})
+        shared += Frame({'a': 1})
+        self.assertEqual(shared, {'a': 2})
+        self.assertEqual(frame, {'a': 1, 'b': 2})
+
+    def test_clear(self):
+        frame = Frame({'a': 1})
+        shared = frame.share()
+        shared.clear()
+        del frame['a']
+        self.assertEqual(len(shared), 0)
+        self.assertEqual(len(frame), 0)
+        self.assertEqual(frame.share().share(), {})
+
+
+class TestSnapshots(EngineSubTests, unittest.TestCase):
+    counter = '''
+        clk -> x = x + 1 -> tmp
+        tmp -> x = x % 7 -> clk
+        clk -> x > 3 : y=1 -> out
+    '''
+
+    @staticmethod
+    def _state(circuit):
+        return {name: dict(wire.signals) for name, wire in circuit.wires.items()}
+
+    def test_restore(self):
+        for engine in self._engines():
+            circuit = parse(self.counter)
+            circuit.use_engine(engine)
+            circuit.tick(5)
+            snapshot = circuit.snapshot()
+            circuit.tick(3)
+            expected = self._state(circuit)
+            circuit.tick(4)
+            circuit.restore(snapshot)
+            self.assertEqual(circuit.time, 5)
+            circuit.tick(3)
+            self.assertEqual(self._state(circuit), expected)
+            circuit.restore(snapshot)
+            circuit.tick(3)
+            self.assertEqual(self._state(circuit), expected)
+
+    def test_snapshot_unaffected(self):
+        circuit = parse(self.counter)
+        circuit.tick(2)
+        snapshot = circuit.snapshot()
+        before = [dict(frame) for frame in snapshot.wires]
+        circuit.tick(10)
+        circuit.wires['clk'].signals['z'] = 5
+        self.assertEqual([dict(frame) for frame in snapshot.wires], before)
+
+    def test_reset(self):
+        circuit = parse(self.counter)
+        circuit.tick(5)
+        circuit.reset()
+        self.assertEqual(circuit.time, 0)
+        self.assertTrue(all(not wire.signals for wire in circuit.wires.values()))
+
+    def test_fork(self):
+        for engine in self._engines():
+            circuit = parse(self.counter)
+            circuit.use_engine(engine)
+            circuit.tick(5)
+            fork = circuit.fork()
+            self.assertEqual(fork.time, 5)
+            self.assertEqual(self._state(fork), self._state(circuit))
+            fork.tick(3)
+            circuit.tick(3)
+            self.assertEqual(self._state(fork), self._state(circuit))
+            fork.wires['clk'].signals['x'] = 100
+            fork.tick()
+            self.assertNotEqual(self._state(fork), self._state(circuit))
+            self.assertEqual(len(fork.wires['clk'].outputs), 2)
+            self.assertTrue(all(c not in circuit.combinators for c in fork.combinators))
+
+    def test_test_from_snapshot(self):
+        circuit = parse('''
+            in, mem -> S > R : S=1 -> mem
+            test held { 2: mem =~ {S:1} }
+            test fresh { 2: mem =~ {S:0} }
+        ''')
+        circuit.wires['in'].signals['S'] = 1
+        circuit.tick(2)
+        warm = circuit.snapshot()
+        held, fresh = circuit.tests
+        held.run(start=warm)
+        with self.assertRaises(WrongSignalError):
+            held.run()
+        with self.assertRaises(WrongSignalError):
+            fresh.run(start=warm)
+        fresh.run()
+
+
+if __name__ == '__main__':
+    unittest.main()
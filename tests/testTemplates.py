@@ -0,0 +1,113 @@
+import tracemalloc
+import unittest
+
+from factorioccn.compiled import dumps, loads
+from factorioccn.model.combinators import ArithmeticCombinator, ConstantCombinator, DeciderCombinator, \
+    InstanceCombinator
+from factorioccn.model.core import Wire
+from factorioccn.parser import parse, parse_model
+from factorioccn.parser.builders import CircuitBuilder
+from tests.helpers import EngineSubTests
+
+BODY = '''
+    in, loop -> S > R : S=1 -> loop, out
+    in -> x = each * 2 -> tmp
+    tmp -> each > 5 : each -> out
+    {R:1} -> tmp
+'''
+
+
+def templated(count):
+    return f'template block(in, out) {{{BODY}}}\n' + \
+        ''.join(f'use block(in{i}, out{i}) as b{i}\n' for i in range(count))
+
+
+def expanded(count):
+    return ''.join(BODY.replace('loop', f'b{i}_loop').replace('tmp', f'b{i}_tmp')
+                   .replace('in,', f'in{i},').replace('in ', f'in{i} ').replace('out', f'out{i}')
+                   for i in range(count))
+
+
+class TestTemplates(EngineSubTests, unittest.TestCase):
+    def test_instances(self):
+        circuit = parse(templated(3))
+        self.assertEqual(list(circuit.wires)[:4], ['in0', 'out0', 'b0.loop', 'b0.tmp'])
+        self.assertEqual(len(circuit.combinators), 12)
+        self.assertTrue(all(isinstance(c, InstanceCombinator) for c in circuit.combinators))
+        self.assertIs(circuit.combinators[1].prototype, circuit.combinators[5].prototype)
+        self.assertEqual(str(circuit.combinators[4]), 'S > R : S=1')
+        self.assertEqual(circuit.combinators[4].op, '>')
+        self.assertEqual(len(circuit.wires['b1.loop'].outputs), 1)
+
+    def test_same_as_expanded(self):
+        for engine in self._engines():
+            results = []
+            for source in (templated(3), expanded(3)):
+                circuit = parse(source)
+                circuit.use_engine(engine)
+                circuit.wires['in1'].signals['S'] = 5
+                circuit.wires['in2'].signals['q'] = 4
+                circuit.tick(2)
+                circuit.wires['in1'].signals.clear()
+                circuit.tick(3)
+                results.append([dict(circuit.wires[f'out{i}'].signals) for i in range(3)])
+            self.assertEqual(results[0], results[1])
+            self.assertEqual(results[0][1]['S'], 1)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            parse('use block(a, b) as b1')
+        with self.assertRaises(ValueError):
+            parse(f'template block(in, out) {{{BODY}}}\nuse block(a) as b1')
+
+    def test_round_trip(self):
+        circuit = loads(dumps(parse(templated(3) + 'in0 -> x = x + 1 -> out0')))
+        self.assertIs(circuit.combinators[0].prototype, circuit.combinators[8].prototype)
+        self.assertNotIsInstance(circuit.combinators[-1], InstanceCombinator)
+        circuit.wires['in0'].signals['S'] = 1
+        circuit.tick(2)
+        self.assertEqual(circuit.wires['out0'].signals['S'], 1)
+
+    def test_fork(self):
+        circuit = parse(templated(2))
+        circuit.wires['in0'].signals['S'] = 1
+        circuit.tick(2)
+        fork = circuit.fork()
+        fork.tick(2)
+        circuit.tick(2)
+        self.assertEqual(dict(fork.wires['out0'].signals), dict(circuit.wires['out0'].signals))
+        self.assertIs(fork.combinators[0].prototype, circuit.combinators[0].prototype)
+
+    def test_memory(self):
+        builder = CircuitBuilder()
+        builder.walk(parse_model(templated(1)))
+        template = builder.templates['block']
+        wires = {name: Wire() for name in template.wires}
+
+        def independent():
+            combinators = []
+            for prototype, inputs, outputs in template.combinators:
+                inputs = [wires[name] for name in inputs]
+                outputs = [wires[name] for name in outputs]
+                if isinstance(prototype, ConstantCombinator):
+                    combinators.append(ConstantCombinator(prototype.signals.copy(), outputs))
+                elif isinstance(prototype, ArithmeticCombinator):
+                    combinators.append(ArithmeticCombinator(inputs, prototype.left, prototype.op, prototype.right,
+                                                            prototype.output_signal, outputs))
+                else:
+                    combinators.append(DeciderCombinator(inputs, prototype.left, prototype.op, prototype.right,
+                                                         prototype.output_signal, prototype.output_value, outputs))
+            return combinators
+
+        sizes = []
+        for create in (lambda: template.instantiate(wires), independent):
+            tracemalloc.start()
+            instances = [create() for _ in range(200)]
+            sizes.append(tracemalloc.get_traced_memory()[0])
+            tracemalloc.stop()
+            self.assertEqual(len(instances[-1]), 4)
+        self.assertLess(sizes[0], sizes[1] * 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -69,3 +69,33 @@ class TestTestParsing(unittest.TestCase):
                     t = 8
                 tick = test._ticks[i]
                 self.assertEqual(tick.tick, t)
+
+
+class TestHoldParsing(unittest.TestCase):
+    def setUp(self) -> None:
+        self.circuit = parse('''
+        clk -> x = x + 1 -> clk
+
+        test long {
+            0: for 1000000 clk =~ {y:0}
+            2: for 10 clk += {y:1}, clk =~ {x:2}
+            1000000: clk =~ {y:0}
+        }
+        ''')
+
+    def testRuns(self):
+        ticks = self.circuit.tests[0]._ticks
+        self.assertEqual(len(ticks), 1000001)
+        self.assertEqual([(run.tick, run.count) for run in ticks.runs],
+                         [(0, 1), (1, 1), (2, 1), (3, 9), (12, 999988), (1000000, 1)])
+
+    def testLazyTicks(self):
+        ticks = self.circuit.tests[0]._ticks
+        tick = ticks[5]
+        self.assertEqual(tick.tick, 5)
+        self.assertEqual([(s.wire, s.values) for s in tick._sets], [('clk', Frame({'y': 1}))])
+        self.assertEqual([(e.wire, e.values) for e in tick._expected], [('clk', Frame({'y': 0}))])
+        self.assertEqual(ticks[-1].tick, 1000000)
+        self.assertEqual([t.tick for t in ticks[10:14]], [10, 11, 12, 13])
+        with self.assertRaises(IndexError):
+            _ = ticks[1000001]
@@ -106,6 +106,7 @@ class TestTest(unittest.TestCase):
                 self.wires = {'foo': make_wire({'a': 1}), 'bar': make_wire({'b': 0})}
                 self.t = 0
                 self.last = None
+                self.probes = []
 
             def tick(self, delta):
                 self.t += delta
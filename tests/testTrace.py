@@ -0,0 +1,64 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+from factorioccn.model.core import Frame
+from factorioccn.parser import parse
+from factorioccn.trace import Trace, TraceError, Tracer, main, write_vcd
+
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = Path(tempdir.name, 'trace.fccnt')
+        circuit = parse('''
+            clk -> x = x + 1 -> clk
+            clk -> x > 3 : y=1 -> out
+        ''')
+        with Tracer(self.path, block_ticks=4) as tracer:
+            circuit.attach_probe(tracer)
+            circuit.tick(10)
+            circuit.wires['clk'].signals = Frame()
+            circuit.tick(3)
+        self.trace = Trace(self.path)
+        self.addCleanup(self.trace.close)
+
+    def test_values(self):
+        self.assertEqual(self.trace.ticks, 14)
+        self.assertEqual(self.trace.columns, [('clk', 'x'), ('out', 'y')])
+        self.assertEqual(self.trace.values('clk', 'x'), [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 1, 2, 3])
+        self.assertEqual(self.trace.values('out', 'y', 2, 9), [0, 0, 0, 1, 1, 1, 1])
+        self.assertEqual(self.trace.values('out', 'y', 12, 100), [0, 0])
+        self.assertEqual(self.trace.values('out', 'unknown', 0, 3), [0, 0, 0])
+
+    def test_changes(self):
+        self.assertEqual(self.trace.changes('out', 'y'), [(0, 0), (5, 1), (11, 0)])
+        self.assertEqual(self.trace.changes('out', 'y', 6, 12), [(6, 1), (11, 0)])
+        self.assertEqual(self.trace.changes('out', 'y', 20), [])
+
+    def test_vcd(self):
+        out = io.StringIO()
+        write_vcd(self.trace, out, 4, 6)
+        vcd = out.getvalue()
+        self.assertIn('$scope module clk $end\n$var integer 64 ! x $end\n$upscope $end', vcd)
+        self.assertTrue(vcd.endswith('$enddefinitions $end\n#4\nb100 !\nb0 "\n#5\nb101 !\nb1 "\n#6\n'))
+
+    def test_cli(self):
+        out = io.StringIO()
+        with mock.patch('sys.stdout', out):
+            main(['query', str(self.path), 'out', 'y', '4', '7'])
+        self.assertEqual(out.getvalue(), '4: 0\n5: 1\n6: 1\n')
+
+    def test_invalid(self):
+        bad = self.path.with_name('bad.fccnt')
+        bad.write_bytes(b'not a trace at all, but long enough for a header.' * 2)
+        with self.assertRaises(TraceError):
+            Trace(bad)
+        bad.write_bytes(b'')
+        with self.assertRaises(TraceError):
+            Trace(bad)
+        os.remove(bad)
@@ -0,0 +1,165 @@
+import unittest
+from unittest import mock
+
+from factorioccn.model.combinators import ArithmeticCombinator
+from factorioccn.model.core import Frame, Wire
+from factorioccn.model.testing import WrongSignalError
+from factorioccn.model.toplevel import Circuit
+from factorioccn.parser import parse
+from tests import testCombinatorsByExamples as examples
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class VectorEngineCase(unittest.TestCase):
+    """runs the tests of the mixed in TestCase with the vectorized engine as default"""
+
+    def setUp(self):
+        patcher = mock.patch.object(Circuit, 'default_engine', 'vectorized')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+
+class TestVectorBasic(VectorEngineCase, examples.TestBasic):
+    pass
+
+
+class TestVectorGrammarEdgeCases(VectorEngineCase, examples.TestGrammarEdgeCases):
+    pass
+
+
+class TestVectorWildcardArithmetic(VectorEngineCase, examples.TestWildcardArithmetic):
+    pass
+
+
+class TestVectorWildcardDecider(VectorEngineCase, examples.TestWildcardDecider):
+    pass
+
+
+class TestVectorBarrier(VectorEngineCase, examples.TestBarrier):
+    pass
+
+
+class TestVectorLatch(VectorEngineCase, examples.TestLatch):
+    pass
+
+
+class TestVectorConstant(VectorEngineCase, examples.TestConstant):
+    pass
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestEngineEquivalence(unittest.TestCase):
+    code = '''
+        in -> x = x + 1 -> a
+        in, a -> each > 2 : each -> b
+        a, b -> everything < 5 : y=1 -> c
+        c, in -> anything = 1 : everything -> d
+        d -> z = each * 3 -> e
+        {x: 1, w: -4} -> in
+    '''
+
+    def test_matches_object_engine(self):
+        reference = parse(self.code)
+        vectorized = parse(self.code)
+        vectorized.use_engine('vectorized')
+        for i in range(12):
+            with self.subTest(i=i):
+                for circuit in (reference, vectorized):
+                    circuit.wires['in'].signals += Frame({'x': i % 4, 'v': i})
+                    circuit.tick()
+                for name, wire in reference.wires.items():
+                    self.assertEqual(vectorized.wires[name].signals, wire.signals)
+
+    def test_negative_exponent(self):
+        # the grammar can't express '**', so this builds the combinators directly
+        wires = {name: Wire() for name in ('in', 'a', 'b')}
+        combinators = [ArithmeticCombinator([wires['in']], 'x', '**', 'e', 'x', [wires['a']]),
+                       ArithmeticCombinator([wires['in']], 'each', '**', '-1', 'each', [wires['b']])]
+        for combinator in combinators:
+            combinator.connect()
+        circuit = Circuit(wires, combinators, 'vectorized')
+        circuit.wires['in'].signals += Frame({'x': 2, 'e': -2, 'one': 1, 'minus': -1})
+        circuit.tick()
+        self.assertEqual(circuit.wires['a'].signals, {})
+        self.assertEqual(circuit.wires['b'].signals, {'one': 1, 'minus': -1})
+        circuit.wires['in'].signals += Frame({'x': 2, 'e': 3})
+        circuit.tick()
+        self.assertEqual(circuit.wires['a'].signals, {'x': 8})
+
+    def test_switch_engine(self):
+        circuit = parse('clk -> x = x + 1 -> clk')
+        circuit.tick(3)
+        circuit.use_engine('vectorized')
+        circuit.tick(3)
+        self.assertEqual(circuit.wires['clk'].signals, {'x': 6})
+        circuit.use_engine('object')
+        circuit.tick()
+        self.assertEqual(circuit.wires['clk'].signals, {'x': 7})
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestBatch(unittest.TestCase):
+    LATCH = '''
+        io -> steam < 10000 : S=1 -> latch_in
+        io -> steam > 20000 : R=1 -> latch_in
+        latch_in, loop -> S > R : S=1 -> loop, io
+        test low {
+            0: io += {steam:500}
+            3: io =~ {S:1}
+        }
+        test high {
+            0: io += {steam:25000}
+            3: for 3 io =~ {S:0}
+        }
+        test wrong {
+            0: io += {steam:25000}
+            2: io =~ {S:0}
+            4: io =~ {S:1}
+        }
+        test setAndReset {
+            0: io += {steam:500}
+            5: io += {steam:21000}
+            3: for 3 io =~ {S:1}
+            8: for 300 io =~ {S:0}
+        }
+    '''
+
+    def test_matches_serial_runs(self):
+        from factorioccn.model.vectorized import run_batch
+        circuit = parse(self.LATCH)
+        errors = run_batch(circuit, circuit.tests)
+        self.assertEqual([e is None for e in errors], [True, False, True, False])
+        for test, error in zip(circuit.tests, errors):
+            with self.subTest(test._name):
+                try:
+                    test.run()
+                    serial = None
+                except WrongSignalError as e:
+                    serial = str(e)
+                self.assertEqual(None if error is None else str(error), serial)
+
+    def test_scenarios_are_independent(self):
+        from factorioccn.model.vectorized import BatchEngine
+        circuit = parse('clk -> x = x + 1 -> clk')
+        engine = BatchEngine(circuit, 3)
+        for i in range(3):
+            engine.scenario(i)['clk'].signals += Frame({'x': 10 * i})
+        engine.tick(4)
+        self.assertEqual([engine.scenario(i)['clk'].signals for i in range(3)],
+                         [Frame({'x': 4}), Frame({'x': 14}), Frame({'x': 24})])
+        self.assertEqual(circuit.wires['clk'].signals, Frame())
+
+    def test_new_signals(self):
+        from factorioccn.model.vectorized import BatchEngine
+        circuit = parse('in -> each = each * 2 -> out')
+        engine = BatchEngine(circuit, 2)
+        engine.scenario(1)['in'].signals = Frame({'batch-only-signal': 3})
+        engine.tick()
+        self.assertEqual(engine.scenario(0)['out'].signals, Frame())
+        self.assertEqual(engine.scenario(1)['out'].signals, Frame({'batch-only-signal': 6}))
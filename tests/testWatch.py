@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from factorioccn import parser
+from factorioccn.watch import Watcher, split_statements
+
+SOURCE = '''
+clk -> x = x + 1 -> clk   # a counter
+clk -> x > 2 : y=1 -> high
+in -> x = x * 2 -> double
+
+test counts { 3: clk =~ {x:3} }
+test high {
+    4: high =~ {y:1}
+}
+test double {
+    1: in += {x:4}
+    2: double =~ {x:8}
+}
+'''
+
+
+class TestSplitStatements(unittest.TestCase):
+    def test_split(self):
+        chunks = split_statements(SOURCE)
+        self.assertEqual(len(chunks), 6)
+        self.assertEqual(chunks[0], 'clk -> x = x + 1 -> clk   # a counter')
+        self.assertEqual(chunks[4], 'test high {\n    4: high =~ {y:1}\n}')
+
+    def test_comments_and_strings(self):
+        chunks = split_statements('import "a{#.fccn"\n# {\na -> x = x + 1 -> b # }\n\n')
+        self.assertEqual(chunks, ['import "a{#.fccn"', 'a -> x = x + 1 -> b # }'])
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        patcher = mock.patch.dict(os.environ, {'FCCN_CACHE_DIR': str(Path(tempdir.name, 'cache'))})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.path = Path(tempdir.name, 'circuit.fccn')
+        self.path.write_text(SOURCE)
+        self.watcher = Watcher([self.path])
+
+    def change(self, old, new, path=None):
+        path = path or self.path
+        path.write_text(path.read_text().replace(old, new))
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_poll(self):
+        self.assertTrue(self.watcher.poll())
+        self.assertFalse(self.watcher.poll())
+        self.change('x * 2', 'x * 3')
+        self.assertTrue(self.watcher.poll())
+        self.assertFalse(self.watcher.poll())
+
+    def test_only_affected_tests(self):
+        results = self.watcher.run()
+        self.assertEqual([r.test for r in results], ['counts', 'high', 'double'])
+        self.assertTrue(all(r.is_success() for r in results))
+        self.assertEqual(self.watcher.ran, 3)
+        self.watcher.run()
+        self.assertEqual(self.watcher.ran, 0)
+        self.change('x * 2', 'x * 3')
+        results = self.watcher.run()
+        self.assertEqual(self.watcher.ran, 1)
+        self.assertEqual([r.is_success() for r in results], [True, True, False])
+        self.change('x > 2', 'x > 1')
+        self.watcher.run()
+        self.assertEqual(self.watcher.ran, 1)
+        self.change('4: high', '3: high')
+        self.watcher.run()
+        self.assertEqual(self.watcher.ran, 1)
+
+    def test_only_changed_statements_parsed(self):
+        self.watcher.run()
+        self.change('x * 2', 'x * 3')
+        with mock.patch('factorioccn.watch.parse_model', wraps=parser.parse_model) as parse_mock:
+            self.watcher.run()
+        parse_mock.assert_called_once_with('in -> x = x * 3 -> double')
+
+    def test_multiline_statement(self):
+        self.change('in -> x = x * 2 -> double', 'in ->\n x = x * 2 -> double')
+        results = self.watcher.run()
+        self.assertEqual(self.watcher.errors, [])
+        self.assertTrue(all(r.is_success() for r in results))
+
+    def test_errors(self):
+        self.watcher.run()
+        self.change('x * 2', 'x *')
+        self.assertEqual(self.watcher.run(), [])
+        self.assertEqual(len(self.watcher.errors), 1)
+        self.change('x *', 'x * 2')
+        self.assertEqual(len(self.watcher.run()), 3)
+        self.assertEqual(self.watcher.ran, 0)
+
+    def test_imports(self):
+        lib = self.path.with_name('lib.fccn')
+        lib.write_text('double -> x = x + 1 -> plus')
+        self.change('test counts', 'import "lib.fccn"\ntest plus { 1: in += {x:1} 3: plus =~ {x:3} }\ntest counts')
+        self.assertEqual(len(self.watcher.run()), 4)
+        self.assertFalse(self.watcher.poll())
+        self.change('x + 1', 'x + 2', lib)
+        self.assertTrue(self.watcher.poll())
+        results = self.watcher.run()
+        self.assertEqual(self.watcher.ran, 1)
+        self.assertFalse(results[0].is_success())
+
+
+if __name__ == '__main__':
+    unittest.main()